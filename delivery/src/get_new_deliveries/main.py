@@ -0,0 +1,65 @@
+"""
+GetNewDeliveriesFunction
+"""
+
+
+import os
+import boto3
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from ecom.workqueue import WorkQueue # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+QUEUE_INDEX_NAME = os.environ["QUEUE_INDEX_NAME"]
+# Number of deliveries leased when the client does not ask for a count
+LEASE_COUNT = int(os.environ.get("LEASE_COUNT", "10"))
+MAX_LEASE_COUNT = 100
+# Seconds before a leased delivery that is not started is visible again
+LEASE_TIMEOUT = int(os.environ.get("LEASE_TIMEOUT", "300"))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+work_queue = WorkQueue(table, QUEUE_INDEX_NAME, ["orderId"]) # pylint: disable=invalid-name
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.delivery") # pylint: disable=invalid-name
+
+
+@metrics.log_metrics
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the getNewDeliveries AppSync resolver
+
+    This leases the oldest new deliveries to the user calling the API, so
+    that concurrent users do not receive the same deliveries.
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    owner = event["userId"]
+    count = event.get("count", None) or LEASE_COUNT
+    count = max(1, min(count, MAX_LEASE_COUNT))
+
+    items = work_queue.lease(count, owner, LEASE_TIMEOUT)
+
+    logger.info({
+        "message": "Leased {} deliveries".format(len(items)),
+        "userId": owner,
+        "orderIds": [item["orderId"] for item in items]
+    })
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    metrics.add_metric(name="deliveryLeased", unit=MetricUnit.Count, value=len(items))
+
+    return {
+        "deliveries": [
+            {"orderId": item["orderId"], "address": item["address"]}
+            for item in items
+        ]
+    }
@@ -0,0 +1,93 @@
+"""
+OnOrderEventsFunction
+"""
+
+
+import datetime
+import os
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.claimcheck import LazyDetail # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+ORDER_ADDRESSES_TABLE_NAME = os.environ["ORDER_ADDRESSES_TABLE_NAME"]
+# Addresses are only needed until orders are packaged
+PROJECTION_TTL = int(os.environ.get("PROJECTION_TTL", str(30*24*60*60)))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(ORDER_ADDRESSES_TABLE_NAME) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+
+
+@tracer.capture_method
+def save_address(order: dict) -> None:
+    """
+    Save the address of an order
+
+    Events can arrive out of order, so this does not overwrite an address
+    from a more recent version of the order.
+    """
+
+    expiration = int(datetime.datetime.now().timestamp()) + PROJECTION_TTL
+
+    try:
+        table.put_item(
+            Item={
+                "orderId": order["orderId"],
+                "address": order["address"],
+                "modifiedDate": order["modifiedDate"],
+                "expiration": expiration
+            },
+            ConditionExpression="attribute_not_exists(orderId) OR modifiedDate <= :modifiedDate",
+            ExpressionAttributeValues={":modifiedDate": order["modifiedDate"]}
+        )
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        logger.info({
+            "message": "Ignoring outdated address for order {}".format(order["orderId"]),
+            "orderId": order["orderId"]
+        })
+
+
+@tracer.capture_method
+def delete_address(order_id: str) -> None:
+    """
+    Delete the address of an order
+    """
+
+    table.delete_item(Key={"orderId": order_id})
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for Orders events
+    """
+
+    order_id = event["resources"][0]
+    logger.info({
+        "message": "Received event {} for order {}".format(event["detail-type"], order_id),
+        "orderId": order_id,
+        "eventType": event["detail-type"]
+    })
+
+    detail = LazyDetail(event["detail"])
+
+    if event["detail-type"] == "OrderCreated":
+        save_address(detail)
+    elif event["detail-type"] == "OrderModified":
+        save_address(detail["new"])
+    elif event["detail-type"] == "OrderDeleted":
+        delete_address(order_id)
+    else:
+        logger.warning({
+            "message": "Unknown detail-type {}".format(event["detail-type"]),
+            "detailType": event["detail-type"]
+        })
@@ -3,8 +3,9 @@ OnPackageCreatedFunction
 """
 
 
+import datetime
 import os
-from typing import Optional
+from typing import List, Optional
 from urllib.parse import urlparse
 import boto3
 import requests # pylint: disable=import-error
@@ -13,18 +14,58 @@ from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics
 from aws_lambda_powertools.metrics import MetricUnit
+from ecom.dynamodb import update_item_if, update_items_if # pylint: disable=import-error
+from ecom.idempotency import IdempotencyStore, idempotent # pylint: disable=import-error
+from ecom.instrumentation import instrument_client, timed # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 ORDERS_API_URL = os.environ["ORDERS_API_URL"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+# Local projection of order addresses, see the OnOrderEvents function
+ORDER_ADDRESSES_TABLE_NAME = os.environ.get("ORDER_ADDRESSES_TABLE_NAME", None)
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
+# Shipping requests can only be overwritten before delivery starts
+SHIPPING_REQUEST_CONDITION = "attribute_not_exists(orderId) OR #status = :status"
+# isNew, newDate and visibleDate are used for the GSIs. New deliveries are
+# leased oldest first through the visibleDate index, see ecom.workqueue.
+# Requests that are already queued keep their position and lease.
+SHIPPING_REQUEST_UPDATE = (
+    "SET #status = :status, #address = :address, "
+    "isNew = if_not_exists(isNew, :isNew), "
+    "newDate = if_not_exists(newDate, :now), "
+    "visibleDate = if_not_exists(visibleDate, :now)"
+)
 
 
 dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
 table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+addresses_table = dynamodb.Table(ORDER_ADDRESSES_TABLE_NAME) if ORDER_ADDRESSES_TABLE_NAME else None # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.delivery", service="delivery")
+dependency_metrics = MetricsAggregator(namespace="ecommerce.delivery", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(dynamodb, dependency_metrics)
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_package_created") # pylint: disable=invalid-name
+
+
+@tracer.capture_method
+def get_local_order(order_id: str) -> Optional[dict]:
+    """
+    Retrieve the order address from the local projection
+    """
+
+    if addresses_table is None:
+        return None
+
+    item = addresses_table.get_item(Key={"orderId": order_id}).get("Item", None)
+    if item is None:
+        metrics.add_metric(name="orderProjectionMiss", unit=MetricUnit.Count, value=1)
+        return None
+
+    metrics.add_metric(name="orderProjectionHit", unit=MetricUnit.Count, value=1)
+    return {"orderId": order_id, "address": item["address"]}
 
 
 @tracer.capture_method
@@ -47,7 +88,8 @@ def get_order(order_id: str) -> Optional[dict]:
                                aws_service='execute-api')
 
     # Send request to order service
-    response = requests.get(request_url, auth=auth)
+    with timed(dependency_metrics, "orders.get_order"):
+        response = requests.get(request_url, auth=auth)
 
     if response.status_code != 200:
         logger.error({
@@ -68,38 +110,62 @@ def get_order(order_id: str) -> Optional[dict]:
     return order
 
 
+def _shipping_request_args(order: dict) -> dict:
+    # We only care about the order ID (partition key) and address
+    return {
+        "Key": {"orderId": order["orderId"]},
+        "UpdateExpression": SHIPPING_REQUEST_UPDATE,
+        "ExpressionAttributeNames": {"#status": "status", "#address": "address"},
+        "ExpressionAttributeValues": {
+            ":status": "NEW",
+            ":address": order["address"],
+            ":isNew": "true",
+            ":now": datetime.datetime.now().isoformat()
+        }
+    }
+
+
 @tracer.capture_method
 def save_shipping_request(order: dict) -> None:
     """
     Save the shipping request to DynamoDB
     """
 
-    result = table.get_item(Key={
-        "orderId": order["orderId"]
-    })
-
-    if result.get("Item", {}).get("status", "NEW") != "NEW":
+    args = _shipping_request_args(order)
+    if not update_item_if(table, args.pop("Key"), SHIPPING_REQUEST_CONDITION, **args):
         logger.info({
-            "message": "Cannot update shipping request in status '{}'".format(result["Item"]["status"]),
+            "message": "Cannot update shipping request that is not in status 'NEW'",
             "orderId": order["orderId"]
         })
+        metrics.add_metric(name="deliveryConditionFailed", unit=MetricUnit.Count, value=1)
         return
 
-    # We only care about the order ID (partition key) and address
-    table.put_item(Item={
-        "orderId": order["orderId"],
-        # Used for the GSI
-        "isNew": "true",
-        "status": "NEW",
-        "address": order["address"]
-    })
-
     metrics.add_metric(name="deliveryCreated", unit=MetricUnit.Count, value=1)
 
 
+@tracer.capture_method
+def save_shipping_requests(orders: List[dict]) -> None:
+    """
+    Save shipping requests for many orders to DynamoDB, e.g. when replaying
+    PackageCreated events
+    """
+
+    failed = update_items_if(table, [_shipping_request_args(o) for o in orders], SHIPPING_REQUEST_CONDITION)
+
+    if failed:
+        logger.info({
+            "message": "Cannot update {} shipping request(s) that are not in status 'NEW'".format(len(failed)),
+            "orderIds": [update["Key"]["orderId"] for update in failed]
+        })
+        metrics.add_metric(name="deliveryConditionFailed", unit=MetricUnit.Count, value=len(failed))
+    metrics.add_metric(name="deliveryCreated", unit=MetricUnit.Count, value=len(orders)-len(failed))
+
+
+@dependency_metrics.log_metrics
 @metrics.log_metrics
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@idempotent(idempotency_store)
 def handler(event, context):
     """
     Lambda function handler
@@ -126,8 +192,9 @@ def handler(event, context):
         "orderId": order_id
     })
 
-    # Retrieve order from order service
-    order = get_order(order_id)
+    # Retrieve the order from the local projection, or from the order service
+    # if the projection is not up to date yet
+    order = get_local_order(order_id) or get_order(order_id)
 
     if order is None:
         logger.warning({
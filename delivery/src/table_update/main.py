@@ -6,15 +6,16 @@ TableUpdateFunction
 import datetime
 import json
 import os
-import warnings
 from typing import List, Optional
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from aws_lambda_powertools.tracing import Tracer
 from aws_lambda_powertools.logging.logger import Logger
-from aws_lambda_powertools import Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from ecom.helpers import Encoder
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.logs import LazyLogger # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
@@ -24,8 +25,10 @@ EVENT_BUS_NAME = os.environ["EVENT_BUS_NAME"]
 eventbridge = boto3.client("events") # pylint: disable=invalid-name
 deserialize = TypeDeserializer().deserialize # pylint: disable=invalid-name
 logger = Logger() # pylint: disable=invalid-name
+log = LazyLogger(logger, sample_rate=0.1) # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
-metrics = Metrics(namespace="ecommerce.delivery", service="delivery")
+metrics = MetricsAggregator(namespace="ecommerce.delivery", dimensions={"service": "delivery"}) # pylint: disable=invalid-name
+instrument_client(eventbridge, metrics)
 
 
 @tracer.capture_method
@@ -40,82 +43,58 @@ def send_events(events: List[dict]):
         eventbridge.put_events(Entries=events[i:i+10])
 
 
-def process_record(record: dict) -> Optional[dict]:
+def _status(image: dict) -> Optional[str]:
+    # Read the raw string value, without deserializing the image
+    return image.get("status", {}).get("S", None)
+
+
+def classify_record(record: dict) -> Optional[str]:
     """
-    Process record from DynamoDB
+    Returns the detail-type to publish for a record, or None to drop it
 
     A record have a 'status' field that can take any of the following values:
      - NEW
      - IN_PROGRESS
      - COMPLETED
      - FAILED
+
+    This only looks at the raw values of the record, as most records are
+    dropped.
     """
     # pylint: disable=no-else-return
 
-    event = {
-        "Time": datetime.datetime.now(),
-        "Source": "ecommerce.delivery",
-        "Resources": [
-            deserialize(record["dynamodb"]["Keys"]["orderId"])
-        ],
-        "EventBusName": EVENT_BUS_NAME
-    }
-    if record["dynamodb"].get("OldImage", None) is not None:
-        event["Detail"] = json.dumps({
-            "orderId": deserialize(record["dynamodb"]["OldImage"]["orderId"]),
-            "address": deserialize(record["dynamodb"]["OldImage"]["address"])
-        }, cls=Encoder)
-    else:
-        event["Detail"] = json.dumps({
-            "orderId": deserialize(record["dynamodb"]["NewImage"]["orderId"]),
-            "address": deserialize(record["dynamodb"]["NewImage"]["address"])
-        }, cls=Encoder)
+    event_name = record["eventName"].upper()
 
     # INSERT records
     # These events are just discarded
-    if record["eventName"].upper() == "INSERT":
-        logger.debug({
-            "message": "Ignoring INSERT record",
-            "record": record
-        })
+    if event_name == "INSERT":
+        log.debug("Ignoring INSERT record", record=record)
         return None
 
     # REMOVE records
-    elif record["eventName"].upper() == "REMOVE":
-        if deserialize(record["dynamodb"]["OldImage"]["status"]) in ["COMPLETED", "FAILED"]:
-            logger.debug({
-                "message": "Ignoring REMOVE of completed record",
-                "record": record
-            })
+    elif event_name == "REMOVE":
+        if _status(record["dynamodb"]["OldImage"]) in ["COMPLETED", "FAILED"]:
+            log.debug("Ignoring REMOVE of completed record", record=record)
             return None
 
-        logger.warning({
-            "message": "Failed delivery: REMOVE before completion",
-            "record": record
-        })
-        event["DetailType"] = "DeliveryFailed"
+        log.warning("Failed delivery: REMOVE before completion", record=record)
         metrics.add_metric(name="deliveryFailed", unit=MetricUnit.Count, value=1)
-        return event
+        return "DeliveryFailed"
 
     # MODIFY records
-    elif record["eventName"].upper() == "MODIFY":
-        if deserialize(record["dynamodb"]["NewImage"]["status"]) == "FAILED":
-            logger.warning({
-                "message": "Failed delivery: status marked as FAILED",
-                "record": record
-            })
-            event["DetailType"] = "DeliveryFailed"
+    elif event_name == "MODIFY":
+        status = _status(record["dynamodb"]["NewImage"])
+
+        if status == "FAILED":
+            log.warning("Failed delivery: status marked as FAILED", record=record)
             metrics.add_metric(name="deliveryFailed", unit=MetricUnit.Count, value=1)
-            return event
-
-        elif deserialize(record["dynamodb"]["NewImage"]["status"]) == "COMPLETED":
-            logger.info({
-                "message": "Delivery completed",
-                "record": record
-            })
-            event["DetailType"] = "DeliveryCompleted"
+            return "DeliveryFailed"
+
+        elif status == "COMPLETED":
+            log.info("Delivery completed", orderId=lambda: record["dynamodb"]["NewImage"]["orderId"]["S"])
+            log.verbose("Completed delivery record", record=record)
             metrics.add_metric(name="deliveryCompleted", unit=MetricUnit.Count, value=1)
-            return event
+            return "DeliveryCompleted"
 
         else:
             return None
@@ -124,6 +103,44 @@ def process_record(record: dict) -> Optional[dict]:
         raise ValueError("Wrong eventName value for DynamoDB event: {}".format(record["eventName"]))
 
 
+def build_event(record: dict, detail_type: str) -> dict:
+    """
+    Returns the EventBridge event for a record
+    """
+
+    image = record["dynamodb"].get("OldImage", None)
+    if image is None:
+        image = record["dynamodb"]["NewImage"]
+
+    return {
+        "Time": datetime.datetime.now(),
+        "Source": "ecommerce.delivery",
+        "Resources": [
+            deserialize(record["dynamodb"]["Keys"]["orderId"])
+        ],
+        "DetailType": detail_type,
+        "Detail": json.dumps({
+            "orderId": deserialize(image["orderId"]),
+            "address": deserialize(image["address"])
+        }, cls=Encoder),
+        "EventBusName": EVENT_BUS_NAME
+    }
+
+
+def process_record(record: dict) -> Optional[dict]:
+    """
+    Process record from DynamoDB
+
+    Returns the event to publish, or None if the record is dropped.
+    """
+
+    detail_type = classify_record(record)
+    if detail_type is None:
+        return None
+
+    return build_event(record, detail_type)
+
+
 @metrics.log_metrics
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
@@ -132,20 +149,9 @@ def handler(event, _):
     Lambda function handler for Orders Table stream
     """
 
-    # this handler may complete without publishing any metrics
-    warnings.filterwarnings("ignore", "No metrics to publish*")
-
     metrics.add_dimension(name="environment", value=ENVIRONMENT)
 
-    logger.debug({
-        "message": "Input event",
-        "event": event
-    })
-
-    logger.debug({
-        "message": "Records received",
-        "records": event.get("Records", [])
-    })
+    log.verbose("Input event", event=event)
 
     events = [
         process_record(record)
@@ -154,10 +160,7 @@ def handler(event, _):
     events = [event for event in events if event is not None]
 
     logger.info("Received %d event(s)", len(events))
-    logger.debug({
-        "message": "Events processed from records",
-        "events": events
-    })
+    log.verbose("Events processed from records", events=events)
 
     if len(events) > 0:
         send_events(events)
@@ -0,0 +1,91 @@
+from botocore import stub
+import pytest
+from fixtures import context, lambda_module, get_order, get_product # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "get_new_deliveries",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "TABLE_NAME": "TABLE_NAME",
+        "QUEUE_INDEX_NAME": "QUEUE_INDEX_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+def _ddb(order: dict, visible_date: str) -> dict:
+    # Items are built for each response, as boto3 deserializes them in place
+    return {
+        "orderId": {"S": order["orderId"]},
+        "isNew": {"S": "true"},
+        "visibleDate": {"S": visible_date},
+        "status": {"S": "NEW"},
+        "address": {"M": {k: {"S": v} for k, v in order["address"].items()}}
+    }
+
+
+def test_handler(lambda_module, context, get_order):
+    """
+    Test handler() with a delivery leased by another user in the meantime
+    """
+
+    orders = [get_order() for _ in range(3)]
+    dates = ["2021-01-01T00:00:0{}".format(i) for i in range(3)]
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_response("query", {
+        "Items": [
+            {k: v for k, v in _ddb(order, date).items() if k in ["orderId", "isNew", "visibleDate"]}
+            for order, date in zip(orders, dates)
+        ]
+    }, {
+        "TableName": lambda_module.TABLE_NAME,
+        "IndexName": lambda_module.QUEUE_INDEX_NAME,
+        "KeyConditionExpression": "#pk = :pk AND #sk <= :now",
+        "ExpressionAttributeNames": {"#pk": "isNew", "#sk": "visibleDate"},
+        "ExpressionAttributeValues": {":pk": "true", ":now": stub.ANY},
+        "ScanIndexForward": True,
+        "Limit": 2
+    })
+    table.add_response("update_item", {"Attributes": _ddb(orders[0], "LEASED")}, {
+        "TableName": lambda_module.TABLE_NAME,
+        "Key": {"orderId": orders[0]["orderId"]},
+        "UpdateExpression": "SET #sk = :until, #owner = :owner",
+        "ConditionExpression": "#sk = :visibleDate",
+        "ExpressionAttributeNames": {"#sk": "visibleDate", "#owner": "leaseOwner"},
+        "ExpressionAttributeValues": {":until": stub.ANY, ":owner": "USER_ID", ":visibleDate": dates[0]},
+        "ReturnValues": "ALL_NEW"
+    })
+    table.add_client_error("update_item", "ConditionalCheckFailedException")
+    table.add_response("update_item", {"Attributes": _ddb(orders[2], "LEASED")})
+    table.activate()
+
+    response = lambda_module.handler({"userId": "USER_ID", "count": 2}, context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+    assert response == {"deliveries": [
+        {"orderId": orders[0]["orderId"], "address": orders[0]["address"]},
+        {"orderId": orders[2]["orderId"], "address": orders[2]["address"]}
+    ]}
+
+
+def test_handler_empty(lambda_module, context):
+    """
+    Test handler() without new deliveries
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_response("query", {"Items": []})
+    table.activate()
+
+    response = lambda_module.handler({"userId": "USER_ID"}, context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+    assert response == {"deliveries": []}
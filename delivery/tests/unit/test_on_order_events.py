@@ -0,0 +1,118 @@
+import copy
+import datetime
+import uuid
+from botocore import stub
+import pytest
+from fixtures import context, lambda_module, get_order, get_product # pylint: disable=import-error
+from helpers import mock_table # pylint: disable=import-error,no-name-in-module
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "on_order_events",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "ORDER_ADDRESSES_TABLE_NAME": "ORDER_ADDRESSES_TABLE_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture(scope="module")
+def order(get_order):
+    return get_order()
+
+
+def _event(order: dict, detail_type: str, detail: dict) -> dict:
+    return {
+        "version": "0",
+        "id": str(uuid.uuid4()),
+        "time": datetime.datetime.now().isoformat(),
+        "region": "eu-west-1",
+        "account": "123456789012",
+        "source": "ecommerce.orders",
+        "detail-type": detail_type,
+        "resources": [order["orderId"]],
+        "detail": detail
+    }
+
+
+def _put_params(lambda_module, order: dict) -> dict:
+    return {
+        "TableName": lambda_module.table.name,
+        "Item": {
+            "orderId": order["orderId"],
+            "address": order["address"],
+            "modifiedDate": order["modifiedDate"],
+            "expiration": stub.ANY
+        },
+        "ConditionExpression": stub.ANY,
+        "ExpressionAttributeValues": {":modifiedDate": order["modifiedDate"]}
+    }
+
+
+def test_handler_created(lambda_module, context, order):
+    """
+    Test handler() with an OrderCreated event
+    """
+
+    table = mock_table(
+        lambda_module.table, "put_item", ["orderId"],
+        expected_params=_put_params(lambda_module, order)
+    )
+
+    lambda_module.handler(_event(order, "OrderCreated", order), context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_handler_modified(lambda_module, context, order):
+    """
+    Test handler() with an OrderModified event
+    """
+
+    new_order = copy.deepcopy(order)
+    new_order["address"]["city"] = "Other City"
+
+    table = mock_table(
+        lambda_module.table, "put_item", ["orderId"],
+        expected_params=_put_params(lambda_module, new_order)
+    )
+
+    lambda_module.handler(_event(order, "OrderModified", {
+        "old": order, "new": new_order, "changed": ["address"]
+    }), context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_handler_outdated(lambda_module, context, order):
+    """
+    Test handler() with an event older than the saved address
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_client_error("put_item", "ConditionalCheckFailedException",
+                           expected_params=_put_params(lambda_module, order))
+    table.activate()
+
+    lambda_module.handler(_event(order, "OrderCreated", order), context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_handler_deleted(lambda_module, context, order):
+    """
+    Test handler() with an OrderDeleted event
+    """
+
+    table = mock_table(lambda_module.table, "delete_item", ["orderId"], items={"orderId": order["orderId"]})
+
+    lambda_module.handler(_event(order, "OrderDeleted", order), context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
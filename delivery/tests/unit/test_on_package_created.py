@@ -4,6 +4,7 @@ import json
 import random
 import uuid
 from botocore import stub
+from botocore.exceptions import ClientError
 import pytest
 import requests
 import requests_mock
@@ -29,7 +30,7 @@ def order(get_order):
     return get_order()
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture
 def event(order):
     return {
         "version": "0",
@@ -44,13 +45,19 @@ def event(order):
     }
 
 
-@pytest.fixture(scope="module")
-def ddb_item(order):
+def update_params(lambda_module, order: dict) -> dict:
     return {
-        "orderId": order["orderId"],
-        "isNew": "true",
-        "status": "NEW",
-        "address": order["address"]
+        "TableName": lambda_module.table.name,
+        "Key": {"orderId": order["orderId"]},
+        "ConditionExpression": lambda_module.SHIPPING_REQUEST_CONDITION,
+        "UpdateExpression": lambda_module.SHIPPING_REQUEST_UPDATE,
+        "ExpressionAttributeNames": {"#status": "status", "#address": "address"},
+        "ExpressionAttributeValues": {
+            ":status": "NEW",
+            ":address": order["address"],
+            ":isNew": "true",
+            ":now": stub.ANY
+        }
     }
 
 
@@ -91,20 +98,15 @@ def test_get_order_empty(lambda_module, order, url):
     assert response is None
 
 
-def test_save_shipping_request(lambda_module, order, ddb_item):
+def test_save_shipping_request(lambda_module, order):
     """
     Test save_shipping_request()
     """
 
     table = mock_table(
-        lambda_module.table, "get_item",
-        ["orderId"]
-    )
-    table = mock_table(
-        table, "put_item",
+        lambda_module.table, "update_item",
         ["orderId"],
-        items=ddb_item,
-        table_name=lambda_module.table.name
+        expected_params=update_params(lambda_module, order)
     )
 
     lambda_module.save_shipping_request(order)
@@ -113,20 +115,18 @@ def test_save_shipping_request(lambda_module, order, ddb_item):
     table.deactivate()
 
 
-def test_save_shipping_request_in_progress(lambda_module, order, ddb_item):
+def test_save_shipping_request_in_progress(lambda_module, order):
     """
     Test save_shipping_request() with an in progress shipping request
     """
 
     # Mock boto3
-    ddb_item = copy.deepcopy(ddb_item)
-    del ddb_item["isNew"]
-    ddb_item["status"] = "IN_PROGRESS"
-    table = mock_table(
-        lambda_module.table, "get_item",
-        ["orderId"],
-        items=ddb_item
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_client_error(
+        "update_item", "ConditionalCheckFailedException",
+        expected_params=update_params(lambda_module, order)
     )
+    table.activate()
 
     # Call
     lambda_module.save_shipping_request(order)
@@ -136,21 +136,40 @@ def test_save_shipping_request_in_progress(lambda_module, order, ddb_item):
     table.deactivate()
 
 
-def test_handler(lambda_module, event, context, order, url, ddb_item):
+def test_save_shipping_requests(lambda_module, get_order, monkeypatch):
+    """
+    Test save_shipping_requests() with a shipping request in progress
+    """
+
+    orders = [get_order() for _ in range(3)]
+    updates = []
+
+    # Updates run concurrently, so the table is replaced instead of stubbed
+    class Table:
+        def update_item(self, Key, **kwargs): # pylint: disable=invalid-name
+            updates.append(Key)
+            assert kwargs["ConditionExpression"] == lambda_module.SHIPPING_REQUEST_CONDITION
+            assert kwargs["UpdateExpression"] == lambda_module.SHIPPING_REQUEST_UPDATE
+            if Key["orderId"] == orders[1]["orderId"]:
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+
+    monkeypatch.setattr(lambda_module, "table", Table())
+
+    lambda_module.save_shipping_requests(orders)
+
+    assert sorted(k["orderId"] for k in updates) == sorted(o["orderId"] for o in orders)
+
+
+def test_handler(lambda_module, event, context, order, url):
     """
     Test handler()
     """
 
     # Mock boto3
     table = mock_table(
-        lambda_module.table, "get_item",
-        ["orderId"]
-    )
-    table = mock_table(
-        table, "put_item",
+        lambda_module.table, "update_item",
         ["orderId"],
-        items=ddb_item,
-        table_name=lambda_module.table.name
+        expected_params=update_params(lambda_module, order)
     )
 
     with requests_mock.Mocker() as m:
@@ -168,6 +187,63 @@ def test_handler(lambda_module, event, context, order, url, ddb_item):
     table.deactivate()
 
 
+def test_handler_local_order(lambda_module, event, context, order, monkeypatch):
+    """
+    Test handler() with the address in the local projection
+    """
+
+    monkeypatch.setattr(lambda_module, "addresses_table", lambda_module.dynamodb.Table("ADDRESSES_TABLE_NAME"))
+
+    # Mock boto3
+    table = mock_table(
+        lambda_module.addresses_table, "get_item",
+        ["orderId"],
+        items={"orderId": order["orderId"], "address": order["address"]}
+    )
+    table = mock_table(
+        table, "update_item",
+        ["orderId"],
+        expected_params=update_params(lambda_module, order)
+    )
+
+    with requests_mock.Mocker() as m:
+        lambda_module.handler(event, context)
+
+    # The order service is not called
+    assert not m.called
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_handler_local_order_miss(lambda_module, event, context, order, url, monkeypatch):
+    """
+    Test handler() with an order missing from the local projection
+    """
+
+    monkeypatch.setattr(lambda_module, "addresses_table", lambda_module.dynamodb.Table("ADDRESSES_TABLE_NAME"))
+
+    # Mock boto3
+    table = mock_table(
+        lambda_module.addresses_table, "get_item",
+        ["orderId"]
+    )
+    table = mock_table(
+        table, "update_item",
+        ["orderId"],
+        expected_params=update_params(lambda_module, order)
+    )
+
+    with requests_mock.Mocker() as m:
+        m.get(url, text=json.dumps(order))
+        lambda_module.handler(event, context)
+
+    assert m.call_count == 1
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
 def test_handler_wrong_event_source(lambda_module, event, context):
     """
     Test handler() with an incorrect event
@@ -178,6 +178,24 @@ def ddb_record_in_progress_removed(order):
     }
 
 
+def test_classify_record(lambda_module, ddb_record_new, ddb_record_in_progress, ddb_record_completed):
+    """
+    Test classify_record()
+    """
+
+    assert lambda_module.classify_record(ddb_record_new) is None
+    assert lambda_module.classify_record(ddb_record_in_progress) is None
+    assert lambda_module.classify_record(ddb_record_completed) == "DeliveryCompleted"
+
+    # Records without a status are not published
+    record = copy.deepcopy(ddb_record_in_progress)
+    del record["dynamodb"]["NewImage"]["status"]
+    assert lambda_module.classify_record(record) is None
+
+    with pytest.raises(ValueError):
+        lambda_module.classify_record(dict(ddb_record_new, eventName="WRONG"))
+
+
 def test_process_record_new(lambda_module, ddb_record_new):
     """
     Test process_record() with a new record
@@ -178,6 +178,9 @@ def test_get_new_packaging_request_ids(jwt_token, api_url, warehouse_table_name)
         "productId": "__metadata",
         "modifiedDate": datetime.datetime.now().isoformat(),
         "newDate": datetime.datetime.now().isoformat(),
+        "isNew": "true",
+        # Older than any other request, so that it is leased first
+        "visibleDate": "2000-01-01T00:00:00",
         "status": "NEW"
     }
 
@@ -189,32 +192,16 @@ def test_get_new_packaging_request_ids(jwt_token, api_url, warehouse_table_name)
 
     # Make requests
     headers = {"Authorization": jwt_token}
-    def get_ids(next_token=None):
-        if next_token:
-            req_data = {
-                "query": """
-                query ($nextToken: String!) {
-                    getNewPackagingRequestIds(nextToken: $nextToken) {
-                        nextToken
-                        packagingRequestIds
-                    }
-                }
-                """,
-                "variables": {
-                    "nextToken": next_token
-                }
-            }
-        else:
-            req_data = {
-                "query": """
-                query {
-                    getNewPackagingRequestIds {
-                        nextToken
-                        packagingRequestIds
-                    }
+    def get_ids():
+        req_data = {
+            "query": """
+            query {
+                getNewPackagingRequestIds(count: 1) {
+                    packagingRequestIds
                 }
-                """
             }
+            """
+        }
 
         response = requests.post(api_url, json=req_data, headers=headers)
         data = response.json()
@@ -227,16 +214,9 @@ def test_get_new_packaging_request_ids(jwt_token, api_url, warehouse_table_name)
         assert "getNewPackagingRequestIds" in data["data"]
         return data["data"]["getNewPackagingRequestIds"]
 
-    found = False
-    ids = get_ids()
-    if order_metadata["orderId"] in ids["packagingRequestIds"]:
-        found = True
-    while found == False and ids.get("nextToken", None) is not None:
-        ids = get_ids(ids["nextToken"])
-        if order_metadata["orderId"] in ids["packagingRequestIds"]:
-            found = True
-
-    assert found == True
+    # The request is leased to the first call only
+    assert get_ids()["packagingRequestIds"] == [order_metadata["orderId"]]
+    assert order_metadata["orderId"] not in get_ids()["packagingRequestIds"]
 
     # Clean database
     table.delete_item(Key={
@@ -19,6 +19,8 @@ from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.instrumentation import instrument_client, timed # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
@@ -34,6 +36,8 @@ table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.orders") # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.orders", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(dynamodb, dependency_metrics)
 
 
 with open(SCHEMA_FILE) as fp:
@@ -55,11 +59,12 @@ def validate_delivery(order: dict) -> Tuple[bool, str]:
                                    aws_service='execute-api')
 
     # Send a POST request
-    response = requests.post(
-        DELIVERY_API_URL+"/backend/pricing",
-        json={"products": order["products"], "address": order["address"]},
-        auth=iam_auth
-    )
+    with timed(dependency_metrics, "delivery.pricing"):
+        response = requests.post(
+            DELIVERY_API_URL+"/backend/pricing",
+            json={"products": order["products"], "address": order["address"]},
+            auth=iam_auth
+        )
 
     logger.debug({
         "message": "Response received from delivery",
@@ -101,11 +106,12 @@ def validate_payment(order: dict) -> Tuple[bool, str]:
                                    aws_service='execute-api')
 
     # Send a POST request
-    response = requests.post(
-        PAYMENT_API_URL+"/backend/validate",
-        json={"paymentToken": order["paymentToken"], "total": order["total"]},
-        auth=iam_auth
-    )
+    with timed(dependency_metrics, "payment.validate"):
+        response = requests.post(
+            PAYMENT_API_URL+"/backend/validate",
+            json={"paymentToken": order["paymentToken"], "total": order["total"]},
+            auth=iam_auth
+        )
 
     logger.debug({
         "message": "Response received from payment",
@@ -146,11 +152,12 @@ def validate_products(order: dict) -> Tuple[bool, str]:
                                    aws_region=region,
                                    aws_service='execute-api')
     # Send a POST request
-    response = requests.post(
-        PRODUCTS_API_URL+"/backend/validate",
-        json={"products": order["products"]},
-        auth=iam_auth
-    )
+    with timed(dependency_metrics, "products.validate"):
+        response = requests.post(
+            PRODUCTS_API_URL+"/backend/validate",
+            json={"products": order["products"]},
+            auth=iam_auth
+        )
 
     logger.debug({
         "message": "Response received from products",
@@ -235,6 +242,7 @@ def store_order(order: dict) -> None:
     table.put_item(Item=order)
 
 
+@dependency_metrics.log_metrics
 @metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
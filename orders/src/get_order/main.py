@@ -4,21 +4,33 @@ GetOrdersFunction
 
 
 import os
-from typing import Optional
+from typing import Optional, Tuple
 import boto3
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
-from ecom.apigateway import iam_user_id, response # pylint: disable=import-error
+from ecom.apigateway import etag, iam_user_id, is_not_modified, response # pylint: disable=import-error
+from ecom.cache import TTLCache # pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+# Several services retrieve the same order within seconds. Entries are not
+# invalidated when orders change: the short TTL bounds staleness in every
+# execution environment, and clients revalidate with If-None-Match.
+ORDER_CACHE_TTL = float(os.environ.get("ORDER_CACHE_TTL", "5"))
+ORDER_CACHE_SIZE = 1024
 
 
 dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
 table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.orders", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(dynamodb, dependency_metrics)
+# {orderId: (userId, ETag, response)}
+order_cache = TTLCache(ORDER_CACHE_TTL, ORDER_CACHE_SIZE) # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -46,6 +58,29 @@ def get_order(order_id: str) -> Optional[dict]:
     return order
 
 
+def get_order_response(order_id: str) -> Optional[Tuple[str, str, dict]]:
+    """
+    Returns the user ID, ETag and API response for an order, or None
+
+    Responses are serialized once and cached.
+    """
+
+    cached = order_cache.get(order_id, None)
+    if cached is not None:
+        return cached
+
+    order = get_order(order_id)
+    if order is None:
+        return None
+
+    retval = response(order)
+    retval["headers"]["ETag"] = etag(retval["body"])
+    cached = (order["userId"], retval["headers"]["ETag"], retval)
+    order_cache.set(order_id, cached)
+    return cached
+
+
+@dependency_metrics.log_metrics
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def handler(event, _):
@@ -76,14 +111,22 @@ def handler(event, _):
     # Set a trace annotation
     tracer.put_annotation("orderId", order_id)
 
-    # Retrieve the order from DynamoDB
-    order = get_order(order_id)
+    # Retrieve the order from the cache or DynamoDB
+    cached = get_order_response(order_id)
 
     # Check that the order can be sent to the user
     # This includes both when the item is not found and when the user IDs do
     # not match.
-    if order is None or (not iam_user and user_id != order["userId"]):
+    if cached is None or (not iam_user and user_id != cached[0]):
         return response("Order not found", 404)
 
-    # Send the response
-    return response(order)
+    # The caller already has the current version
+    if is_not_modified(event, cached[1]):
+        retval = response("Not modified", 304)
+        retval["headers"]["ETag"] = cached[1]
+        retval["body"] = ""
+        return retval
+
+    # Send the response, without sharing the cached headers
+    retval = cached[2]
+    return dict(retval, headers=dict(retval["headers"]))
@@ -0,0 +1,192 @@
+"""
+ListOrdersFunction
+"""
+
+
+import base64
+import binascii
+import json
+import os
+from typing import List, Optional, Tuple
+import boto3
+from boto3.dynamodb.conditions import Key
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.apigateway import iam_user_id, response # pylint: disable=import-error
+from ecom.dynamodb import query # pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+# Index with all attributes, used when products or addresses are requested
+USER_INDEX_NAME = os.environ["USER_INDEX_NAME"]
+# Index with the attributes needed by list views only
+SUMMARY_INDEX_NAME = os.environ["SUMMARY_INDEX_NAME"]
+ORDERS_LIMIT = int(os.environ.get("ORDERS_LIMIT", "20"))
+MAX_ORDERS_LIMIT = 100
+
+# Keys of the table and indexes, needed to build cursors
+KEY_FIELDS = {"orderId", "userId", "createdDate"}
+# Attributes projected into the summary index
+SUMMARY_FIELDS = KEY_FIELDS | {"modifiedDate", "status", "deliveryPrice", "total"}
+# Attributes that can be requested. The payment token is never listed.
+ALLOWED_FIELDS = SUMMARY_FIELDS | {"products", "address"}
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.orders", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(dynamodb, dependency_metrics)
+
+
+def encode_cursor(key: dict) -> str:
+    """
+    Returns an opaque cursor for the key of the last order of a page
+    """
+
+    data = json.dumps({k: key[k] for k in sorted(KEY_FIELDS)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, user_id: str) -> dict:
+    """
+    Returns the ExclusiveStartKey from a cursor
+
+    This raises a ValueError if the cursor is invalid or belongs to another
+    user.
+    """
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(key, dict) or set(key.keys()) != KEY_FIELDS:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, str) for v in key.values()):
+        raise ValueError("Invalid cursor")
+    if key["userId"] != user_id:
+        raise ValueError("Invalid cursor")
+
+    return key
+
+
+def parse_fields(value: Optional[str]) -> List[str]:
+    """
+    Returns the list of fields requested, or the summary fields by default
+    """
+
+    if not value:
+        return sorted(SUMMARY_FIELDS)
+
+    fields = sorted({f.strip() for f in value.split(",") if f.strip()})
+    unknown = [f for f in fields if f not in ALLOWED_FIELDS]
+    if unknown:
+        raise ValueError("Unknown fields: {}".format(", ".join(unknown)))
+    return fields
+
+
+@tracer.capture_method
+def list_orders(
+        user_id: str,
+        fields: List[str],
+        limit: int,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        start_key: Optional[dict] = None
+    ) -> Tuple[List[dict], Optional[dict]]:
+    """
+    Returns the most recent orders of a user and the key of the last one if
+    there are more
+    """
+
+    # Only read from the index with all attributes when needed, as reads are
+    # billed on the size of the items in the index.
+    index_name = SUMMARY_INDEX_NAME if set(fields) <= SUMMARY_FIELDS else USER_INDEX_NAME
+
+    condition = Key("userId").eq(user_id)
+    if start is not None and end is not None:
+        condition &= Key("createdDate").between(start, end)
+    elif start is not None:
+        condition &= Key("createdDate").gte(start)
+    elif end is not None:
+        condition &= Key("createdDate").lte(end)
+
+    kwargs = {}
+    if start_key is not None:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    # Read one more order to know if there is a next page
+    orders = list(query(
+        table,
+        IndexName=index_name,
+        KeyConditionExpression=condition,
+        ScanIndexForward=False,
+        projection=sorted(set(fields) | KEY_FIELDS),
+        page_size=limit+1,
+        limit=limit+1,
+        **kwargs
+    ))
+
+    last_key = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last_key = {k: orders[-1][k] for k in KEY_FIELDS}
+
+    return [{k: v for k, v in order.items() if k in fields} for order in orders], last_key
+
+
+@dependency_metrics.log_metrics
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for ListOrders
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    # Retrieve the userId
+    user_id = iam_user_id(event)
+    if user_id is not None:
+        logger.info({"message": "Received list orders from IAM user", "userArn": user_id})
+        tracer.put_annotation("userArn", user_id)
+        tracer.put_annotation("iamUser", True)
+    else:
+        logger.warning({"message": "User ID not found in event"})
+        return response("Unauthorized", 401)
+
+    params = event.get("queryStringParameters", None) or {}
+
+    # Retrieve the user whose orders are listed
+    order_user_id = params.get("userId", None)
+    if not order_user_id:
+        logger.warning({"message": "User ID not found in query parameters"})
+        return response("Missing userId", 400)
+
+    try:
+        fields = parse_fields(params.get("fields", None))
+        limit = int(params.get("limit", ORDERS_LIMIT))
+        if not 1 <= limit <= MAX_ORDERS_LIMIT:
+            raise ValueError("limit must be between 1 and {}".format(MAX_ORDERS_LIMIT))
+        start_key = None
+        if params.get("cursor", None):
+            start_key = decode_cursor(params["cursor"], order_user_id)
+    except ValueError as exc:
+        logger.warning({"message": "Invalid query parameters", "error": str(exc)})
+        return response(str(exc), 400)
+
+    orders, last_key = list_orders(
+        order_user_id, fields, limit,
+        params.get("from", None), params.get("to", None), start_key
+    )
+
+    retval = {"orders": orders}
+    if last_key is not None:
+        retval["cursor"] = encode_cursor(last_key)
+
+    return response(retval)
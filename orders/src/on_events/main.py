@@ -11,10 +11,12 @@ from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.idempotency import IdempotencyStore, idempotent # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
 
 
 dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
@@ -22,6 +24,7 @@ table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.orders") # pylint: disable=invalid-name
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_events") # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -72,6 +75,7 @@ def update_order(order_id: str, status: str, products: Optional[List[dict]] = No
 @metrics.log_metrics
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@idempotent(idempotency_store)
 def handler(event, _):
     """
     Lambda handler
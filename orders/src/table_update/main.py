@@ -9,17 +9,38 @@ import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from aws_lambda_powertools.tracing import Tracer
 from aws_lambda_powertools.logging.logger import Logger
-from ecom.eventbridge import ddb_to_event # pylint: disable=import-error
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from ecom.claimcheck import ClaimCheck, get_store # pylint: disable=import-error
+from ecom.eventbridge import batch_events, ddb_to_event, parse_encodings, StreamFilter # pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.logs import LazyLogger # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 EVENT_BUS_NAME = os.environ["EVENT_BUS_NAME"]
+# Optional detail encodings per detail-type, e.g. "OrderModified=zlib+json"
+DETAIL_ENCODINGS = parse_encodings(os.environ.get("DETAIL_ENCODINGS", ""))
+# Optional blob store for oversized events, e.g. "s3://bucket/orders/"
+CLAIM_CHECK_URI = os.environ.get("CLAIM_CHECK_URI", None)
 
 
 eventbridge = boto3.client("events") # pylint: disable=invalid-name
 type_deserializer = TypeDeserializer() # pylint: disable=invalid-name
 logger = Logger() # pylint: disable=invalid-name
+log = LazyLogger(logger, sample_rate=0.1) # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.orders") # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.orders", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(eventbridge, dependency_metrics)
+# Bookkeeping fields alone do not warrant an OrderModified event
+stream_filter = StreamFilter(ignored_fields=["modifiedDate"]) # pylint: disable=invalid-name
+# Oversized events only carry the fields needed for routing and idempotency
+claim_check = ClaimCheck( # pylint: disable=invalid-name
+    get_store(CLAIM_CHECK_URI),
+    keep=["orderId", "userId", "status", "modifiedDate", "changed"]
+) if CLAIM_CHECK_URI else None
 
 
 @tracer.capture_method
@@ -29,11 +50,14 @@ def send_events(events: List[dict]):
     """
 
     logger.info("Sending %d events to EventBridge", len(events))
-    # EventBridge only supports batches of up to 10 events
-    for i in range(0, len(events), 10):
-        eventbridge.put_events(Entries=events[i:i+10])
+    if claim_check is not None:
+        events = [claim_check.check_in(event) for event in events]
+    for batch in batch_events(events):
+        eventbridge.put_events(Entries=batch)
 
 
+@dependency_metrics.log_metrics
+@metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def handler(event, _):
@@ -41,25 +65,20 @@ def handler(event, _):
     Lambda function handler for Orders Table stream
     """
 
-    logger.debug({
-        "message": "Input event",
-        "event": event
-    })
-
-    logger.debug({
-        "message": "Records received",
-        "records": event.get("Records", [])
-    })
+    log.verbose("Input event", event=event)
 
     events = [
-        ddb_to_event(record, EVENT_BUS_NAME, "ecommerce.orders", "Order", "orderId")
+        ddb_to_event(record, EVENT_BUS_NAME, "ecommerce.orders", "Order", "orderId", stream_filter, DETAIL_ENCODINGS)
         for record in event.get("Records", [])
     ]
+    events = [event for event in events if event is not None]
+
+    # Report records dropped by the stream filter
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    for name, value in stream_filter.pop_counts().items():
+        metrics.add_metric(name=name, unit=MetricUnit.Count, value=value)
 
     logger.info("Received %d event(s)", len(events))
-    logger.debug({
-        "message": "Events processed from records",
-        "events": events
-    })
+    log.verbose("Events processed from records", events=events)
 
     send_events(events)
@@ -162,6 +162,46 @@ def test_handler(lambda_module, apigateway_event, order, context):
     compare_dict(order, body)
 
 
+def test_handler_cached(lambda_module, apigateway_event, order, context):
+    """
+    Test handler() with a cached order and If-None-Match
+    """
+
+    # Stub boto3
+    table = stub.Stubber(lambda_module.table.meta.client)
+    response = {
+        "Item": {k: TypeSerializer().serialize(v) for k, v in order.items()}
+    }
+    expected_params = {
+        "TableName": lambda_module.TABLE_NAME,
+        "Key": {"orderId": order["orderId"]}
+    }
+    table.add_response("get_item", response, expected_params)
+    table.activate()
+
+    # The second request is served from the cache
+    first = lambda_module.handler(apigateway_event, context)
+    second = lambda_module.handler(apigateway_event, context)
+
+    table.assert_no_pending_responses()
+
+    assert first["statusCode"] == 200
+    assert first == second
+    assert "ETag" in first["headers"]
+
+    # The caller already has this version
+    apigateway_event = copy.deepcopy(apigateway_event)
+    apigateway_event["headers"]["If-None-Match"] = first["headers"]["ETag"]
+    response = lambda_module.handler(apigateway_event, context)
+
+    assert response["statusCode"] == 304
+    assert response["body"] == ""
+    assert response["headers"]["ETag"] == first["headers"]["ETag"]
+
+    table.deactivate()
+    lambda_module.order_cache.clear()
+
+
 def test_handler_not_found(lambda_module, apigateway_event, order, context):
     """
     Test handler() with an unknown order ID
@@ -0,0 +1,230 @@
+import copy
+import datetime
+import json
+import uuid
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore import stub
+from fixtures import context, lambda_module # pylint: disable=import-error
+from helpers import compare_dict # pylint: disable=import-error,no-name-in-module
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "list_orders",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "TABLE_NAME": "TABLE_NAME",
+        "USER_INDEX_NAME": "USER_INDEX_NAME",
+        "SUMMARY_INDEX_NAME": "SUMMARY_INDEX_NAME",
+        "ORDERS_LIMIT": "2",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture
+def user_id():
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def orders(user_id):
+    """
+    Orders of a user, most recent first
+    """
+
+    now = datetime.datetime.now()
+
+    return [{
+        "orderId": str(uuid.uuid4()),
+        "userId": user_id,
+        "createdDate": (now - datetime.timedelta(days=i)).isoformat(),
+        "modifiedDate": now.isoformat(),
+        "status": "NEW",
+        "deliveryPrice": 200,
+        "total": 1400
+    } for i in range(3)]
+
+
+@pytest.fixture
+def apigateway_event(user_id):
+    """
+    API Gateway Lambda Proxy event
+    """
+
+    return {
+        "resource": "/backend/orders",
+        "path": "/backend/orders",
+        "httpMethod": "GET",
+        "headers": {},
+        "multiValueHeaders": {},
+        "queryStringParameters": {"userId": user_id},
+        "multiValueQueryStringParameters": {},
+        "pathParameters": None,
+        "stageVariables": {},
+        "requestContext": {
+            "identity": {
+                "accountId": "123456789012",
+                "caller": "CALLER",
+                "sourceIp": "127.0.0.1",
+                "accessKey": "ACCESS_KEY",
+                "userArn": "arn:aws:iam::123456789012:user/alice",
+                "userAgent": "PostmanRuntime/7.1.1",
+                "user": "CALLER"
+            }
+        },
+        "body": {},
+        "isBase64Encoded": False
+    }
+
+
+def _query_params(lambda_module, index_name, limit, **kwargs):
+    return dict({
+        "TableName": lambda_module.TABLE_NAME,
+        "IndexName": index_name,
+        "KeyConditionExpression": stub.ANY,
+        "ExpressionAttributeNames": stub.ANY,
+        "ProjectionExpression": stub.ANY,
+        "ScanIndexForward": False,
+        "Limit": limit
+    }, **kwargs)
+
+
+def test_cursor(lambda_module, orders, user_id):
+    """
+    Test encode_cursor() and decode_cursor()
+    """
+
+    cursor = lambda_module.encode_cursor(orders[0])
+
+    assert lambda_module.decode_cursor(cursor, user_id) == {
+        k: orders[0][k] for k in ["orderId", "userId", "createdDate"]
+    }
+    with pytest.raises(ValueError):
+        lambda_module.decode_cursor(cursor, str(uuid.uuid4()))
+    with pytest.raises(ValueError):
+        lambda_module.decode_cursor("not a cursor", user_id)
+    with pytest.raises(ValueError):
+        lambda_module.decode_cursor(lambda_module.encode_cursor(orders[0])[:-4], user_id)
+
+
+def test_parse_fields(lambda_module):
+    """
+    Test parse_fields()
+    """
+
+    assert lambda_module.parse_fields(None) == sorted(lambda_module.SUMMARY_FIELDS)
+    assert lambda_module.parse_fields("total, orderId,total") == ["orderId", "total"]
+    with pytest.raises(ValueError):
+        lambda_module.parse_fields("orderId,paymentToken")
+
+
+def test_list_orders(lambda_module, orders, user_id):
+    """
+    Test list_orders() with more orders than the limit
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    response = {"Items": [{k: TypeSerializer().serialize(v) for k, v in order.items()} for order in orders]}
+    table.add_response("query", response, _query_params(lambda_module, "SUMMARY_INDEX_NAME", 3))
+    table.activate()
+
+    retval, last_key = lambda_module.list_orders(user_id, ["orderId", "total"], 2)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+    assert retval == [{"orderId": o["orderId"], "total": o["total"]} for o in orders[:2]]
+    assert last_key == {k: orders[1][k] for k in ["orderId", "userId", "createdDate"]}
+
+
+def test_list_orders_full(lambda_module, orders, user_id):
+    """
+    Test list_orders() with fields outside of the summary index
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    response = {"Items": [{k: TypeSerializer().serialize(v) for k, v in order.items()} for order in orders]}
+    table.add_response("query", response, _query_params(lambda_module, "USER_INDEX_NAME", 11))
+    table.activate()
+
+    retval, last_key = lambda_module.list_orders(user_id, ["orderId", "products"], 10, start="2020-01-01")
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+    assert retval == [{"orderId": o["orderId"]} for o in orders]
+    assert last_key is None
+
+
+def test_handler(lambda_module, apigateway_event, orders, user_id, context):
+    """
+    Test handler() across two pages
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    items = [{k: TypeSerializer().serialize(v) for k, v in order.items()} for order in orders]
+    table.add_response("query", {"Items": items}, _query_params(lambda_module, "SUMMARY_INDEX_NAME", 3))
+    items = [{k: TypeSerializer().serialize(v) for k, v in orders[2].items()}]
+    table.add_response("query", {"Items": items}, _query_params(
+        lambda_module, "SUMMARY_INDEX_NAME", 3,
+        ExclusiveStartKey={k: orders[1][k] for k in ["orderId", "userId", "createdDate"]}
+    ))
+    table.activate()
+
+    response = lambda_module.handler(apigateway_event, context)
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert len(body["orders"]) == 2
+    compare_dict(orders[0], body["orders"][0])
+
+    apigateway_event = copy.deepcopy(apigateway_event)
+    apigateway_event["queryStringParameters"]["cursor"] = body["cursor"]
+    response = lambda_module.handler(apigateway_event, context)
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert [o["orderId"] for o in body["orders"]] == [orders[2]["orderId"]]
+    assert "cursor" not in body
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"limit": "0"},
+    {"limit": "abc"},
+    {"fields": "paymentToken"},
+    {"cursor": "abc"}
+])
+def test_handler_invalid(lambda_module, apigateway_event, context, params):
+    """
+    Test handler() with invalid query parameters
+    """
+
+    apigateway_event = copy.deepcopy(apigateway_event)
+    if params:
+        apigateway_event["queryStringParameters"].update(params)
+    else:
+        apigateway_event["queryStringParameters"] = None
+
+    response = lambda_module.handler(apigateway_event, context)
+
+    assert response["statusCode"] == 400
+    body = json.loads(response["body"])
+    assert isinstance(body["message"], str)
+
+
+def test_handler_forbidden(lambda_module, apigateway_event, context):
+    """
+    Test handler() without claims
+    """
+
+    apigateway_event = copy.deepcopy(apigateway_event)
+    del apigateway_event["requestContext"]["identity"]
+
+    response = lambda_module.handler(apigateway_event, context)
+
+    assert response["statusCode"] == 401
@@ -174,6 +174,37 @@ def test_send_events(lambda_module, insert_data):
     eventbridge.deactivate()
 
 
+def test_send_events_claim_check(lambda_module, insert_data, tmp_path, monkeypatch):
+    """
+    Test send_events() with an oversized event
+    """
+
+    monkeypatch.setattr(lambda_module, "claim_check", lambda_module.ClaimCheck(
+        lambda_module.get_store("file://" + str(tmp_path)), threshold=100, keep=["orderId", "status"]
+    ))
+    monkeypatch.setattr(uuid, "uuid4", lambda: "BLOB_ID")
+    order = json.loads(insert_data["event"]["Detail"])
+    path = tmp_path / "ecommerce.orders" / "OrderCreated" / order["orderId"] / "BLOB_ID.json"
+    # Source, DetailType, Detail and Resources
+    size = sum(len(insert_data["event"][k]) for k in ["Source", "DetailType", "Detail"]) + len(order["orderId"])
+
+    eventbridge = stub.Stubber(lambda_module.eventbridge)
+    expected_params = {"Entries": [dict(insert_data["event"], Detail=json.dumps({
+        "orderId": order["orderId"],
+        "status": order["status"],
+        "claimCheck": {"uri": "file://" + str(path), "size": size}
+    }))]}
+    eventbridge.add_response("put_events", {}, expected_params)
+    eventbridge.activate()
+
+    lambda_module.send_events([insert_data["event"]])
+
+    eventbridge.assert_no_pending_responses()
+    eventbridge.deactivate()
+
+    assert json.loads(path.read_text()) == order
+
+
 def test_handler(lambda_module, context, insert_data):
     """
     Test the Lambda function handler
@@ -195,4 +226,41 @@ def test_handler(lambda_module, context, insert_data):
 
     # Check that events were sent
     eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
\ No newline at end of file
+    eventbridge.deactivate()
+
+def test_handler_modified_date_only(lambda_module, context, order):
+    """
+    Test the Lambda function handler with a change on modifiedDate only
+    """
+
+    new_order = copy.deepcopy(order)
+    new_order["modifiedDate"] = (datetime.datetime.now() + datetime.timedelta(seconds=1)).isoformat()
+
+    # Prepare Lambda event and context
+    event = {"Records": [{
+        "awsRegion": "us-east-1",
+        "dynamodb": {
+            "Keys": {
+                "orderId": {"S": order["orderId"]}
+            },
+            "OldImage": {k: TypeSerializer().serialize(v) for k, v in order.items()},
+            "NewImage": {k: TypeSerializer().serialize(v) for k, v in new_order.items()},
+            "SequenceNumber": "1234567890123456789012345",
+            "SizeBytes": 123,
+            "StreamViewType": "NEW_AND_OLD_IMAGES"
+        },
+        "eventID": str(uuid.uuid4()),
+        "eventName": "MODIFY",
+        "eventSource": "aws:dynamodb",
+        "eventVersion": "1.0"
+    }]}
+
+    # Stubbing boto3: no call to put_events is expected
+    eventbridge = stub.Stubber(lambda_module.eventbridge)
+    eventbridge.activate()
+
+    # Send request
+    lambda_module.handler(event, context)
+
+    eventbridge.assert_no_pending_responses()
+    eventbridge.deactivate()
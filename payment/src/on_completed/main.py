@@ -1,73 +1,187 @@
 """
 OnCompleted Function
+
+This function supports two modes:
+ - a single DeliveryCompleted event sent directly by EventBridge
+ - batches of DeliveryCompleted events buffered in SQS
 """
 
 
+import concurrent.futures
+import json
 import os
-import boto3
-import requests
+import uuid
+from typing import List
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.idempotency import IdempotencyInProgressError, IdempotencyStore, idempotent # pylint: disable=import-error
+from ecom.payment3p import Payment3PClient # pylint: disable=import-error
+from ecom.payment_tokens import PaymentTokenStore # pylint: disable=import-error
 
 API_URL = os.environ["API_URL"]
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
+# Maximum number of concurrent calls to the 3rd party payment service
+MAX_WORKERS = 10
 
 
-dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
-table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.payment") # pylint: disable=invalid-name
+token_store = PaymentTokenStore(TABLE_NAME) # pylint: disable=invalid-name
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_completed") # pylint: disable=invalid-name
+payment3p = Payment3PClient(API_URL, metrics=metrics, pool_size=MAX_WORKERS) # pylint: disable=invalid-name
 
 @tracer.capture_method
-def get_payment_token(order_id: str) -> str:
+def process_payment(payment_token: str) -> None:
     """
-    Retrieve the paymentToken from DynamoDB
+    Process the payment against the 3rd party payment service
     """
 
-    response = table.get_item(Key={
-        "orderId": order_id
-    })
+    body = payment3p.process_payment(payment_token)
 
-    return response["Item"]["paymentToken"]
+    if not body.get("ok", False):
+        raise Exception("Failed to process payment: {}".format(body.get("message", "No error message")))
 
 
-@tracer.capture_method
-def delete_payment_token(order_id: str) -> None:
+def process_order(order_id: str, payment_token: str, owner: str) -> None:
     """
-    Delete the paymentToken in DynamoDB
+    Process the payment of an order with a claimed paymentToken
+
+    The claim is released if the payment fails, so that it can be retried.
     """
 
-    table.delete_item(Key={
-        "orderId": order_id,
-    })
+    try:
+        process_payment(payment_token)
+    except Exception:
+        token_store.release(order_id, owner)
+        raise
 
 
 @tracer.capture_method
-def process_payment(payment_token: str) -> None:
+def process_batch(records: List[dict]) -> List[str]:
     """
-    Process the payment against the 3rd party payment service
+    Process a batch of SQS messages containing DeliveryCompleted events
+
+    Returns the message IDs that failed to be processed.
     """
 
-    response = requests.post(API_URL+"/processPayment", json={
-        "paymentToken": payment_token
-    })
+    failures = []
+    # Map of order IDs to SQS message IDs
+    messages = {}
+
+    for record in records:
+        try:
+            order_id = json.loads(record["body"])["detail"]["orderId"]
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning({
+                "message": "Failed to parse SQS message {}".format(record["messageId"]),
+                "exception": str(exc)
+            })
+            failures.append(record["messageId"])
+            continue
+
+        # Duplicate within the same batch
+        if order_id in messages:
+            continue
+
+        try:
+            if not idempotency_store.start(order_id):
+                logger.info({
+                    "message": "Payment for order {} was already processed".format(order_id),
+                    "orderId": order_id
+                })
+                continue
+        except IdempotencyInProgressError:
+            failures.append(record["messageId"])
+            continue
+
+        messages[order_id] = record["messageId"]
+
+    logger.info("Processing payments for %d order(s)", len(messages))
+
+    # Keys that are started but neither processed nor released yet
+    pending = set(messages)
+    processed = []
+    futures = {}
+
+    owner = str(uuid.uuid4())
+
+    def failed(order_id: str, exc: Exception) -> None:
+        pending.discard(order_id)
+        logger.warning({
+            "message": "Failed to process payment for order {}".format(order_id),
+            "orderId": order_id,
+            "exception": str(exc)
+        })
+        idempotency_store.release(order_id)
+        failures.append(messages[order_id])
+
+    try:
+        # Claim the paymentTokens of the whole batch at once
+        payment_tokens, errors = token_store.claim_many(list(messages), owner)
+        for order_id, exc in errors.items():
+            failed(order_id, exc)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for order_id, payment_token in payment_tokens.items():
+                futures[executor.submit(process_order, order_id, payment_token, owner)] = order_id
+
+            for future in concurrent.futures.as_completed(futures):
+                order_id = futures[future]
+                try:
+                    future.result()
+                except Exception as exc: # pylint: disable=broad-except
+                    failed(order_id, exc)
+                    continue
+                pending.discard(order_id)
+                processed.append(order_id)
+    except Exception:
+        # The whole batch will be redelivered: keep payments that went through
+        # and release other keys, otherwise redeliveries would fail with
+        # IdempotencyInProgressError until the keys expire.
+        for future, order_id in futures.items():
+            if order_id in pending and future.done() and not future.cancelled() and future.exception() is None:
+                pending.discard(order_id)
+                processed.append(order_id)
+        for order_id in pending:
+            idempotency_store.release(order_id)
+        raise
+    finally:
+        # Mark orders as completed first: if deleting tokens fails, retries should
+        # not process the payment again. Tokens of paid orders are deleted even
+        # if the batch failed, as redeliveries skip completed orders.
+        for order_id in processed:
+            idempotency_store.complete(order_id)
+        token_store.delete_many(processed)
 
-    if not response.json().get("ok", False):
-        raise Exception("Failed to process payment: {}".format(response.json().get("message", "No error message")))
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    metrics.add_metric(name="paymentProcessed", unit=MetricUnit.Count, value=len(processed))
+
+    return failures
 
 
 @metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+# An order payment can only be processed once. SQS batches have no 'detail'
+# and handle idempotency per message.
+@idempotent(idempotency_store, key=lambda event: event.get("detail", {}).get("orderId", None))
 def handler(event, _):
     """
     Lambda handler
     """
 
+    # Batch mode
+    if "Records" in event:
+        failures = process_batch(event["Records"])
+        return {
+            "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]
+        }
+
     order_id = event["detail"]["orderId"]
 
     logger.info({
@@ -79,9 +193,9 @@ def handler(event, _):
         "event": event
     })
 
-    payment_token = get_payment_token(order_id)
-    process_payment(payment_token)
-    delete_payment_token(order_id)
+    # The paymentToken is only deleted once the payment succeeded
+    with token_store.consume(order_id) as payment_token:
+        process_payment(payment_token)
 
     # Add custom metrics
     metrics.add_dimension(name="environment", value=ENVIRONMENT)
@@ -4,43 +4,38 @@ OnCreated Function
 
 
 import os
-import boto3
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.claimcheck import LazyDetail # pylint: disable=import-error
+from ecom.idempotency import IdempotencyStore, idempotent # pylint: disable=import-error
+from ecom.payment_tokens import PaymentTokenStore # pylint: disable=import-error
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
 
 
-dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
-table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.payment") # pylint: disable=invalid-name
-
-@tracer.capture_method
-def save_payment_token(order_id: str, payment_token: str) -> None:
-    """
-    Save the paymentToken in DynamoDB
-    """
-
-    table.put_item(Item={
-        "orderId": order_id,
-        "paymentToken": payment_token
-    })
+token_store = PaymentTokenStore(TABLE_NAME) # pylint: disable=invalid-name
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_created") # pylint: disable=invalid-name
 
 @metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+# A payment token can only be saved once per order
+@idempotent(idempotency_store, key=lambda event: event["detail"]["orderId"])
 def handler(event, _):
     """
     Lambda handler
     """
 
-    order_id = event["detail"]["orderId"]
-    payment_token = event["detail"]["paymentToken"]
+    detail = LazyDetail(event["detail"])
+    order_id = detail["orderId"]
+    payment_token = detail["paymentToken"]
 
     logger.info({
         "message": "Received new order {}".format(order_id),
@@ -48,7 +43,7 @@ def handler(event, _):
         "paymentToken": payment_token
     })
 
-    save_payment_token(order_id, payment_token)
+    token_store.save(order_id, payment_token)
 
     # Add custom metrics
     metrics.add_dimension(name="environment", value=ENVIRONMENT)
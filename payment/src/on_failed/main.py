@@ -4,47 +4,26 @@ OnFailed Function
 
 
 import os
-import boto3
-import requests
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.idempotency import IdempotencyStore, idempotent # pylint: disable=import-error
+from ecom.payment3p import Payment3PClient # pylint: disable=import-error
+from ecom.payment_tokens import PaymentTokenStore # pylint: disable=import-error
 
 API_URL = os.environ["API_URL"]
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
 
 
-dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
-table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.payment") # pylint: disable=invalid-name
-
-
-@tracer.capture_method
-def get_payment_token(order_id: str) -> str:
-    """
-    Retrieve the paymentToken from DynamoDB
-    """
-
-    response = table.get_item(Key={
-        "orderId": order_id
-    })
-
-    return response["Item"]["paymentToken"]
-
-
-@tracer.capture_method
-def delete_payment_token(order_id: str) -> None:
-    """
-    Delete the paymentToken in DynamoDB
-    """
-
-    table.delete_item(Key={
-        "orderId": order_id,
-    })
+token_store = PaymentTokenStore(TABLE_NAME) # pylint: disable=invalid-name
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_failed") # pylint: disable=invalid-name
+payment3p = Payment3PClient(API_URL, metrics=metrics) # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -53,17 +32,17 @@ def cancel_payment(payment_token: str) -> None:
     Cancel the payment request
     """
 
-    response = requests.post(API_URL+"/cancelPayment", json={
-        "paymentToken": payment_token
-    })
+    body = payment3p.cancel_payment(payment_token)
 
-    if not response.json().get("ok", False):
-        raise Exception("Failed to process payment: {}".format(response.json().get("message", "No error message")))
+    if not body.get("ok", False):
+        raise Exception("Failed to process payment: {}".format(body.get("message", "No error message")))
 
 
 @metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+# An order payment can only be cancelled once
+@idempotent(idempotency_store, key=lambda event: event["detail"]["orderId"])
 def handler(event, _):
     """
     Lambda handler
@@ -76,9 +55,9 @@ def handler(event, _):
         "orderId": order_id
     })
 
-    payment_token = get_payment_token(order_id)
-    cancel_payment(payment_token)
-    delete_payment_token(order_id)
+    # The paymentToken is only deleted once the cancellation succeeded
+    with token_store.consume(order_id) as payment_token:
+        cancel_payment(payment_token)
 
     # Add custom metrics
     amount_lost = event["detail"]["total"]
@@ -4,37 +4,28 @@ OnModified Function
 
 
 import os
-import boto3
-import requests
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
 from aws_lambda_powertools import Metrics # pylint: disable=import-error
 from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.claimcheck import LazyDetail # pylint: disable=import-error
+from ecom.idempotency import IdempotencyStore, idempotent # pylint: disable=import-error
+from ecom.payment3p import Payment3PClient # pylint: disable=import-error
+from ecom.payment_tokens import PaymentTokenStore # pylint: disable=import-error
 
 
 API_URL = os.environ["API_URL"]
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+IDEMPOTENCY_TABLE_NAME = os.environ.get("IDEMPOTENCY_TABLE_NAME", None)
 
 
-dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
-table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 metrics = Metrics(namespace="ecommerce.payment") # pylint: disable=invalid-name
-
-
-@tracer.capture_method
-def get_payment_token(order_id: str) -> str:
-    """
-    Retrieve the paymentToken from DynamoDB
-    """
-
-    response = table.get_item(Key={
-        "orderId": order_id
-    })
-
-    return response["Item"]["paymentToken"]
+token_store = PaymentTokenStore(TABLE_NAME) # pylint: disable=invalid-name
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TABLE_NAME, namespace="on_modified") # pylint: disable=invalid-name
+payment3p = Payment3PClient(API_URL, metrics=metrics) # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -43,12 +34,7 @@ def update_payment_amount(payment_token: str, amount: int) -> None:
     Update the payment amount
     """
 
-    response = requests.post(API_URL+"/updateAmount", json={
-        "paymentToken": payment_token,
-        "amount": amount
-    })
-
-    body = response.json()
+    body = payment3p.update_amount(payment_token, amount)
     if "message" in body:
         raise Exception("Error updating amount: {}".format(body["message"]))
 
@@ -56,14 +42,16 @@ def update_payment_amount(payment_token: str, amount: int) -> None:
 @metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
+@idempotent(idempotency_store)
 def handler(event, _):
     """
     Lambda handler
     """
 
-    order_id = event["detail"]["new"]["orderId"]
-    new_total = event["detail"]["new"]["total"]
-    old_total = event["detail"]["old"]["total"]
+    detail = LazyDetail(event["detail"])
+    order_id = detail["new"]["orderId"]
+    new_total = detail["new"]["total"]
+    old_total = detail["old"]["total"]
 
     logger.info({
         "message": "Received modification of order {}".format(order_id),
@@ -72,7 +60,7 @@ def handler(event, _):
         "new_amount": new_total
     })
 
-    payment_token = get_payment_token(order_id)
+    payment_token = token_store.get(order_id)
     update_payment_amount(payment_token, new_total)
 
     # Add custom metrics
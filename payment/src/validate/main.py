@@ -4,18 +4,28 @@ ValidateFunction
 
 import json
 import os
-import requests
 from aws_lambda_powertools.tracing import Tracer #pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger #pylint: disable=import-error
+from aws_lambda_powertools import Metrics # pylint: disable=import-error
+from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
 from ecom.apigateway import iam_user_id, response # pylint: disable=import-error
+from ecom.cache import TTLCache # pylint: disable=import-error
+from ecom.payment3p import Payment3PClient, Payment3PError # pylint: disable=import-error
 
 
 API_URL = os.environ["API_URL"]
 ENVIRONMENT = os.environ["ENVIRONMENT"]
+# Clients retry order creation with the same token and total after other
+# validation errors. Only positive results are cached, for a short time.
+VALIDATION_CACHE_TTL = 60
+VALIDATION_CACHE_SIZE = 1024
 
 
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.payment") # pylint: disable=invalid-name
+payment3p = Payment3PClient(API_URL, metrics=metrics) # pylint: disable=invalid-name
+validation_cache = TTLCache(VALIDATION_CACHE_TTL, VALIDATION_CACHE_SIZE) # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -24,22 +34,28 @@ def validate_payment_token(payment_token: str, total: int) -> bool:
     Validate a payment token for a given total
     """
 
-    # Send the request to the 3p service
-    res = requests.post(API_URL+"/check", json={
-        "paymentToken": payment_token,
-        "amount": total
-    })
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    if validation_cache.get((payment_token, total), False):
+        metrics.add_metric(name="paymentValidationCacheHit", unit=MetricUnit.Count, value=1)
+        return True
+    metrics.add_metric(name="paymentValidationCacheMiss", unit=MetricUnit.Count, value=1)
 
-    body = res.json()
+    # Send the request to the 3p service
+    body = payment3p.check(payment_token, total)
     if "ok" not in body:
         logger.error({
             "message": "Missing 'ok' in 3rd party response body",
             "body": body,
             "paymentToken": payment_token
         })
-    return body.get("ok", False)
+
+    valid = body.get("ok", False)
+    if valid:
+        validation_cache.set((payment_token, total), True)
+    return valid
 
 
+@metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def handler(event, _):
@@ -67,7 +83,14 @@ def handler(event, _):
             })
             return response("Missing '{}' in request body.".format(key), 400)
 
-    valid = validate_payment_token(body["paymentToken"], body["total"])
+    try:
+        valid = validate_payment_token(body["paymentToken"], body["total"])
+    except Payment3PError as exc:
+        logger.error({
+            "message": "Failed to contact the 3rd party payment service",
+            "exception": str(exc)
+        })
+        return response("Payment service unavailable", 503)
 
     return response({
         "ok": valid
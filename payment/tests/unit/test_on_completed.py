@@ -1,10 +1,10 @@
+import contextlib
 import json
 import requests
 import requests_mock
 import uuid
 import pytest
 from fixtures import context, lambda_module # pylint: disable=import-error
-from helpers import mock_table # pylint: disable=import-error,no-name-in-module
 
 
 lambda_module = pytest.fixture(scope="module", params=[{
@@ -29,65 +29,6 @@ def payment_token():
     return str(uuid.uuid4())
 
 
-def test_get_payment_token(lambda_module, order_id, payment_token):
-    """
-    Test get_payment_token()
-    """
-
-    table = mock_table(
-        lambda_module.table,
-        action="get_item",
-        keys=["orderId"],
-        items={"orderId": order_id, "paymentToken": payment_token}
-    )
-
-    response = lambda_module.get_payment_token(order_id)
-
-    assert response == payment_token
-
-    table.assert_no_pending_responses()
-    table.deactivate()
-
-
-def test_get_payment_token_no_item(lambda_module, order_id, payment_token):
-    """
-    Test get_payment_token() without an item
-    """
-
-    table = mock_table(
-        lambda_module.table,
-        action="get_item",
-        keys=["orderId"]
-    )
-
-    try:
-        lambda_module.get_payment_token(order_id)
-        assert 1 == 2
-    except:
-        pass
-
-    table.assert_no_pending_responses()
-    table.deactivate()
-
-
-def test_delete_payment_token(lambda_module, order_id, payment_token):
-    """
-    Test delete_payment_token()
-    """
-
-    table = mock_table(
-        lambda_module.table,
-        action="delete_item",
-        keys=["orderId"],
-        items={"orderId": order_id, "paymentToken": payment_token}
-    )
-
-    lambda_module.delete_payment_token(order_id)
-
-    table.assert_no_pending_responses()
-    table.deactivate()
-
-
 def test_process_payment(lambda_module, payment_token):
     """
     Test process_payment()
@@ -148,21 +89,130 @@ def test_handler(monkeypatch, lambda_module, context, order_id, payment_token):
         called.append("process_payment")
         assert p == payment_token
 
-    def get_payment_token(o: str) -> str:
-        called.append("get_payment_token")
-        assert o == order_id
-        return payment_token
-
-    def delete_payment_token(o: str) -> str:
-        called.append("delete_payment_token")
+    @contextlib.contextmanager
+    def consume(o: str):
+        called.append("consume")
         assert o == order_id
+        yield payment_token
 
-    monkeypatch.setattr(lambda_module, "get_payment_token", get_payment_token)
-    monkeypatch.setattr(lambda_module, "delete_payment_token", delete_payment_token)
+    monkeypatch.setattr(lambda_module.token_store, "consume", consume)
     monkeypatch.setattr(lambda_module, "process_payment", process_payment)
 
     lambda_module.handler(event, context)
 
     assert "process_payment" in called
-    assert "get_payment_token" in called
-    assert "delete_payment_token" in called
\ No newline at end of file
+    assert "consume" in called
+
+
+def test_handler_batch(monkeypatch, lambda_module, context, payment_token):
+    """
+    Test handler() with a batch of SQS messages
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(3)]
+    records = [{
+        "messageId": "MESSAGE_{}".format(i),
+        "body": json.dumps({
+            "source": "ecommerce.delivery",
+            "detail-type": "DeliveryCompleted",
+            "resources": [order_id],
+            "detail": {"orderId": order_id}
+        })
+    } for i, order_id in enumerate(order_ids)]
+    records.append({"messageId": "MESSAGE_INVALID", "body": "{}"})
+
+    processed = []
+    deleted = []
+    def process_payment(p: str) -> None:
+        if p == order_ids[1]:
+            raise Exception("Failed to process payment")
+        processed.append(p)
+
+    # Use the order ID as the payment token, the last order has no token
+    claims = []
+    def claim_many(order_ids_: list, owner: str) -> tuple:
+        claims.append(order_ids_)
+        tokens = {o: o for o in order_ids_ if o != order_ids[2]}
+        errors = {o: Exception("No paymentToken for order {}".format(o)) for o in order_ids_ if o not in tokens}
+        return tokens, errors
+
+    released = []
+    monkeypatch.setattr(lambda_module.token_store, "claim_many", claim_many)
+    monkeypatch.setattr(lambda_module.token_store, "release", lambda o, owner: released.append(o))
+    monkeypatch.setattr(lambda_module.token_store, "delete_many", deleted.extend)
+    monkeypatch.setattr(lambda_module, "process_payment", process_payment)
+
+    response = lambda_module.handler({"Records": records}, context)
+
+    assert processed == [order_ids[0]]
+    assert deleted == [order_ids[0]]
+    # Tokens are claimed in one call
+    assert claims == [order_ids]
+    # Claims are released when the payment fails
+    assert released == [order_ids[1]]
+    assert sorted(response["batchItemFailures"], key=lambda x: x["itemIdentifier"]) == [
+        {"itemIdentifier": "MESSAGE_1"},
+        {"itemIdentifier": "MESSAGE_2"},
+        {"itemIdentifier": "MESSAGE_INVALID"}
+    ]
+
+    # Successful orders are not processed again, failed ones are retried
+    processed.clear()
+    response = lambda_module.handler({"Records": records[:2]}, context)
+    assert processed == []
+    assert response["batchItemFailures"] == [{"itemIdentifier": "MESSAGE_1"}]
+
+
+def test_handler_batch_error(monkeypatch, lambda_module, context):
+    """
+    Test that keys are completed or released and tokens of paid orders are
+    deleted when a batch fails as a whole
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(2)]
+    records = [{
+        "messageId": "MESSAGE_{}".format(i),
+        "body": json.dumps({"detail": {"orderId": order_id}})
+    } for i, order_id in enumerate(order_ids)]
+
+    processed = []
+    def process_payment(p: str) -> None:
+        if p == order_ids[1]:
+            raise Exception("Failed to process payment")
+        processed.append(p)
+
+    def as_completed(futures):
+        raise RuntimeError("Unexpected error")
+
+    released = []
+    release = lambda_module.idempotency_store.release
+    def record_release(o):
+        released.append(o)
+        release(o)
+
+    deleted = []
+    monkeypatch.setattr(lambda_module.token_store, "claim_many", lambda o, owner: ({i: i for i in o}, {}))
+    monkeypatch.setattr(lambda_module.token_store, "release", lambda o, owner: None)
+    monkeypatch.setattr(lambda_module.token_store, "delete_many", deleted.extend)
+    monkeypatch.setattr(lambda_module, "process_payment", process_payment)
+    monkeypatch.setattr(lambda_module.idempotency_store, "release", record_release)
+    monkeypatch.setattr(lambda_module.concurrent.futures, "as_completed", as_completed)
+
+    with pytest.raises(RuntimeError):
+        lambda_module.handler({"Records": records}, context)
+    assert processed == [order_ids[0]]
+    assert released == [order_ids[1]]
+    # The token of the paid order is not left behind
+    assert deleted == [order_ids[0]]
+
+    # The redelivered batch only retries the failed payment
+    monkeypatch.undo()
+    processed.clear()
+    monkeypatch.setattr(lambda_module.token_store, "claim_many", lambda o, owner: ({i: i for i in o}, {}))
+    monkeypatch.setattr(lambda_module.token_store, "delete_many", lambda o: None)
+    monkeypatch.setattr(lambda_module, "process_payment", processed.append)
+
+    response = lambda_module.handler({"Records": records}, context)
+
+    assert processed == [order_ids[1]]
+    assert response["batchItemFailures"] == []
@@ -25,19 +25,29 @@ def payment_token():
     return str(uuid.uuid4())
 
 
-def test_save_payment_token(lambda_module, order_id, payment_token):
+def test_handler_table(lambda_module, context, order_id, payment_token):
     """
-    Test save_payment_token()
+    Test handler() saving the paymentToken
     """
 
+    event = {
+        "source": "ecommerce.orders",
+        "detail-type": "OrderCreated",
+        "resources": [order_id],
+        "detail": {
+            "orderId": order_id,
+            "paymentToken": payment_token
+        }
+    }
+
     table = mock_table(
-        lambda_module.table,
+        lambda_module.token_store.table,
         action="put_item",
         keys=["orderId"],
         items={"orderId": order_id, "paymentToken": payment_token}
     )
 
-    lambda_module.save_payment_token(order_id, payment_token)
+    lambda_module.handler(event, context)
 
     table.assert_no_pending_responses()
     table.deactivate()
@@ -58,10 +68,10 @@ def test_handler(monkeypatch, lambda_module, context, order_id, payment_token):
         }
     }
 
-    def save_payment_token(o: str, p: str):
+    def save(o: str, p: str):
         assert o == order_id
         assert p == payment_token
 
-    monkeypatch.setattr(lambda_module, "save_payment_token", save_payment_token)
+    monkeypatch.setattr(lambda_module.token_store, "save", save)
 
     lambda_module.handler(event, context)
\ No newline at end of file
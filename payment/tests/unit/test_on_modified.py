@@ -4,7 +4,6 @@ import pytest
 import requests
 import requests_mock
 from fixtures import context, lambda_module # pylint: disable=import-error
-from helpers import mock_table # pylint: disable=import-error,no-name-in-module
 
 
 lambda_module = pytest.fixture(scope="module", params=[{
@@ -29,47 +28,6 @@ def payment_token():
     return str(uuid.uuid4())
 
 
-def test_get_payment_token(lambda_module, order_id, payment_token):
-    """
-    Test get_payment_token()
-    """
-
-    table = mock_table(
-        lambda_module.table,
-        action="get_item",
-        keys=["orderId"],
-        items={"orderId": order_id, "paymentToken": payment_token}
-    )
-
-    response = lambda_module.get_payment_token(order_id)
-
-    assert response == payment_token
-
-    table.assert_no_pending_responses()
-    table.deactivate()
-
-
-def test_get_payment_token_no_item(lambda_module, order_id, payment_token):
-    """
-    Test get_payment_token() without an item
-    """
-
-    table = mock_table(
-        lambda_module.table,
-        action="get_item",
-        keys=["orderId"]
-    )
-
-    try:
-        lambda_module.get_payment_token(order_id)
-        assert 1 == 2
-    except:
-        pass
-
-    table.assert_no_pending_responses()
-    table.deactivate()
-
-
 def test_update_payment_amount(lambda_module, payment_token):
     """
     Test update_payment_amount()
@@ -137,16 +95,16 @@ def test_handler(monkeypatch, lambda_module, context, order_id, payment_token):
         assert a == 200
         assert p == payment_token
 
-    def get_payment_token(o: str) -> str:
-        called.append("get_payment_token")
+    def get(o: str) -> str:
+        called.append("get")
         assert o == order_id
         return payment_token
 
 
-    monkeypatch.setattr(lambda_module, "get_payment_token", get_payment_token)
+    monkeypatch.setattr(lambda_module.token_store, "get", get)
     monkeypatch.setattr(lambda_module, "update_payment_amount", update_payment_amount)
 
     lambda_module.handler(event, context)
 
     assert "update_payment_amount" in called
-    assert "get_payment_token" in called
+    assert "get" in called
@@ -46,6 +46,38 @@ def test_validate_payment_token(lambda_module, payment_token, total):
     assert ok == True
 
 
+def test_validate_payment_token_cached(lambda_module, payment_token, total):
+    """
+    Test validate_payment_token() with a cached positive result
+    """
+
+    url = "mock://API_URL/check"
+
+    with requests_mock.Mocker() as m:
+        m.post(url, text=json.dumps({"ok": True}))
+        assert lambda_module.validate_payment_token(payment_token, total) == True
+        assert lambda_module.validate_payment_token(payment_token, total) == True
+        # A different total is not cached
+        assert lambda_module.validate_payment_token(payment_token, total+1) == True
+
+    assert m.call_count == 2
+
+
+def test_validate_payment_false_not_cached(lambda_module, payment_token, total):
+    """
+    Test that validate_payment_token() does not cache negative results
+    """
+
+    url = "mock://API_URL/check"
+
+    with requests_mock.Mocker() as m:
+        m.post(url, text=json.dumps({"ok": False}))
+        assert lambda_module.validate_payment_token(payment_token, total) == False
+        assert lambda_module.validate_payment_token(payment_token, total) == False
+
+    assert m.call_count == 2
+
+
 def test_validate_payment_false(lambda_module, payment_token, total):
     """
     Test validate_payment_token() with a not ok result
@@ -111,6 +143,32 @@ def test_handler(monkeypatch, lambda_module, context, apigateway_event, payment_
     assert body["ok"] == True
 
 
+def test_handler_unavailable(monkeypatch, lambda_module, context, apigateway_event, payment_token, total):
+    """
+    Test handler() when the 3rd party payment service is unavailable
+    """
+
+    def validate_payment_token(pt: str, a: int) -> bool:
+        raise lambda_module.Payment3PError("Circuit open")
+
+    monkeypatch.setattr(lambda_module, "validate_payment_token", validate_payment_token)
+
+    event = apigateway_event(
+        iam="USER_ARN",
+        body=json.dumps({
+            "paymentToken": payment_token,
+            "total": total
+        })
+    )
+
+    response = lambda_module.handler(event, context)
+
+    assert response["statusCode"] == 503
+    body = json.loads(response["body"])
+    assert "ok" not in body
+    assert "message" in body
+
+
 def test_handler_no_iam(monkeypatch, lambda_module, context, apigateway_event, payment_token, total):
     """
     Test handler() without IAM
@@ -10,6 +10,9 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.dynamodb import query # pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
@@ -22,6 +25,9 @@ dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
 table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.platform", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(apigwmgmt, dependency_metrics)
+instrument_client(dynamodb, dependency_metrics)
 
 
 @tracer.capture_method
@@ -30,14 +36,14 @@ def get_connection_ids(service_name: str) -> List[str]:
     Retrieve connection IDs for a service name
     """
 
-    res = table.query(
+    return [c["id"] for c in query(
+        table,
         IndexName="listener-service",
         KeyConditionExpression=Key("service").eq(service_name),
-        # Only check for 100 connections
-        Limit=100
-    )
-
-    return [c["id"] for c in res.get("Items", [])]
+        projection=["id"],
+        page_size=100,
+        max_page_size=1000
+    )]
 
 
 @tracer.capture_method
@@ -58,6 +64,7 @@ def send_event(event: dict, connection_ids: List[str]):
             continue
 
 
+@dependency_metrics.log_metrics
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def handler(event, _):
@@ -39,6 +39,8 @@ def test_get_connection_ids(lambda_module):
         "TableName": "TABLE_NAME",
         "IndexName": "listener-service",
         "KeyConditionExpression": stub.ANY,
+        "ProjectionExpression": "#proj0",
+        "ExpressionAttributeNames": {"#proj0": "id"},
         "Limit": stub.ANY
     }
     table.add_response("query", response, expected_params)
@@ -0,0 +1,51 @@
+"""
+GetCategoryPageFunction
+"""
+
+
+import json
+import os
+import boto3
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.category_pages import CategoryPages, DynamoDBPageStore, MAX_PAGE_SIZE # pylint: disable=import-error
+from ecom.helpers import Encoder # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+CATEGORY_PAGES_TABLE_NAME = os.environ["CATEGORY_PAGES_TABLE_NAME"]
+PAGE_LIMIT = int(os.environ.get("PAGE_LIMIT", "20"))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+category_pages = CategoryPages(DynamoDBPageStore(dynamodb.Table(CATEGORY_PAGES_TABLE_NAME))) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the getProductsByCategory AppSync resolver
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    # Results beyond the size of a page would need more reads
+    limit = event.get("limit", None) or PAGE_LIMIT
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    products, cursor = category_pages.get(event["category"], limit=limit, cursor=event.get("nextToken", None))
+
+    logger.info({
+        "message": "Found {} products".format(len(products)),
+        "category": event["category"],
+        "hasNextPage": cursor is not None
+    })
+
+    # Decimals cannot be serialized by the Lambda runtime
+    retval = {"products": json.loads(json.dumps(products, cls=Encoder))}
+    if cursor is not None:
+        retval["nextToken"] = cursor
+    return retval
@@ -0,0 +1,62 @@
+"""
+OnEventsFunction
+"""
+
+
+import os
+import boto3
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from aws_lambda_powertools import Metrics # pylint: disable=import-error
+from aws_lambda_powertools.metrics import MetricUnit # pylint: disable=import-error
+from ecom.category_pages import CategoryPages, DynamoDBPageStore # pylint: disable=import-error
+from ecom.eventbridge import decode_detail # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+CATEGORY_PAGES_TABLE_NAME = os.environ["CATEGORY_PAGES_TABLE_NAME"]
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+category_pages = CategoryPages(DynamoDBPageStore(dynamodb.Table(CATEGORY_PAGES_TABLE_NAME))) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.products") # pylint: disable=invalid-name
+
+
+@metrics.log_metrics(raise_on_empty_metrics=False)
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda handler
+
+    Updates are idempotent, so redelivered events are safe to process again.
+    """
+
+    product_id = event["resources"][0]
+    detail = decode_detail(event["detail"])
+
+    if event["detail-type"] == "ProductCreated":
+        old, new = None, detail
+    elif event["detail-type"] == "ProductModified":
+        old, new = detail["old"], detail["new"]
+    elif event["detail-type"] == "ProductDeleted":
+        old, new = detail, None
+    else:
+        logger.warning({
+            "message": "Unknown event type {} for product {}".format(event["detail-type"], product_id),
+            "eventType": event["detail-type"],
+            "productId": product_id
+        })
+        return
+
+    written = category_pages.update(product_id, old, new)
+
+    logger.info({
+        "message": "Updated {} category page(s) for product {}".format(written, product_id),
+        "eventType": event["detail-type"],
+        "productId": product_id
+    })
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    metrics.add_metric(name="categoryPagesWritten", unit=MetricUnit.Count, value=written)
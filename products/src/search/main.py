@@ -0,0 +1,101 @@
+"""
+SearchFunction
+"""
+
+
+import json
+import os
+import time
+from typing import List
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from aws_lambda_powertools.tracing import Tracer
+from aws_lambda_powertools.logging.logger import Logger
+from ecom.helpers import Encoder # pylint: disable=import-error
+from ecom.search import DynamoDBSearchIndex, search # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+SEARCH_TABLE_NAME = os.environ["SEARCH_TABLE_NAME"]
+SEARCH_LIMIT = int(os.environ.get("SEARCH_LIMIT", "20"))
+# BatchGetItem supports up to 100 keys
+MAX_SEARCH_LIMIT = 100
+# Unprocessed keys are retried with exponential backoff, up to 1.55 seconds
+BATCH_GET_RETRIES = 5
+BATCH_GET_BACKOFF = 0.05
+
+
+dynamodb = boto3.client("dynamodb") # pylint: disable=invalid-name
+search_index = DynamoDBSearchIndex(boto3.resource("dynamodb").Table(SEARCH_TABLE_NAME)) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+type_deserializer = TypeDeserializer() # pylint: disable=invalid-name
+
+
+@tracer.capture_method
+def get_products(product_ids: List[str]) -> List[dict]:
+    """
+    Returns products in the same order as the product IDs
+
+    Products deleted since they were indexed are left out. This raises a
+    RuntimeError if some products are still unprocessed after all retries.
+    """
+
+    if not product_ids:
+        return []
+
+    request = {TABLE_NAME: {"Keys": [{"productId": {"S": product_id}} for product_id in product_ids]}}
+    products = {}
+    attempt = 0
+    while request:
+        if attempt > 0:
+            if attempt > BATCH_GET_RETRIES:
+                raise RuntimeError("Failed to read {} product(s) after {} retries".format(
+                    len(request[TABLE_NAME]["Keys"]), BATCH_GET_RETRIES
+                ))
+            time.sleep(BATCH_GET_BACKOFF * 2**(attempt-1))
+        attempt += 1
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get("Responses", {}).get(TABLE_NAME, []):
+            products[item["productId"]["S"]] = {k: type_deserializer.deserialize(v) for k, v in item.items()}
+        request = response.get("UnprocessedKeys", None)
+
+    # Decimals cannot be serialized by the Lambda runtime
+    return json.loads(json.dumps(
+        [products[product_id] for product_id in product_ids if product_id in products],
+        cls=Encoder
+    ))
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the searchProducts AppSync resolver
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    limit = event.get("limit", None) or SEARCH_LIMIT
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    results, cursor = search(
+        search_index,
+        event.get("query", None) or "",
+        tags=event.get("tags", None),
+        category=event.get("category", None),
+        limit=limit,
+        cursor=event.get("nextToken", None)
+    )
+
+    logger.info({
+        "message": "Found {} products".format(len(results)),
+        "query": event.get("query", None),
+        "hasNextPage": cursor is not None
+    })
+
+    retval = {"products": get_products([r["productId"] for r in results])}
+    if cursor is not None:
+        retval["nextToken"] = cursor
+    return retval
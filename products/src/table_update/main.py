@@ -4,22 +4,45 @@ TableUpdateFunction
 
 
 import os
-from typing import List
+from typing import List, Optional
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from aws_lambda_powertools.tracing import Tracer
 from aws_lambda_powertools.logging.logger import Logger
-from ecom.eventbridge import ddb_to_event # pylint: disable=import-error
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from ecom.eventbridge import batch_events, ddb_to_event, parse_encodings, StreamFilter # pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.logs import LazyLogger # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
+from ecom.search import DynamoDBSearchIndex # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 EVENT_BUS_NAME = os.environ["EVENT_BUS_NAME"]
+# Optional detail encodings per detail-type, e.g. "ProductModified=zlib+json"
+DETAIL_ENCODINGS = parse_encodings(os.environ.get("DETAIL_ENCODINGS", ""))
+# Table of the product search index, kept up to date from the stream
+SEARCH_TABLE_NAME = os.environ.get("SEARCH_TABLE_NAME", None)
+# Fields used by the search index, see ecom.search
+SEARCH_FIELDS = ["name", "tags", "category"]
 
 
 eventbridge = boto3.client("events") # pylint: disable=invalid-name
 type_deserializer = TypeDeserializer() # pylint: disable=invalid-name
 logger = Logger() # pylint: disable=invalid-name
+log = LazyLogger(logger, sample_rate=0.1) # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.products") # pylint: disable=invalid-name
+dependency_metrics = MetricsAggregator(namespace="ecommerce.products", dimensions={"environment": ENVIRONMENT}) # pylint: disable=invalid-name
+instrument_client(eventbridge, dependency_metrics)
+search_index = None # pylint: disable=invalid-name
+if SEARCH_TABLE_NAME:
+    dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+    search_index = DynamoDBSearchIndex(dynamodb.Table(SEARCH_TABLE_NAME)) # pylint: disable=invalid-name,no-member
+    instrument_client(dynamodb, dependency_metrics)
+# Bookkeeping fields alone do not warrant a ProductModified event
+stream_filter = StreamFilter(ignored_fields=["modifiedDate"]) # pylint: disable=invalid-name
 
 
 @tracer.capture_method
@@ -29,11 +52,38 @@ def send_events(events: List[dict]):
     """
 
     logger.info("Sending %d events to EventBridge", len(events))
-    # EventBridge only supports batches of up to 10 events
-    for i in range(0, len(events), 10):
-        eventbridge.put_events(Entries=events[i:i+10])
+    for batch in batch_events(events):
+        eventbridge.put_events(Entries=batch)
 
 
+def _search_image(record: dict, name: str) -> Optional[dict]:
+    image = record["dynamodb"].get(name, None)
+    if image is None:
+        return None
+    return {k: type_deserializer.deserialize(v) for k, v in image.items() if k in SEARCH_FIELDS}
+
+
+@tracer.capture_method
+def update_search_index(records: List[dict]) -> int:
+    """
+    Update the search index from stream records
+
+    Only the postings that changed are written, so most price or stock
+    updates do not write to the index. Returns the number of changes.
+    """
+
+    return search_index.update_many(
+        (
+            record["dynamodb"]["Keys"]["productId"]["S"],
+            _search_image(record, "OldImage"),
+            _search_image(record, "NewImage")
+        )
+        for record in records
+    )
+
+
+@dependency_metrics.log_metrics
+@metrics.log_metrics(raise_on_empty_metrics=False)
 @logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def handler(event, _):
@@ -41,25 +91,25 @@ def handler(event, _):
     Lambda function handler for Products Table stream
     """
 
-    logger.debug({
-        "message": "Input event",
-        "event": event
-    })
+    log.verbose("Input event", event=event)
 
-    logger.debug({
-        "message": "Records received",
-        "records": event.get("Records", [])
-    })
+    # Update the search index first, so that a failure retries the whole batch
+    if search_index is not None:
+        changes = update_search_index(event.get("Records", []))
+        metrics.add_metric(name="searchPostingsUpdated", unit=MetricUnit.Count, value=changes)
 
     events = [
-        ddb_to_event(record, EVENT_BUS_NAME, "ecommerce.products", "Product", "productId")
+        ddb_to_event(record, EVENT_BUS_NAME, "ecommerce.products", "Product", "productId", stream_filter, DETAIL_ENCODINGS)
         for record in event.get("Records", [])
     ]
+    events = [event for event in events if event is not None]
+
+    # Report records dropped by the stream filter
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    for name, value in stream_filter.pop_counts().items():
+        metrics.add_metric(name=name, unit=MetricUnit.Count, value=value)
 
     logger.info("Received %d event(s)", len(events))
-    logger.debug({
-        "message": "Events processed from records",
-        "events": events
-    })
+    log.verbose("Events processed from records", events=events)
 
     send_events(events)
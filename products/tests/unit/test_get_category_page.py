@@ -0,0 +1,50 @@
+import decimal
+import uuid
+import pytest
+from fixtures import context, lambda_module # pylint: disable=import-error
+from ecom.category_pages import CategoryPages, InMemoryPageStore # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "get_category_page",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "CATEGORY_PAGES_TABLE_NAME": "CATEGORY_PAGES_TABLE_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture
+def products():
+    return sorted([
+        {"productId": str(uuid.uuid4()), "name": "Product {}".format(i), "category": "Shoes", "price": decimal.Decimal(100*i)}
+        for i in range(30)
+    ], key=lambda p: p["productId"])
+
+
+def test_handler(lambda_module, context, products, monkeypatch):
+    """
+    Test handler() through all pages of a category
+    """
+
+    pages = CategoryPages(InMemoryPageStore(), max_page_size=10)
+    for product in products:
+        pages.update(product["productId"], None, product)
+    monkeypatch.setattr(lambda_module, "category_pages", pages)
+
+    results = []
+    event = {"category": "Shoes", "limit": 1000}
+    while True:
+        response = lambda_module.handler(event, context)
+        # The limit is capped to the size of a page
+        assert len(response["products"]) <= lambda_module.MAX_PAGE_SIZE
+        results.extend(response["products"])
+        if "nextToken" not in response:
+            break
+        event = {"category": "Shoes", "nextToken": response["nextToken"], "limit": 7}
+
+    assert [p["productId"] for p in results] == [p["productId"] for p in products]
+    assert all(isinstance(p["price"], int) for p in results)
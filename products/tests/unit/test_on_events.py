@@ -0,0 +1,77 @@
+import json
+import uuid
+import pytest
+from fixtures import context, lambda_module # pylint: disable=import-error
+from ecom.category_pages import CategoryPages, InMemoryPageStore # pylint: disable=import-error
+from ecom.eventbridge import encode_detail # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "on_events",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "CATEGORY_PAGES_TABLE_NAME": "CATEGORY_PAGES_TABLE_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture
+def category_pages(lambda_module, monkeypatch):
+    pages = CategoryPages(InMemoryPageStore())
+    monkeypatch.setattr(lambda_module, "category_pages", pages)
+    return pages
+
+
+@pytest.fixture
+def product():
+    return {
+        "productId": str(uuid.uuid4()),
+        "name": "Running Shoes",
+        "category": "Shoes",
+        "price": 1000,
+        "modifiedDate": "2021-01-01T00:00:00"
+    }
+
+
+def _event(detail_type, product_id, detail):
+    return {
+        "source": "ecommerce.products",
+        "detail-type": detail_type,
+        "resources": [product_id],
+        "detail": detail
+    }
+
+
+def test_handler(lambda_module, context, category_pages, product):
+    """
+    Test handler() with created, modified and deleted products
+    """
+
+    product_id = product["productId"]
+
+    lambda_module.handler(_event("ProductCreated", product_id, product), context)
+    assert category_pages.get("Shoes")[0] == [product]
+
+    moved = dict(product, category="Running", modifiedDate="2021-01-02T00:00:00")
+    lambda_module.handler(_event("ProductModified", product_id, {
+        "old": product, "new": moved, "changed": ["category", "modifiedDate"]
+    }), context)
+    assert category_pages.get("Shoes") == ([], None)
+    assert category_pages.get("Running")[0] == [moved]
+
+    lambda_module.handler(_event("ProductDeleted", product_id, moved), context)
+    assert category_pages.get("Running") == ([], None)
+
+
+def test_handler_encoded(lambda_module, context, category_pages, product):
+    """
+    Test handler() with an encoded detail
+    """
+
+    detail = json.loads(encode_detail(product, "zlib+json", keep=["productId"]))
+    lambda_module.handler(_event("ProductCreated", product["productId"], detail), context)
+
+    assert category_pages.get("Shoes")[0] == [product]
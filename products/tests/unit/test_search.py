@@ -0,0 +1,112 @@
+import uuid
+import pytest
+from botocore import stub
+from fixtures import context, lambda_module # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "search",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "TABLE_NAME": "TABLE_NAME",
+        "SEARCH_TABLE_NAME": "SEARCH_TABLE_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture
+def products():
+    return [
+        {"productId": str(uuid.uuid4()), "name": "Running Shoes", "price": 1000},
+        {"productId": str(uuid.uuid4()), "name": "Leather Shoes", "price": 2000},
+        {"productId": str(uuid.uuid4()), "name": "Shirt", "price": 1500}
+    ]
+
+
+def _ddb(product: dict) -> dict:
+    return {
+        "productId": {"S": product["productId"]},
+        "name": {"S": product["name"]},
+        "price": {"N": str(product["price"])}
+    }
+
+
+def test_get_products(lambda_module, products, monkeypatch):
+    """
+    Test get_products() with unprocessed keys and a deleted product
+    """
+
+    sleeps = []
+    monkeypatch.setattr(lambda_module.time, "sleep", sleeps.append)
+
+    product_ids = [p["productId"] for p in products] + [str(uuid.uuid4())]
+
+    dynamodb = stub.Stubber(lambda_module.dynamodb)
+    dynamodb.add_response("batch_get_item", {
+        "Responses": {lambda_module.TABLE_NAME: [_ddb(products[1])]},
+        "UnprocessedKeys": {lambda_module.TABLE_NAME: {"Keys": [
+            {"productId": {"S": products[0]["productId"]}},
+            {"productId": {"S": products[2]["productId"]}}
+        ]}}
+    }, {"RequestItems": {lambda_module.TABLE_NAME: {"Keys": [
+        {"productId": {"S": product_id}} for product_id in product_ids
+    ]}}})
+    dynamodb.add_response("batch_get_item", {
+        "Responses": {lambda_module.TABLE_NAME: [_ddb(products[2]), _ddb(products[0])]}
+    })
+    dynamodb.activate()
+
+    assert lambda_module.get_products(product_ids) == products
+    assert sleeps == [lambda_module.BATCH_GET_BACKOFF]
+
+    dynamodb.assert_no_pending_responses()
+    dynamodb.deactivate()
+
+
+def test_get_products_unprocessed(lambda_module, products, monkeypatch):
+    """
+    Test get_products() when keys stay unprocessed
+    """
+
+    sleeps = []
+    monkeypatch.setattr(lambda_module.time, "sleep", sleeps.append)
+    unprocessed = {"UnprocessedKeys": {lambda_module.TABLE_NAME: {"Keys": [
+        {"productId": {"S": products[0]["productId"]}}
+    ]}}}
+
+    dynamodb = stub.Stubber(lambda_module.dynamodb)
+    for _ in range(lambda_module.BATCH_GET_RETRIES+1):
+        dynamodb.add_response("batch_get_item", unprocessed)
+    dynamodb.activate()
+
+    with pytest.raises(RuntimeError):
+        lambda_module.get_products([products[0]["productId"]])
+    assert len(sleeps) == lambda_module.BATCH_GET_RETRIES
+    assert sleeps == sorted(sleeps)
+
+    dynamodb.assert_no_pending_responses()
+    dynamodb.deactivate()
+
+
+def test_handler(lambda_module, context, products, monkeypatch):
+    """
+    Test handler()
+    """
+
+    calls = []
+    def search(index, text, tags, category, limit, cursor):
+        calls.append((text, tags, category, limit, cursor))
+        return [{"productId": p["productId"], "score": 3} for p in products[:2]], "CURSOR"
+
+    monkeypatch.setattr(lambda_module, "search", search)
+    monkeypatch.setattr(lambda_module, "get_products", lambda product_ids: [
+        p for p in products if p["productId"] in product_ids
+    ])
+
+    response = lambda_module.handler({"query": "shoes", "limit": 1000}, context)
+
+    assert calls == [("shoes", None, None, lambda_module.MAX_SEARCH_LIMIT, None)]
+    assert response == {"products": products[:2], "nextToken": "CURSOR"}
@@ -220,6 +220,26 @@ def test_send_events(lambda_module, insert_data):
     eventbridge.deactivate()
 
 
+def test_send_events_size(lambda_module, insert_data):
+    """
+    Test that send_events() splits batches by size
+    """
+
+    eventbridge = stub.Stubber(lambda_module.eventbridge)
+
+    # Products with long descriptions, 4 of them fit in 256 KB
+    events = [dict(insert_data["event"], Detail="a"*60*1024) for _ in range(10)]
+
+    for i in range(0, 10, 4):
+        eventbridge.add_response("put_events", {}, {"Entries": events[i:i+4]})
+    eventbridge.activate()
+
+    lambda_module.send_events(events)
+
+    eventbridge.assert_no_pending_responses()
+    eventbridge.deactivate()
+
+
 def test_handler(lambda_module, context, insert_data):
     """
     Test the Lambda function handler
@@ -241,4 +261,27 @@ def test_handler(lambda_module, context, insert_data):
 
     # Check that events were sent
     eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
\ No newline at end of file
+    eventbridge.deactivate()
+
+def test_update_search_index(lambda_module, insert_data, monkeypatch):
+    """
+    Test update_search_index()
+    """
+
+    calls = []
+    class SearchIndex:
+        def update_many(self, products):
+            calls.extend(products)
+            return 3
+
+    monkeypatch.setattr(lambda_module, "search_index", SearchIndex())
+
+    record = insert_data["record"]
+    record["dynamodb"]["NewImage"]["tags"] = {"L": [{"S": "tag"}]}
+
+    assert lambda_module.update_search_index([record]) == 3
+    assert calls == [(
+        record["dynamodb"]["Keys"]["productId"]["S"],
+        None,
+        {"name": record["dynamodb"]["NewImage"]["name"]["S"], "tags": ["tag"]}
+    )]
@@ -5,4 +5,4 @@ To use this, add "shared/src/ecom/" in your requirements.txt for your Lambda
 function.
 """
 
-from . import apigateway, eventbridge, helpers
\ No newline at end of file
+from . import apigateway, cache, category_pages, claimcheck, dynamodb, eventbridge, helpers, idempotency, instrumentation, logs, metrics, payment_tokens, search, workqueue
\ No newline at end of file
@@ -3,13 +3,15 @@ API Gateway helpers for Lambda functions
 """
 
 
+import hashlib
 import json
 from typing import Dict, Optional, Union
 from .helpers import Encoder
 
 
 __all__ = [
-    "cognito_user_id", "iam_user_id", "response"
+    "cognito_user_id", "etag", "header", "iam_user_id", "is_not_modified",
+    "response"
 ]
 
 
@@ -35,6 +37,47 @@ def iam_user_id(event: dict) -> Optional[str]:
         return None
 
 
+def header(event: dict, name: str) -> Optional[str]:
+    """
+    Returns the value of a request header or None
+
+    Header names are case-insensitive.
+    """
+
+    name = name.lower()
+    for key, value in (event.get("headers", None) or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def etag(body: str) -> str:
+    """
+    Returns a strong ETag for a response body
+    """
+
+    return '"{}"'.format(hashlib.sha256(body.encode("utf-8")).hexdigest()[:32])
+
+
+def is_not_modified(event: dict, current_etag: str) -> bool:
+    """
+    Returns True if the If-None-Match header of the request matches an ETag
+    """
+
+    value = header(event, "If-None-Match")
+    if value is None:
+        return False
+
+    for candidate in value.split(","):
+        candidate = candidate.strip()
+        # Weak comparison, as specified for If-None-Match
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", current_etag):
+            return True
+    return False
+
+
 def response(
         msg: Union[dict, str],
         status_code: int = 200,
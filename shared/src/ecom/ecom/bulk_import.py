@@ -0,0 +1,471 @@
+"""
+Bulk import of items into a DynamoDB table
+
+Items are streamed from JSON Lines or CSV files, validated against a JSON
+schema from shared/resources/schemas.yaml, and written with parallel
+BatchWriteItem calls. Items whose content did not change since the last
+import are skipped, which saves both the write and the stream event it would
+trigger downstream.
+
+This module requires the 'jsonschema' and 'PyYAML' packages and is therefore
+not imported by default. See `tools/import-products` for the command line
+interface.
+"""
+
+
+import concurrent.futures
+import csv
+import datetime
+import hashlib
+import json
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+import jsonschema
+import yaml
+from .helpers import Encoder
+from .replay import RateLimiter
+
+
+__all__ = [
+    "AdaptiveRateLimiter", "BulkImporter", "ImportStats", "ItemSchema", "Row",
+    "content_hash", "read_csv", "read_jsonl"
+]
+
+
+# BatchWriteItem supports up to 25 items and BatchGetItem up to 100 keys
+MAX_BATCH_SIZE = 25
+# Fields that are set by the import and not part of the content
+IGNORED_FIELDS = ["createdDate", "modifiedDate"]
+# Separator for array values in CSV cells
+CSV_ARRAY_SEPARATOR = "|"
+# Errors kept in ImportStats, so that a bad file does not use all the memory
+MAX_ERRORS = 100
+
+_THROTTLING_ERRORS = ["ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"]
+
+
+class Row(NamedTuple):
+    """
+    Item read from an input file, or the reason it could not be read
+    """
+
+    line: int
+    item: Optional[dict]
+    error: Optional[str] = None
+
+
+class ItemSchema:
+    """
+    JSON schema of an item from a YAML file of schemas
+
+    References such as '#/Package' are resolved against the whole file.
+    """
+
+    def __init__(self, path: str, name: str):
+        with open(path) as fp:
+            document = yaml.safe_load(fp)
+        self.schema = document[name]
+        self.validator = jsonschema.Draft7Validator(
+            self.schema, resolver=jsonschema.RefResolver("", document)
+        )
+
+    def validate(self, item: dict) -> Optional[str]:
+        """
+        Returns the first validation error of an item, or None if it is valid
+        """
+
+        error = jsonschema.exceptions.best_match(self.validator.iter_errors(item))
+        if error is None:
+            return None
+        path = ".".join(str(p) for p in error.absolute_path)
+        return "{}: {}".format(path, error.message) if path else error.message
+
+    def _resolve(self, schema: dict) -> dict:
+        if "$ref" in schema:
+            _, schema = self.validator.resolver.resolve(schema["$ref"])
+        return schema
+
+    def property_schema(self, path: List[str]) -> dict:
+        """
+        Returns the schema of a nested property, or an empty schema if the
+        property is not defined
+        """
+
+        schema = self.schema
+        for name in path:
+            schema = self._resolve(schema).get("properties", {}).get(name, {})
+        return self._resolve(schema)
+
+    def coerce(self, value: str, schema: dict) -> Any:
+        """
+        Convert a CSV cell to the type expected by a property schema
+
+        This raises a ValueError if the value cannot be converted.
+        """
+
+        value_type = schema.get("type", "string")
+        if value_type == "array":
+            return [self.coerce(v, self._resolve(schema.get("items", {}))) for v in value.split(CSV_ARRAY_SEPARATOR)]
+        if value_type == "integer":
+            return int(value)
+        if value_type == "number":
+            try:
+                return Decimal(value)
+            except InvalidOperation:
+                raise ValueError("invalid number: {!r}".format(value))
+        if value_type == "boolean":
+            if value.lower() not in ("true", "false"):
+                raise ValueError("invalid boolean: {!r}".format(value))
+            return value.lower() == "true"
+        return value
+
+
+def read_jsonl(fp: TextIO) -> Iterator[Row]:
+    """
+    Yield items from a JSON Lines file
+
+    Numbers with a fractional part are read as Decimals, as DynamoDB does not
+    support floats.
+    """
+
+    for line, text in enumerate(fp, start=1):
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text, parse_float=Decimal)
+        except ValueError as exc:
+            yield Row(line, None, "invalid JSON: {}".format(exc))
+            continue
+        if not isinstance(item, dict):
+            yield Row(line, None, "expected a JSON object")
+            continue
+        yield Row(line, item)
+
+
+def read_csv(fp: TextIO, schema: ItemSchema) -> Iterator[Row]:
+    """
+    Yield items from a CSV file with a header row
+
+    Columns such as 'package.weight' are nested properties, and arrays are
+    separated by '|'. Values are converted to the types of the schema, and
+    empty cells are left out.
+    """
+
+    reader = csv.reader(fp)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [(name, name.split("."), schema.property_schema(name.split("."))) for name in header]
+
+    # The header is line 1
+    for line, values in enumerate(reader, start=2):
+        if not values:
+            continue
+        if len(values) != len(columns):
+            yield Row(line, None, "expected {} columns, got {}".format(len(columns), len(values)))
+            continue
+
+        item = {}
+        try:
+            for (name, path, property_schema), value in zip(columns, values):
+                if value == "":
+                    continue
+                parent = item
+                for key in path[:-1]:
+                    parent = parent.setdefault(key, {})
+                try:
+                    parent[path[-1]] = schema.coerce(value, property_schema)
+                except ValueError as exc:
+                    raise ValueError("{}: {}".format(name, exc))
+        except ValueError as exc:
+            yield Row(line, None, str(exc))
+            continue
+        yield Row(line, item)
+
+
+class _HashEncoder(Encoder):
+    def default(self, o): # pylint: disable=method-hidden
+        if isinstance(o, set):
+            return sorted(o, key=str)
+        return super().default(o)
+
+
+def content_hash(item: dict, ignored_fields: Iterable[str] = IGNORED_FIELDS) -> str:
+    """
+    Returns a hash of the content of an item
+
+    Items read from DynamoDB and from an input file have the same hash if they
+    have the same content, whatever the key order or number representation.
+    """
+
+    ignored_fields = set(ignored_fields)
+    content = {k: v for k, v in item.items() if k not in ignored_fields}
+    data = json.dumps(content, cls=_HashEncoder, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket whose rate adapts to throttling
+
+    The rate is halved when a request is throttled, down to `min_rate`, and
+    increased by `increase` per second of successful requests, up to
+    `max_rate`. The burst follows the rate, so batches larger than the rate
+    are acquired in several steps.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            min_rate: float = 1,
+            max_rate: Optional[float] = None,
+            increase: Optional[float] = None
+        ):
+        super().__init__(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 10
+        self.increase = increase or rate / 10
+        self.throttle_count = 0
+
+    def throttled(self) -> None:
+        """
+        Decrease the rate after a throttled request
+        """
+
+        with self._lock:
+            self.throttle_count += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.burst = max(self.rate, 1)
+
+    def succeeded(self, count: int) -> None:
+        """
+        Increase the rate after `count` operations succeeded
+        """
+
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase * count / self.rate)
+            self.burst = max(self.rate, 1)
+
+
+class ImportStats:
+    """
+    Counters of a bulk import
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.unchanged = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        """
+        Increment counters
+        """
+
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def add_error(self, line: int, error: str) -> None:
+        """
+        Record an invalid row
+        """
+
+        with self._lock:
+            self.invalid += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append((line, error))
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Returns the counters
+        """
+
+        return {
+            "read": self.read, "invalid": self.invalid, "unchanged": self.unchanged,
+            "created": self.created, "updated": self.updated
+        }
+
+
+class BulkImporter:
+    """
+    Write items to a DynamoDB table with parallel batch writers
+
+    For each batch of items, the current items are read with BatchGetItem and
+    only the items whose `content_hash()` changed are written. Existing items
+    keep their 'createdDate', and written items get a new 'modifiedDate'.
+
+    `client` is a low-level DynamoDB client. Writes are throttled by
+    `rate_limiter`, in items per second, which adapts when DynamoDB throttles
+    requests. Unprocessed items and keys are retried up to `retries` times
+    with exponential backoff.
+    """
+
+    def __init__(
+            self,
+            client: Any,
+            table_name: str,
+            key_fields: List[str],
+            schema: Optional[ItemSchema] = None,
+            workers: int = 8,
+            rate_limiter: Optional[AdaptiveRateLimiter] = None,
+            retries: int = 8,
+            backoff: float = 0.05,
+            now: Optional[Callable[[], datetime.datetime]] = None
+        ):
+        self.client = client
+        self.table_name = table_name
+        self.key_fields = key_fields
+        self.schema = schema
+        self.workers = workers
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.now = now or datetime.datetime.now
+        self.stats = ImportStats()
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    def _key(self, item: dict) -> Tuple:
+        return tuple(item[k] for k in self.key_fields)
+
+    def _retry(self, attempt: int, throttled: bool) -> None:
+        if attempt > self.retries:
+            raise RuntimeError("Too many retries for table {}".format(self.table_name))
+        if throttled and self.rate_limiter is not None:
+            self.rate_limiter.throttled()
+        time.sleep(self.backoff * 2**(attempt-1))
+
+    def _call(self, method: Callable, attempt: int, **kwargs) -> Optional[dict]:
+        try:
+            return method(**kwargs)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] not in _THROTTLING_ERRORS:
+                raise
+            self._retry(attempt, True)
+            return None
+
+    def _get_items(self, items: List[dict]) -> Dict[Tuple, dict]:
+        request = {self.table_name: {"Keys": [
+            {k: self._serializer.serialize(item[k]) for k in self.key_fields} for item in items
+        ]}}
+        existing = {}
+        attempt = 0
+        while request:
+            attempt += 1
+            response = self._call(self.client.batch_get_item, attempt, RequestItems=request)
+            if response is None:
+                continue
+            for ddb_item in response.get("Responses", {}).get(self.table_name, []):
+                item = {k: self._deserializer.deserialize(v) for k, v in ddb_item.items()}
+                existing[self._key(item)] = item
+            request = response.get("UnprocessedKeys", None)
+            if request:
+                self._retry(attempt, True)
+        return existing
+
+    def _write_items(self, items: List[dict]) -> None:
+        request = {self.table_name: [
+            {"PutRequest": {"Item": {k: self._serializer.serialize(v) for k, v in item.items()}}}
+            for item in items
+        ]}
+        attempt = 0
+        while request:
+            attempt += 1
+            count = len(request[self.table_name])
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(count)
+            response = self._call(self.client.batch_write_item, attempt, RequestItems=request)
+            if response is None:
+                continue
+            request = response.get("UnprocessedItems", None)
+            if request:
+                self._retry(attempt, True)
+            elif self.rate_limiter is not None:
+                self.rate_limiter.succeeded(count)
+
+    def import_batch(self, rows: List[Row]) -> None:
+        """
+        Validate and write the items of a batch that changed
+
+        Unchanged items are skipped before validation, as validation is the
+        most expensive step for each item.
+        """
+
+        existing = self._get_items([row.item for row in rows])
+        now = self.now().isoformat()
+
+        puts = []
+        unchanged = 0
+        for row in rows:
+            current = existing.get(self._key(row.item), None)
+            if current is not None and content_hash(current) == content_hash(row.item):
+                unchanged += 1
+                continue
+            error = self.schema.validate(row.item) if self.schema is not None else None
+            if error is not None:
+                self.stats.add_error(row.line, error)
+                continue
+            item = dict(row.item, modifiedDate=now)
+            if current is not None and "createdDate" in current:
+                item["createdDate"] = current["createdDate"]
+            else:
+                item.setdefault("createdDate", now)
+            puts.append(item)
+
+        if puts:
+            self._write_items(puts)
+
+        created = sum(1 for item in puts if self._key(item) not in existing)
+        self.stats.add(unchanged=unchanged, created=created, updated=len(puts)-created)
+
+    def _batches(self, rows: Iterable[Row]) -> Iterator[List[Row]]:
+        # Keys must be unique within a batch, the last version of an item wins
+        batch = {}
+        for row in rows:
+            self.stats.add(read=1)
+            error = row.error
+            if error is None:
+                missing = [k for k in self.key_fields if k not in row.item]
+                if missing:
+                    error = "missing key field(s): {}".format(", ".join(missing))
+            if error is not None:
+                self.stats.add_error(row.line, error)
+                continue
+
+            batch[self._key(row.item)] = row
+            if len(batch) >= MAX_BATCH_SIZE:
+                yield list(batch.values())
+                batch = {}
+        if batch:
+            yield list(batch.values())
+
+    def run(self, rows: Iterable[Row]) -> ImportStats:
+        """
+        Import rows, such as returned by `read_jsonl()` or `read_csv()`
+
+        Rows are consumed as batches complete, so that only a few batches per
+        worker are held in memory.
+        """
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for batch in self._batches(rows):
+                if len(pending) >= self.workers * 2:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self.import_batch, batch))
+            for future in concurrent.futures.as_completed(pending):
+                future.result()
+
+        return self.stats
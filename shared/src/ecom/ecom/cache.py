@@ -0,0 +1,81 @@
+"""
+In-memory caching helpers for Lambda functions
+
+Values are kept in the execution environment and therefore survive across
+invocations of a warm Lambda function.
+"""
+
+
+from collections import OrderedDict
+import time
+from typing import Any, Hashable, Optional
+
+
+__all__ = ["TTLCache"]
+
+
+class TTLCache:
+    """
+    Bounded least-recently-used cache with a time-to-live per entry
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        entry = self._data.get(key, None)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value for a key, or `default` if missing or expired
+        """
+
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries if needed
+        """
+
+        expiration = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expiration, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove a key from the cache
+        """
+
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache
+        """
+
+        self._data.clear()
@@ -0,0 +1,404 @@
+"""
+Precomputed pages of products per category
+
+Products of a category are kept sorted by product ID, as in the 'category'
+index of the products table, in pages of up to `max_page_size` products. A
+page holds the products from its key up to the key of the next page, and the
+first page of a category has an empty key. A page of results is served with
+at most two reads, whatever the size of the category.
+
+Pages are updated incrementally with `CategoryPages.update()`, from the old
+and new versions of a product, e.g. from ProductModified events. Two stores
+share the same interface:
+ - `InMemoryPageStore`, for tests, tools and local development
+ - `DynamoDBPageStore`, storing each page as an item
+
+Pages carry a version number, and stores only save a page if it did not
+change since it was read, so that concurrent updates are retried instead of
+lost.
+"""
+
+
+import base64
+import binascii
+import bisect
+import copy
+import json
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from .dynamodb import put_item_if
+
+
+__all__ = [
+    "CategoryPages", "DynamoDBPageStore", "InMemoryPageStore", "Page", "PageConflictError",
+    "decode_cursor", "encode_cursor"
+]
+
+
+# Pages are split in two above this size
+MAX_PAGE_SIZE = 40
+
+
+class PageConflictError(Exception):
+    """
+    A page kept changing while being updated
+    """
+
+
+class Page:
+    """
+    Products of a category from `key` onwards, sorted by product ID
+
+    `version` is 0 for pages that are not saved yet.
+    """
+
+    def __init__(self, category: str, key: str = "", products: Optional[List[dict]] = None, version: int = 0):
+        self.category = category
+        self.key = key
+        self.products = products or []
+        self.version = version
+
+    def __repr__(self) -> str:
+        return "Page({!r}, {!r}, {} products, version={})".format(
+            self.category, self.key, len(self.products), self.version
+        )
+
+    def _index(self, product_id: str) -> int:
+        return bisect.bisect_left([p["productId"] for p in self.products], product_id)
+
+    def after(self, product_id: Optional[str]) -> List[dict]:
+        """
+        Returns the products after a product ID
+        """
+
+        if product_id is None:
+            return self.products
+        return self.products[bisect.bisect_right([p["productId"] for p in self.products], product_id):]
+
+    def upsert(self, product: dict) -> bool:
+        """
+        Add or replace a product, returns False if nothing changed
+
+        Products older than the one in the page, by 'modifiedDate', are
+        ignored, as events can be delivered out of order.
+        """
+
+        index = self._index(product["productId"])
+        if index < len(self.products) and self.products[index]["productId"] == product["productId"]:
+            current = self.products[index]
+            if current == product or current.get("modifiedDate", "") > product.get("modifiedDate", ""):
+                return False
+            self.products[index] = product
+        else:
+            self.products.insert(index, product)
+        return True
+
+    def remove(self, product: dict) -> bool:
+        """
+        Remove a product, returns False if nothing changed
+
+        Products modified after `product`, by 'modifiedDate', are kept.
+        """
+
+        index = self._index(product["productId"])
+        if index == len(self.products) or self.products[index]["productId"] != product["productId"]:
+            return False
+        if self.products[index].get("modifiedDate", "") > product.get("modifiedDate", ""):
+            return False
+        del self.products[index]
+        return True
+
+    def split(self) -> "Page":
+        """
+        Move the second half of the products to a new page and return it
+        """
+
+        middle = len(self.products) // 2
+        upper = Page(self.category, self.products[middle]["productId"], self.products[middle:])
+        self.products = self.products[:middle]
+        return upper
+
+
+class _PageStore:
+    """
+    Base class for page stores
+    """
+
+    def find(self, category: str, product_id: Optional[str] = None) -> Optional[Page]:
+        """
+        Returns the page that holds a product ID, or the first page if
+        `product_id` is None
+        """
+
+        raise NotImplementedError
+
+    def next_page(self, category: str, key: str) -> Optional[Page]:
+        """
+        Returns the page following the page at `key`
+        """
+
+        raise NotImplementedError
+
+    def save(self, puts: List[Page], deletes: List[Page]) -> bool:
+        """
+        Save and delete pages at once, if none of them changed since they were
+        read
+
+        Returns False if any page changed. Otherwise, the version of saved
+        pages is incremented.
+        """
+
+        raise NotImplementedError
+
+
+class InMemoryPageStore(_PageStore):
+    """
+    Page store kept in memory
+    """
+
+    def __init__(self):
+        # category -> sorted page keys, and (category, key) -> page
+        self._keys = {}
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def find(self, category: str, product_id: Optional[str] = None) -> Optional[Page]:
+        with self._lock:
+            keys = self._keys.get(category, [])
+            index = bisect.bisect_right(keys, product_id or "") - 1
+            if index < 0:
+                return None
+            return copy.deepcopy(self._pages[(category, keys[index])])
+
+    def next_page(self, category: str, key: str) -> Optional[Page]:
+        with self._lock:
+            keys = self._keys.get(category, [])
+            index = bisect.bisect_right(keys, key)
+            if index == len(keys):
+                return None
+            return copy.deepcopy(self._pages[(category, keys[index])])
+
+    def save(self, puts: List[Page], deletes: List[Page]) -> bool:
+        with self._lock:
+            for page in puts + deletes:
+                current = self._pages.get((page.category, page.key), None)
+                if (current.version if current is not None else 0) != page.version:
+                    return False
+
+            for page in deletes:
+                del self._pages[(page.category, page.key)]
+                keys = self._keys[page.category]
+                del keys[bisect.bisect_left(keys, page.key)]
+                if not keys:
+                    del self._keys[page.category]
+            for page in puts:
+                if page.version == 0:
+                    bisect.insort(self._keys.setdefault(page.category, []), page.key)
+                page.version += 1
+                self._pages[(page.category, page.key)] = copy.deepcopy(page)
+
+        return True
+
+
+class DynamoDBPageStore(_PageStore):
+    """
+    Page store in a DynamoDB table
+
+    The table has a 'category' partition key and a 'page' sort key, with the
+    page key prefixed by '#', as key attributes cannot be empty strings.
+    """
+
+    def __init__(self, table: Any):
+        self.table = table
+
+    @staticmethod
+    def _page(item: dict) -> Page:
+        return Page(item["category"], item["page"][1:], item.get("products", []), int(item["version"]))
+
+    def _query_one(self, **kwargs) -> Optional[Page]:
+        items = self.table.query(Limit=1, **kwargs).get("Items", [])
+        return self._page(items[0]) if items else None
+
+    def find(self, category: str, product_id: Optional[str] = None) -> Optional[Page]:
+        return self._query_one(
+            KeyConditionExpression=Key("category").eq(category) & Key("page").lte("#" + (product_id or "")),
+            ScanIndexForward=False
+        )
+
+    def next_page(self, category: str, key: str) -> Optional[Page]:
+        return self._query_one(
+            KeyConditionExpression=Key("category").eq(category) & Key("page").gt("#" + key)
+        )
+
+    @staticmethod
+    def _condition(page: Page) -> Tuple[str, dict]:
+        if page.version == 0:
+            return "attribute_not_exists(category)", {}
+        return "version = :version", {":version": page.version}
+
+    def _item(self, page: Page) -> dict:
+        return {
+            "category": page.category,
+            "page": "#" + page.key,
+            "products": page.products,
+            "version": page.version + 1
+        }
+
+    def save(self, puts: List[Page], deletes: List[Page]) -> bool:
+        if len(puts) == 1 and not deletes:
+            condition, values = self._condition(puts[0])
+            kwargs = {"ExpressionAttributeValues": values} if values else {}
+            if not put_item_if(self.table, self._item(puts[0]), condition, **kwargs):
+                return False
+        else:
+            actions = []
+            for page in puts:
+                condition, values = self._condition(page)
+                action = {"TableName": self.table.name, "Item": self._item(page), "ConditionExpression": condition}
+                if values:
+                    action["ExpressionAttributeValues"] = values
+                actions.append({"Put": action})
+            for page in deletes:
+                condition, values = self._condition(page)
+                actions.append({"Delete": {
+                    "TableName": self.table.name,
+                    "Key": {"category": page.category, "page": "#" + page.key},
+                    "ConditionExpression": condition,
+                    "ExpressionAttributeValues": values
+                }})
+            try:
+                self.table.meta.client.transact_write_items(TransactItems=actions)
+            except ClientError as exc:
+                if exc.response["Error"]["Code"] != "TransactionCanceledException":
+                    raise
+                return False
+
+        for page in puts:
+            page.version += 1
+        return True
+
+
+def encode_cursor(product_id: str) -> str:
+    """
+    Returns an opaque cursor for the last product of a page
+    """
+
+    return base64.urlsafe_b64encode(json.dumps([product_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Returns the product ID from a cursor
+
+    This raises a ValueError if the cursor is invalid.
+    """
+
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(value, list) or len(value) != 1 or not isinstance(value[0], str):
+        raise ValueError("Invalid cursor")
+
+    return value[0]
+
+
+class CategoryPages:
+    """
+    Pages of products per category, on top of a page store
+    """
+
+    def __init__(self, store: _PageStore, max_page_size: int = MAX_PAGE_SIZE, retries: int = 5):
+        self.store = store
+        self.max_page_size = max_page_size
+        self.retries = retries
+
+    def _change(self, category: str, product: dict, remove: bool) -> int:
+        for _ in range(self.retries):
+            page = self.store.find(category, product["productId"])
+            if page is None:
+                if remove:
+                    return 0
+                page = Page(category)
+
+            if not (page.remove(product) if remove else page.upsert(product)):
+                return 0
+
+            puts, deletes = [page], []
+            if len(page.products) > self.max_page_size:
+                puts.append(page.split())
+            elif not page.products:
+                # An empty first page takes over the products of the next page,
+                # so that only empty categories have an empty first page
+                next_page = self.store.next_page(category, page.key) if page.key == "" else None
+                if next_page is None:
+                    puts, deletes = [], [page]
+                else:
+                    page.products = next_page.products
+                    deletes = [next_page]
+
+            if self.store.save(puts, deletes):
+                return len(puts) + len(deletes)
+
+        raise PageConflictError("Too many conflicts updating category {}".format(category))
+
+    def update(self, product_id: str, old: Optional[dict], new: Optional[dict]) -> int:
+        """
+        Update pages from the old and new versions of a product
+
+        Either version can be None for created and deleted products. Returns
+        the number of pages written.
+        """
+
+        old_category = (old or {}).get("category", None)
+        new_category = (new or {}).get("category", None)
+
+        written = 0
+        if old_category is not None and old_category != new_category:
+            written += self._change(old_category, dict(old, productId=product_id), remove=True)
+        if new_category is not None:
+            written += self._change(new_category, dict(new, productId=product_id), remove=False)
+        return written
+
+    def update_many(self, products: Iterable[Tuple[str, Optional[dict], Optional[dict]]]) -> int:
+        """
+        Update pages from (product ID, old, new) tuples, see `update()`
+        """
+
+        return sum(self.update(product_id, old, new) for product_id, old, new in products)
+
+    def get(self, category: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Returns a page of products of a category, sorted by product ID, and
+        the cursor of the next page, if any
+
+        `limit` should not exceed `max_page_size`. Cursors hold the last
+        product ID of a page, so they remain valid as pages are split or
+        removed. As with DynamoDB queries, the last page can be empty.
+        """
+
+        after = decode_cursor(cursor) if cursor is not None else None
+
+        page = self.store.find(category, after)
+        if page is None:
+            return [], None
+
+        products = page.after(after)
+        has_next_page = False
+        if len(products) <= limit:
+            next_page = self.store.next_page(category, page.key)
+            if next_page is not None:
+                products = products + next_page.products
+                has_next_page = True
+
+        results = products[:limit]
+        next_cursor = None
+        if results and (len(products) > limit or has_next_page):
+            next_cursor = encode_cursor(results[-1]["productId"])
+        return results, next_cursor
@@ -0,0 +1,211 @@
+"""
+Claim-check for oversized events
+
+EventBridge rejects entries larger than 256 KB. Above a threshold, the
+producer stores the event detail in a blob store and publishes a pointer
+instead:
+
+    {"orderId": "...", "status": "NEW", "claimCheck": {"uri": "s3://...", "size": 300000}}
+
+A few small fields are kept in the pointer for routing and for consumers
+that do not need the whole payload. `LazyDetail` only downloads the payload
+when a field that was not kept is accessed.
+
+Blob stores are identified by URI: 's3://bucket/prefix/' for Amazon S3, or
+'file:///path/' as a local filesystem stand-in for tests and tools.
+"""
+
+
+from collections.abc import Mapping
+import functools
+import json
+import os
+from typing import Any, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+import uuid
+import boto3
+from .eventbridge import MAX_EVENT_SIZE, decode_detail, event_size
+
+
+__all__ = [
+    "ClaimCheck", "LazyDetail", "LocalBlobStore", "S3BlobStore",
+    "fetch", "get_store"
+]
+
+
+# Key of the pointer in claim-checked details
+CLAIM_CHECK_KEY = "claimCheck"
+# Keys of pointers and encoded envelopes that are not part of the detail
+_ENVELOPE_KEYS = {CLAIM_CHECK_KEY, "encoding", "version", "data"}
+
+
+_s3 = None
+
+
+def _s3_client() -> Any:
+    # Created on first use, as most functions never need it
+    global _s3 # pylint: disable=global-statement,invalid-name
+    if _s3 is None:
+        _s3 = boto3.client("s3")
+    return _s3
+
+
+class S3BlobStore:
+    """
+    Store blobs in an Amazon S3 bucket under a prefix
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", client: Optional[Any] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client
+
+    def put(self, key: str, data: bytes) -> str:
+        """
+        Store a blob and returns its URI
+        """
+
+        client = self.client or _s3_client()
+        key = self.prefix + key
+        client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return "s3://{}/{}".format(self.bucket, key)
+
+
+class LocalBlobStore:
+    """
+    Store blobs as files in a local directory
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def put(self, key: str, data: bytes) -> str:
+        """
+        Store a blob and returns its URI
+        """
+
+        path = os.path.abspath(os.path.join(self.path, key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fp:
+            fp.write(data)
+        return "file://" + path
+
+
+def get_store(uri: str) -> Any:
+    """
+    Returns the blob store for a base URI
+    """
+
+    parsed = urlparse(uri)
+    if parsed.scheme == "s3":
+        return S3BlobStore(parsed.netloc, parsed.path.lstrip("/"))
+    if parsed.scheme == "file":
+        return LocalBlobStore(parsed.path)
+    raise ValueError("Unsupported blob store URI: {}".format(uri))
+
+
+@functools.lru_cache(maxsize=16)
+def fetch(uri: str) -> bytes:
+    """
+    Returns the content of a blob
+
+    Recent blobs are memoised, so that retries of the same event within an
+    execution environment do not download the payload again.
+    """
+
+    parsed = urlparse(uri)
+    if parsed.scheme == "s3":
+        res = _s3_client().get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+        return res["Body"].read()
+    if parsed.scheme == "file":
+        with open(parsed.path, "rb") as fp:
+            return fp.read()
+    raise ValueError("Unsupported blob URI: {}".format(uri))
+
+
+class ClaimCheck:
+    """
+    Replace the detail of oversized events by a pointer to a blob store
+
+    Events larger than `threshold` bytes, as measured by EventBridge, are
+    checked in. Top-level detail fields listed in `keep` are copied into the
+    pointer.
+    """
+
+    def __init__(self, store: Any, threshold: int = MAX_EVENT_SIZE, keep: Iterable[str] = ()):
+        self.store = store
+        self.threshold = threshold
+        self.keep = list(keep)
+
+    def check_in(self, event: dict) -> dict:
+        """
+        Returns the event, with its detail claim-checked if too large
+        """
+
+        size = event_size(event)
+        if size <= self.threshold:
+            return event
+
+        # The stored payload is the detail as published, which may itself be
+        # encoded. Encoded details already carry the routing fields.
+        detail = json.loads(event["Detail"])
+        key = "{}/{}/{}/{}.json".format(
+            event["Source"], event["DetailType"],
+            (event.get("Resources") or ["-"])[0], uuid.uuid4()
+        )
+        uri = self.store.put(key, event["Detail"].encode("utf-8"))
+
+        pointer = {k: detail[k] for k in self.keep if k in detail}
+        pointer[CLAIM_CHECK_KEY] = {"uri": uri, "size": size}
+        return dict(event, Detail=json.dumps(pointer))
+
+
+class LazyDetail(Mapping):
+    """
+    Read-only view of an event detail that loads claim-checked payloads on
+    demand
+
+    Fields kept in the pointer are served without downloading the payload.
+    Encoded details are decoded on first access of other fields, see
+    `ecom.eventbridge.decode_detail()`.
+    """
+
+    def __init__(self, detail: dict):
+        self._detail = detail
+        self._full = None
+
+    @property
+    def claim_checked(self) -> bool:
+        """
+        True if the detail is a pointer to a blob
+        """
+
+        return CLAIM_CHECK_KEY in self._detail
+
+    def _is_partial(self) -> bool:
+        return self.claim_checked or "encoding" in self._detail
+
+    @property
+    def full(self) -> dict:
+        """
+        Returns the whole detail, downloading it if needed
+        """
+
+        if self._full is None:
+            if self.claim_checked:
+                detail = json.loads(fetch(self._detail[CLAIM_CHECK_KEY]["uri"]))
+            else:
+                detail = self._detail
+            self._full = decode_detail(detail)
+        return self._full
+
+    def __getitem__(self, key: str) -> Any:
+        if self._full is None and self._is_partial() and key in self._detail and key not in _ENVELOPE_KEYS:
+            return self._detail[key]
+        return self.full[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.full)
+
+    def __len__(self) -> int:
+        return len(self.full)
@@ -0,0 +1,264 @@
+"""
+DynamoDB helpers
+
+Query and Scan return at most 1 MB of data per call. The helpers in this
+module follow LastEvaluatedKey and yield items lazily, so callers can stop
+reading as soon as they have what they need.
+
+BatchWriteItem does not support conditions or updates, so
+`update_items_if()` sends conditional updates concurrently instead. Likewise,
+BatchGetItem needs full keys, so `query_partitions()` reads whole item
+collections with concurrent queries.
+"""
+
+
+import concurrent.futures
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+
+__all__ = [
+    "paginate", "parallel_scan", "put_item_if",
+    "query", "query_partitions", "scan", "update_item_if", "update_items_if"
+]
+
+
+# Sentinel put in the queue by parallel scan workers once done
+_DONE = object()
+
+
+def _projection(attributes: List[str], kwargs: dict) -> dict:
+    """
+    Add a ProjectionExpression for a list of attribute names
+    """
+
+    names = dict(kwargs.get("ExpressionAttributeNames", {}))
+    placeholders = []
+    for i, attribute in enumerate(attributes):
+        placeholder = "#proj{}".format(i)
+        names[placeholder] = attribute
+        placeholders.append(placeholder)
+
+    return dict(
+        kwargs,
+        ProjectionExpression=", ".join(placeholders),
+        ExpressionAttributeNames=names
+    )
+
+
+def paginate(
+        method: Callable[..., dict],
+        page_size: int = 100,
+        max_page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        projection: Optional[List[str]] = None,
+        **kwargs
+    ) -> Iterator[dict]:
+    """
+    Yield items from all pages of a Query or Scan
+
+    `method` is a table or client method such as `table.query`, and `kwargs`
+    are passed to each call.
+
+    The first page requests `page_size` items. If `max_page_size` is set, the
+    page size doubles after each full page up to that value, so that short
+    results are fast to return while long ones take fewer round-trips.
+
+    Iteration stops after `limit` items, without reading further pages.
+    `projection` restricts the attributes returned.
+    """
+
+    if projection:
+        kwargs = _projection(projection, kwargs)
+
+    count = 0
+    while True:
+        request_size = page_size
+        if limit is not None:
+            request_size = min(request_size, limit - count)
+
+        res = method(Limit=request_size, **kwargs)
+
+        for item in res.get("Items", []):
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+        last_key = res.get("LastEvaluatedKey", None)
+        if last_key is None:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+        # Adaptive page size: grow when pages come back full
+        if max_page_size is not None and len(res.get("Items", [])) >= request_size:
+            page_size = min(page_size * 2, max_page_size)
+
+
+def query(table: Any, **kwargs) -> Iterator[dict]:
+    """
+    Yield items from a Query on a DynamoDB table
+
+    See `paginate()` for the supported keyword arguments.
+    """
+
+    return paginate(table.query, **kwargs)
+
+
+def query_partitions(
+        table: Any,
+        partition_key: str,
+        values: List[Any],
+        max_workers: int = 10,
+        **kwargs
+    ) -> Dict[Any, List[dict]]:
+    """
+    Returns all items of many partitions, keyed by partition key value
+
+    Partitions are queried concurrently, and partitions without items are
+    left out. See `paginate()` for the supported keyword arguments.
+    """
+
+    values = list(dict.fromkeys(values))
+    if not values:
+        return {}
+
+    def worker(value: Any) -> List[dict]:
+        return list(paginate(table.query, KeyConditionExpression=Key(partition_key).eq(value), **kwargs))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(values))) as executor:
+        results = list(executor.map(worker, values))
+
+    return {value: items for value, items in zip(values, results) if items}
+
+
+def scan(table: Any, **kwargs) -> Iterator[dict]:
+    """
+    Yield items from a Scan on a DynamoDB table
+
+    See `paginate()` for the supported keyword arguments.
+    """
+
+    return paginate(table.scan, **kwargs)
+
+
+def parallel_scan(
+        table: Any,
+        segments: int = 4,
+        page_size: int = 1000,
+        projection: Optional[List[str]] = None,
+        buffer_size: int = 10000,
+        **kwargs
+    ) -> Iterator[dict]:
+    """
+    Yield items from a parallel Scan with `segments` concurrent workers
+
+    This is meant for administrative and backfill reads over whole tables.
+    Items are yielded in no particular order. Workers stop once the consumer
+    stops iterating, and at most `buffer_size` items are kept in memory.
+    """
+
+    items = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        # Wait for space in the buffer, unless the consumer went away
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(segment: int) -> None:
+        try:
+            for item in paginate(
+                    table.scan, page_size=page_size, projection=projection,
+                    Segment=segment, TotalSegments=segments, **kwargs
+                ):
+                if not put(item):
+                    return
+        finally:
+            put(_DONE)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [executor.submit(worker, segment) for segment in range(segments)]
+        try:
+            done = 0
+            while done < segments:
+                item = items.get()
+                if item is _DONE:
+                    done += 1
+                    continue
+                yield item
+        finally:
+            stop.set()
+
+    # Surface exceptions raised in workers
+    for future in futures:
+        future.result()
+
+
+def put_item_if(table: Any, item: dict, condition: str, **kwargs) -> bool:
+    """
+    Put an item if `condition` is met
+
+    `kwargs`, such as ExpressionAttributeValues, are passed to PutItem.
+    Returns False if the condition was not met.
+    """
+
+    try:
+        table.put_item(Item=item, ConditionExpression=condition, **kwargs)
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def update_item_if(table: Any, key: dict, condition: str, **kwargs) -> bool:
+    """
+    Update an item if `condition` is met
+
+    `kwargs`, such as UpdateExpression, are passed to UpdateItem. Returns
+    False if the condition was not met.
+    """
+
+    try:
+        table.update_item(Key=key, ConditionExpression=condition, **kwargs)
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def update_items_if(
+        table: Any,
+        updates: List[dict],
+        condition: str,
+        max_workers: int = 10
+    ) -> List[dict]:
+    """
+    Update many items concurrently if `condition` is met for each of them
+
+    Each update contains the UpdateItem arguments for one item, including its
+    Key. Returns the updates for which the condition was not met. Other errors
+    are raised once all updates are done.
+    """
+
+    if not updates:
+        return []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(updates))) as executor:
+        futures = [
+            executor.submit(update_item_if, table, update["Key"], condition,
+                            **{k: v for k, v in update.items() if k != "Key"})
+            for update in updates
+        ]
+
+    return [update for update, future in zip(updates, futures) if not future.result()]
@@ -0,0 +1,108 @@
+"""
+Durable buffer for EventBridge events
+
+Functions on a latency-sensitive path, such as Cognito triggers, put their
+events in an SQS queue instead of calling PutEvents. A separate function
+triggered by the queue publishes them in batches with `publish_records()`,
+so that EventBridge latency or throttling does not affect the caller.
+
+When no queue URL is configured, events are kept in memory. This is meant
+for local development and tests, see `EventBuffer.drain()`.
+"""
+
+
+import json
+import threading
+from typing import Any, List, Optional
+import boto3
+from botocore.exceptions import ClientError
+from .eventbridge import batch_events
+from .helpers import Encoder
+from .replay import EventPublisher
+
+
+__all__ = ["EventBuffer", "publish_records"]
+
+
+class EventBuffer:
+    """
+    Buffer of EventBridge entries in an SQS queue
+
+    Entries are serialized as JSON, with 'Time' as an ISO 8601 string, which
+    PutEvents accepts as-is.
+    """
+
+    def __init__(self, queue_url: Optional[str], sqs: Any = None):
+        self.queue_url = queue_url
+        self._sqs = sqs
+        self._events = []
+        self._lock = threading.Lock()
+
+    @property
+    def sqs(self) -> Any:
+        """
+        SQS client, created on first use
+        """
+
+        if self._sqs is None:
+            self._sqs = boto3.client("sqs")
+        return self._sqs
+
+    def put(self, event: dict) -> None:
+        """
+        Add an EventBridge entry to the buffer
+        """
+
+        body = json.dumps(event, cls=Encoder)
+        if not self.queue_url:
+            with self._lock:
+                self._events.append(json.loads(body))
+            return
+
+        self.sqs.send_message(QueueUrl=self.queue_url, MessageBody=body)
+
+    def drain(self) -> List[dict]:
+        """
+        Returns and removes the entries kept in memory
+        """
+
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+
+def publish_records(records: List[dict], publisher: EventPublisher) -> List[str]:
+    """
+    Publish the EventBridge entries of SQS messages from an EventBuffer
+
+    Entries are published in batches that fit in a PutEvents request, and each
+    batch is retried by the publisher. Returns the IDs of messages that could not be parsed or
+    published, e.g. for ReportBatchItemFailures. Other entries of a failed
+    batch may have been published, so consumers can receive an event more
+    than once.
+    """
+
+    failures = []
+    entries = []
+    for record in records:
+        try:
+            entry = json.loads(record["body"])
+        except ValueError:
+            failures.append(record["messageId"])
+            continue
+        if not isinstance(entry, dict):
+            failures.append(record["messageId"])
+            continue
+        entries.append((record["messageId"], entry))
+
+    # Batches are consecutive slices of the entries
+    start = 0
+    for batch in batch_events([entry for _, entry in entries]):
+        message_ids = [message_id for message_id, _ in entries[start:start+len(batch)]]
+        start += len(batch)
+        try:
+            publisher.publish(batch)
+        except (ClientError, RuntimeError):
+            failures.extend(message_ids)
+
+    return failures
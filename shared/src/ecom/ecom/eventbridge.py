@@ -3,31 +3,243 @@ EventBridge helpers for Lambda functions
 """
 
 
+import base64
+from collections import Counter
 from datetime import datetime
 import json
 import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import zlib
 from boto3.dynamodb.types import TypeDeserializer
 from .helpers import Encoder
 
 
-__all__ = ["ddb_to_event"]
+__all__ = [
+    "StreamFilter", "batch_events", "ddb_to_event", "decode_detail",
+    "encode_detail", "event_size", "parse_encodings"
+]
 deserialize = TypeDeserializer().deserialize
 
 
+# Version of the envelope used by encoded details
+ENCODING_VERSION = 1
+# Supported encodings for event details
+ENCODING_JSON = "json"
+ENCODING_ZLIB = "zlib+json"
+
+# Maximum size of an entry and of a PutEvents request, in bytes
+MAX_EVENT_SIZE = 256 * 1024
+# Maximum number of entries per PutEvents request
+MAX_BATCH_SIZE = 10
+
+
+class StreamFilter:
+    """
+    Filter for DynamoDB Streams MODIFY records
+
+    A MODIFY record is kept only if all of the following are true:
+     - at least one field outside of `ignored_fields` changed
+     - if `required_fields` is set, at least one of them changed
+     - if `allowed_transitions` is set, the `transition_field` changed and
+       the (old, new) pair is allowed. "*" matches any value.
+
+    Dropped records are counted by reason. Use `pop_counts()` to retrieve and
+    reset the counters, e.g. to report them as metrics.
+    """
+
+    def __init__(
+            self,
+            ignored_fields: Optional[Iterable[str]] = None,
+            required_fields: Optional[Iterable[str]] = None,
+            allowed_transitions: Optional[Iterable[Tuple[str, str]]] = None,
+            transition_field: str = "status"
+        ):
+        self.ignored_fields = set(ignored_fields or [])
+        self.required_fields = set(required_fields or [])
+        self.allowed_transitions = set(allowed_transitions or [])
+        self.transition_field = transition_field
+        self.counts = Counter()
+
+    def _transition_allowed(self, old_value, new_value) -> bool:
+        for allowed_old, allowed_new in self.allowed_transitions:
+            if allowed_old not in ("*", old_value):
+                continue
+            if allowed_new not in ("*", new_value):
+                continue
+            return True
+        return False
+
+    def drop_reason(self, new: dict, old: dict, changed: List[str]) -> Optional[str]:
+        """
+        Returns the reason to drop a MODIFY record, or None to keep it
+        """
+
+        relevant = [k for k in changed if k not in self.ignored_fields]
+        if not relevant:
+            return "recordsDroppedNoChange"
+
+        if self.required_fields and self.required_fields.isdisjoint(relevant):
+            return "recordsDroppedNotRequired"
+
+        if self.allowed_transitions:
+            if self.transition_field not in relevant:
+                return "recordsDroppedTransition"
+            if not self._transition_allowed(
+                    old.get(self.transition_field),
+                    new.get(self.transition_field)
+                ):
+                return "recordsDroppedTransition"
+
+        return None
+
+    def keep(self, new: dict, old: dict, changed: List[str]) -> bool:
+        """
+        Returns True if the MODIFY record should be published
+        """
+
+        reason = self.drop_reason(new, old, changed)
+        if reason is None:
+            return True
+
+        self.counts[reason] += 1
+        return False
+
+    def pop_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of dropped records per reason and reset counters
+        """
+
+        counts = dict(self.counts)
+        self.counts.clear()
+        return counts
+
+
+def encode_detail(detail: dict, encoding: str = ENCODING_JSON, keep: Iterable[str] = ()) -> str:
+    """
+    Serialize an event detail with the given encoding
+
+    With ENCODING_JSON, this returns the detail as JSON. Other encodings wrap
+    a compressed, base64-encoded payload in an envelope:
+
+        {"encoding": "zlib+json", "version": 1, "data": "...", ...}
+
+    EventBridge rules can only match on fields outside of the payload, so
+    fields listed in `keep` are copied as-is into the envelope.
+    """
+
+    payload = json.dumps(detail, cls=Encoder)
+    if encoding == ENCODING_JSON:
+        return payload
+
+    if encoding != ENCODING_ZLIB:
+        raise ValueError("Unsupported encoding: {}".format(encoding))
+
+    envelope = {k: detail[k] for k in keep if k in detail}
+    envelope.update({
+        "encoding": encoding,
+        "version": ENCODING_VERSION,
+        "data": base64.b64encode(zlib.compress(payload.encode("utf-8"))).decode("ascii")
+    })
+    return json.dumps(envelope, cls=Encoder)
+
+
+def decode_detail(detail: dict) -> dict:
+    """
+    Returns the original detail of an event produced by `encode_detail()`
+
+    Details that are not encoded are returned unchanged, which makes this
+    safe to call on any event.
+    """
+
+    encoding = detail.get("encoding", None)
+    if encoding is None or "data" not in detail:
+        return detail
+
+    if encoding != ENCODING_ZLIB:
+        raise ValueError("Unsupported encoding: {}".format(encoding))
+    if detail.get("version", None) != ENCODING_VERSION:
+        raise ValueError("Unsupported encoding version: {}".format(detail.get("version", None)))
+
+    return json.loads(zlib.decompress(base64.b64decode(detail["data"])))
+
+
+def event_size(event: dict) -> int:
+    """
+    Returns the size of an event as calculated by EventBridge
+    """
+
+    size = 0
+    if event.get("Time", None) is not None:
+        size += 14
+    for key in ["Source", "DetailType", "Detail"]:
+        size += len(event.get(key, "").encode("utf-8"))
+    for resource in event.get("Resources", []):
+        size += len(resource.encode("utf-8"))
+    return size
+
+
+def batch_events(events: List[dict]) -> Iterator[List[dict]]:
+    """
+    Split events into batches that fit in a single PutEvents request
+    """
+
+    batch = []
+    batch_size = 0
+    for event in events:
+        size = event_size(event)
+        if batch and (len(batch) >= MAX_BATCH_SIZE or batch_size + size > MAX_EVENT_SIZE):
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(event)
+        batch_size += size
+    if batch:
+        yield batch
+
+
+def parse_encodings(value: str) -> Dict[str, str]:
+    """
+    Parse detail encodings per detail-type, e.g. 'OrderCreated=zlib+json'
+
+    This is meant to read encodings from an environment variable, with
+    multiple detail-types separated by commas.
+    """
+
+    encodings = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        detail_type, encoding = item.split("=", 1)
+        encodings[detail_type.strip()] = encoding.strip()
+    return encodings
+
+
 def ddb_to_event(
         ddb_record: dict,
         event_bus_name: str,
         source: str,
         object_type: str,
-        resource_key: str
-    ) -> dict:
+        resource_key: str,
+        stream_filter: Optional[StreamFilter] = None,
+        encodings: Optional[Dict[str, str]] = None
+    ) -> Optional[dict]:
     """
     Transforms a DynamoDB Streams record into an EventBridge event
 
     For this function to works, you need to have a StreamViewType of
     NEW_AND_OLD_IMAGES.
+
+    If a `stream_filter` is provided, MODIFY records that do not match it are
+    dropped before serialization and this returns None.
+
+    `encodings` maps detail-types to the encoding used for their detail, see
+    `encode_detail()`. The resource key and the list of changed fields are
+    kept outside of encoded payloads for routing.
     """
 
+    encodings = encodings or {}
+    keep = (resource_key, "changed")
+
     event = {
         "Time": datetime.now(),
         "Source": source,
@@ -45,20 +257,20 @@ def ddb_to_event(
     # Created event
     if ddb_record["eventName"].upper() == "INSERT":
         event["DetailType"] = "{}Created".format(object_type)
-        event["Detail"] = json.dumps({
+        detail = {
             k: deserialize(v)
             for k, v
             in ddb_record["dynamodb"]["NewImage"].items()
-        }, cls=Encoder)
+        }
 
     # Deleted event
     elif ddb_record["eventName"].upper() == "REMOVE":
         event["DetailType"] = "{}Deleted".format(object_type)
-        event["Detail"] = json.dumps({
+        detail = {
             k: deserialize(v)
             for k, v
             in ddb_record["dynamodb"]["OldImage"].items()
-        }, cls=Encoder)
+        }
 
     elif ddb_record["eventName"].upper() == "MODIFY":
         new = {
@@ -82,14 +294,23 @@ def ddb_to_event(
             elif new[k] != old[k]:
                 changed.append(k)
 
+        if stream_filter is not None and not stream_filter.keep(new, old, changed):
+            return None
+
         event["DetailType"] = "{}Modified".format(object_type)
-        event["Detail"] = json.dumps({
+        detail = {
             "new": new,
             "old": old,
             "changed": changed
-        }, cls=Encoder)
+        }
 
     else:
         raise ValueError("Wrong eventName value for DynamoDB event: {}".format(ddb_record["eventName"]))
 
-    return event
\ No newline at end of file
+    event["Detail"] = encode_detail(
+        detail,
+        encodings.get(event["DetailType"], ENCODING_JSON),
+        keep
+    )
+
+    return event
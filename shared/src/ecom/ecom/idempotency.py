@@ -0,0 +1,197 @@
+"""
+Idempotency helpers for event consumers
+
+EventBridge delivers events at least once. This module records which events
+were already processed in a DynamoDB table, with an in-memory cache in front
+of it, so that duplicates return early without any downstream I/O.
+
+The DynamoDB table must have a string partition key named 'id' and a TTL on
+the 'expiration' attribute.
+"""
+
+
+from collections import OrderedDict
+import functools
+import time
+from typing import Callable, Optional
+import boto3
+from botocore.exceptions import ClientError
+
+
+__all__ = [
+    "IdempotencyInProgressError", "IdempotencyStore",
+    "event_id", "idempotent"
+]
+
+
+STATUS_IN_PROGRESS = "IN_PROGRESS"
+STATUS_COMPLETED = "COMPLETED"
+
+
+class IdempotencyInProgressError(Exception):
+    """
+    Another invocation is currently processing the same key
+    """
+
+
+class IdempotencyStore:
+    """
+    Store the processing state of idempotency keys
+
+    When `table_name` is empty, only the in-memory cache is used.
+    """
+
+    def __init__(
+            self,
+            table_name: Optional[str],
+            namespace: str = "",
+            ttl: int = 3600,
+            in_progress_ttl: int = 300,
+            cache_size: int = 1024
+        ):
+        self.table = boto3.resource("dynamodb").Table(table_name) if table_name else None # pylint: disable=no-member
+        self.namespace = namespace
+        self.ttl = ttl
+        self.in_progress_ttl = in_progress_ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def _key(self, key: str) -> str:
+        if self.namespace:
+            return "{}#{}".format(self.namespace, key)
+        return key
+
+    def _cache_get(self, key: str) -> bool:
+        expiration = self._cache.get(key, None)
+        if expiration is None:
+            return False
+        if expiration < time.time():
+            del self._cache[key]
+            return False
+        self._cache.move_to_end(key)
+        return True
+
+    def _cache_set(self, key: str, expiration: int) -> None:
+        self._cache[key] = expiration
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def start(self, key: str) -> bool:
+        """
+        Mark a key as in progress
+
+        Returns False if the key was already processed, and raises
+        IdempotencyInProgressError if another invocation holds the key.
+        """
+
+        key = self._key(key)
+
+        if self._cache_get(key):
+            return False
+
+        if self.table is None:
+            return True
+
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    "id": key,
+                    "status": STATUS_IN_PROGRESS,
+                    "expiration": now + self.in_progress_ttl
+                },
+                # TTL deletion is not immediate, so expired items are
+                # considered absent.
+                ConditionExpression="attribute_not_exists(#id) OR #expiration < :now",
+                ExpressionAttributeNames={"#id": "id", "#expiration": "expiration"},
+                ExpressionAttributeValues={":now": now}
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+            item = self.table.get_item(Key={"id": key}, ConsistentRead=True).get("Item", {})
+            if item.get("status") == STATUS_COMPLETED:
+                self._cache_set(key, int(item["expiration"]))
+                return False
+            raise IdempotencyInProgressError("Key {} is already in progress".format(key))
+
+        return True
+
+    def complete(self, key: str) -> None:
+        """
+        Mark a key as completed
+        """
+
+        key = self._key(key)
+        expiration = int(time.time()) + self.ttl
+
+        self._cache_set(key, expiration)
+
+        if self.table is None:
+            return
+
+        self.table.put_item(Item={
+            "id": key,
+            "status": STATUS_COMPLETED,
+            "expiration": expiration
+        })
+
+    def release(self, key: str) -> None:
+        """
+        Release an in-progress key so that it can be processed again
+        """
+
+        key = self._key(key)
+
+        self._cache.pop(key, None)
+
+        if self.table is None:
+            return
+
+        self.table.delete_item(Key={"id": key})
+
+
+def event_id(event: dict) -> Optional[str]:
+    """
+    Returns the EventBridge event ID
+    """
+
+    return event.get("id", None)
+
+
+def idempotent(
+        store: IdempotencyStore,
+        key: Callable[[dict], Optional[str]] = event_id
+    ) -> Callable:
+    """
+    Decorator to make a Lambda function handler idempotent
+
+    `key` extracts the idempotency key from the event, such as the EventBridge
+    event ID (default) or a business key. Events without a key are always
+    processed. Duplicates return None without calling the handler.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            idempotency_key = key(event)
+            if idempotency_key is None:
+                return handler(event, context)
+
+            if not store.start(idempotency_key):
+                return None
+
+            try:
+                retval = handler(event, context)
+            except Exception:
+                store.release(idempotency_key)
+                raise
+
+            store.complete(idempotency_key)
+            return retval
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,109 @@
+"""
+Latency instrumentation for downstream calls
+
+This records the latency, retries and errors of calls to other services into
+a MetricsAggregator, with a 'dependency' dimension such as
+'dynamodb.GetItem'. Unlike X-Ray tracing, this is cheap enough to be always
+on and covers every call, which gives percentiles per dependency.
+
+Functions create one MetricsAggregator at module level, instrument their
+clients with it, and flush it once per invocation with its `log_metrics`
+decorator. Metrics are aggregated in memory in between, so instrumenting a
+call does not add any I/O:
+
+    dependency_metrics = MetricsAggregator(namespace="ecommerce.orders", dimensions={"environment": ENVIRONMENT})
+    instrument_client(dynamodb, dependency_metrics)
+
+    @dependency_metrics.log_metrics
+    def handler(event, context):
+        ...
+"""
+
+
+import contextlib
+import time
+from typing import Any, Iterator
+from .metrics import MetricsAggregator
+
+
+__all__ = ["instrument_client", "timed"]
+
+
+LATENCY_METRIC = "dependencyLatency"
+RETRIES_METRIC = "dependencyRetries"
+ERRORS_METRIC = "dependencyErrors"
+
+# Key used to store the dependency and start time in the botocore request
+# context
+_CONTEXT_KEY = "ecom_instrumentation_start"
+
+
+def _record(metrics: MetricsAggregator, dependency: str, latency: float, retries: int, error: bool) -> None:
+    dimensions = {"dependency": dependency}
+    metrics.add_histogram(LATENCY_METRIC, "Milliseconds", latency*1000, dimensions=dimensions)
+    if retries:
+        metrics.add_metric(RETRIES_METRIC, "Count", retries, dimensions=dimensions)
+    if error:
+        metrics.add_metric(ERRORS_METRIC, "Count", 1, dimensions=dimensions)
+
+
+def instrument_client(client: Any, metrics: MetricsAggregator) -> Any:
+    """
+    Record latency metrics for all API calls made by a boto3 client
+
+    This also accepts boto3 resources and DynamoDB tables, in which case the
+    underlying client is instrumented. Returns the client or resource for
+    convenience.
+    """
+
+    base_client = getattr(client.meta, "client", client)
+
+    def before_call(model, context: dict, **_) -> None:
+        context[_CONTEXT_KEY] = (
+            "{}.{}".format(model.service_model.service_name, model.name),
+            time.perf_counter()
+        )
+
+    def after_call(context: dict, parsed: dict, **_) -> None:
+        if _CONTEXT_KEY not in context:
+            return
+        dependency, start = context.pop(_CONTEXT_KEY)
+        metadata = parsed.get("ResponseMetadata", {})
+        _record(metrics, dependency, time.perf_counter()-start,
+                metadata.get("RetryAttempts", 0), "Error" in parsed)
+
+    def after_call_error(context: dict, **_) -> None:
+        # Raised when no response was received, e.g. connection errors
+        if _CONTEXT_KEY not in context:
+            return
+        dependency, start = context.pop(_CONTEXT_KEY)
+        _record(metrics, dependency, time.perf_counter()-start, 0, True)
+
+    events = base_client.meta.events
+    # Other 'before-call' handlers, such as botocore stubs, can short-circuit
+    # the call and must run after this one.
+    events.register_first("before-call.*.*", before_call, unique_id=_CONTEXT_KEY+"-before")
+    events.register("after-call", after_call, unique_id=_CONTEXT_KEY+"-after")
+    events.register("after-call-error", after_call_error, unique_id=_CONTEXT_KEY+"-error")
+
+    return client
+
+
+@contextlib.contextmanager
+def timed(metrics: MetricsAggregator, dependency: str) -> Iterator[None]:
+    """
+    Record the latency of a block of code as a call to a dependency
+
+    Exceptions raised within the block are recorded as errors:
+
+        with timed(metrics, "delivery.pricing"):
+            response = requests.post(url, json=payload, auth=auth)
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _record(metrics, dependency, time.perf_counter()-start, 0, True)
+        raise
+    _record(metrics, dependency, time.perf_counter()-start, 0, False)
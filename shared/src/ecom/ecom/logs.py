@@ -0,0 +1,150 @@
+"""
+Logging helpers for Lambda functions
+
+Log payloads such as whole events or stream batches are expensive to build and
+serialize. This module wraps a logger so that payloads are only computed when
+the log level is enabled, verbose records can be sampled, and large objects
+are truncated before serialization.
+
+Functions processing stream batches typically log whole batches with
+`verbose()` on a logger created with a low `sample_rate`, such as
+`LazyLogger(logger, sample_rate=0.1)`, so that debug logs stay affordable
+under load.
+"""
+
+
+import logging
+import random
+from typing import Any, Optional
+
+
+__all__ = ["LazyLogger", "truncate"]
+
+
+def truncate(value: Any, max_items: int = 10, max_length: int = 1000, depth: int = 4) -> Any:
+    """
+    Returns a copy of a value with size caps applied
+
+    Lists and dicts are limited to `max_items` entries, strings to
+    `max_length` characters and nesting to `depth` levels. Truncated
+    containers are marked with a '...' entry stating how many entries were
+    dropped.
+    """
+
+    if isinstance(value, str):
+        if len(value) > max_length:
+            return value[:max_length] + "...({} more)".format(len(value)-max_length)
+        return value
+
+    if isinstance(value, (list, tuple)):
+        if depth <= 0:
+            return "[{} item(s)]".format(len(value))
+        retval = [truncate(v, max_items, max_length, depth-1) for v in value[:max_items]]
+        if len(value) > max_items:
+            retval.append("...({} more)".format(len(value)-max_items))
+        return retval
+
+    if isinstance(value, dict):
+        if depth <= 0:
+            return "{{{} key(s)}}".format(len(value))
+        retval = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= max_items:
+                retval["..."] = "{} more".format(len(value)-max_items)
+                break
+            retval[k] = truncate(v, max_items, max_length, depth-1)
+        return retval
+
+    return value
+
+
+class LazyLogger:
+    """
+    Wrapper around a logger with lazily evaluated payloads
+
+    Fields passed as keyword arguments are only evaluated when the log level
+    is enabled. Callables are invoked to produce the field value, and values
+    are truncated with `truncate()`:
+
+        log = LazyLogger(logger)
+        log.debug("Input event", event=lambda: event)
+
+    `verbose()` logs at debug level for a sample of calls only, determined by
+    `sample_rate`.
+    """
+
+    def __init__(
+            self,
+            logger: Any,
+            sample_rate: float = 1.0,
+            max_items: int = 10,
+            max_length: int = 1000
+        ):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.max_items = max_items
+        self.max_length = max_length
+
+    def is_enabled(self, level: int) -> bool:
+        """
+        Returns True if the logger emits records for this level
+        """
+
+        return self.logger.isEnabledFor(level)
+
+    def _payload(self, message: str, fields: dict) -> dict:
+        payload = {"message": message}
+        for key, value in fields.items():
+            if callable(value):
+                value = value()
+            payload[key] = truncate(value, self.max_items, self.max_length)
+        return payload
+
+    def _log(self, level: int, message: str, fields: dict) -> None:
+        # Called from the public methods below: stacklevel=3 attributes
+        # records to their caller rather than to this module.
+        if not self.is_enabled(level):
+            return
+
+        self.logger.log(level, self._payload(message, fields), stacklevel=3)
+
+    def log(self, level: int, message: str, **fields) -> None:
+        """
+        Log a message with fields at the given level
+        """
+
+        self._log(level, message, fields)
+
+    def debug(self, message: str, **fields) -> None:
+        """
+        Log a message with fields at debug level
+        """
+
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields) -> None:
+        """
+        Log a message with fields at info level
+        """
+
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields) -> None:
+        """
+        Log a message with fields at warning level
+        """
+
+        self._log(logging.WARNING, message, fields)
+
+    def verbose(self, message: str, sample_rate: Optional[float] = None, **fields) -> None:
+        """
+        Log a message with fields at debug level for a sample of calls
+        """
+
+        if not self.is_enabled(logging.DEBUG):
+            return
+
+        if random.random() >= (self.sample_rate if sample_rate is None else sample_rate):
+            return
+
+        self._log(logging.DEBUG, message, fields)
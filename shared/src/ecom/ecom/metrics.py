@@ -0,0 +1,233 @@
+"""
+Metrics aggregation for Lambda functions
+
+Adding the same metric once per record creates one datapoint per call in the
+CloudWatch Embedded Metric Format (EMF) document. This module aggregates
+counters in memory during an invocation and writes a single datapoint per
+metric and dimension set when flushed.
+
+Histograms keep individual values, which lets CloudWatch compute percentiles.
+They are emitted in chunks of at most 100 values, the EMF limit per metric.
+"""
+
+
+import datetime
+import functools
+import json
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+__all__ = ["MetricsAggregator"]
+
+
+# Maximum number of values per metric in an EMF document
+MAX_VALUES = 100
+# Maximum number of metrics per EMF document
+MAX_METRICS = 100
+
+
+class MetricsAggregator:
+    """
+    Aggregate metrics in memory and emit them as EMF documents
+
+    This exposes `add_metric()`, `add_dimension()` and `log_metrics()` with
+    the same signatures as the Metrics class from AWS Lambda Powertools.
+
+    `dimensions` are added to every document, while dimensions added with
+    `add_dimension()` are cleared after each flush. Metrics can also be
+    recorded with extra dimensions, which are emitted in separate documents.
+
+    Metrics can be added from multiple threads.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            dimensions: Optional[Dict[str, str]] = None,
+            max_samples: int = 1000
+        ):
+        self.namespace = namespace
+        self.default_dimensions = dict(dimensions or {})
+        self.max_samples = max_samples
+        self.dimensions = {}
+        # {(dimensions, name): [unit, value]}
+        self._counters = {}
+        # {(dimensions, name): [unit, high_resolution, seen, values]}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, dimensions: Optional[Dict[str, str]]) -> Tuple[tuple, str]:
+        return (tuple(sorted((dimensions or {}).items())), name)
+
+    def add_dimension(self, name: str, value: str) -> None:
+        """
+        Add a dimension to all metrics until the next flush
+        """
+
+        with self._lock:
+            self.dimensions[name] = value
+
+    def add_metric(
+            self,
+            name: str,
+            unit: str,
+            value: float = 1,
+            dimensions: Optional[Dict[str, str]] = None
+        ) -> None:
+        """
+        Add a value to a counter
+        """
+
+        unit = getattr(unit, "value", unit)
+        key = self._key(name, dimensions)
+        with self._lock:
+            counter = self._counters.get(key, None)
+            if counter is None:
+                self._counters[key] = [unit, value]
+            else:
+                counter[1] += value
+
+    def add_histogram(
+            self,
+            name: str,
+            unit: str,
+            value: float,
+            dimensions: Optional[Dict[str, str]] = None,
+            high_resolution: bool = False
+        ) -> None:
+        """
+        Record a value in a histogram
+
+        At most `max_samples` values are kept per histogram and invocation,
+        using reservoir sampling.
+        """
+
+        unit = getattr(unit, "value", unit)
+        key = self._key(name, dimensions)
+        with self._lock:
+            histogram = self._histograms.get(key, None)
+            if histogram is None:
+                histogram = self._histograms[key] = [unit, high_resolution, 0, []]
+
+            histogram[2] += 1
+            if len(histogram[3]) < self.max_samples:
+                histogram[3].append(value)
+            else:
+                index = random.randrange(histogram[2])
+                if index < self.max_samples:
+                    histogram[3][index] = value
+
+    def _serialize(self, invocation_dimensions: Dict[str, str], counters: dict, histograms: dict) -> List[dict]:
+        timestamp = int(datetime.datetime.now().timestamp() * 1000)
+
+        # Group metrics by dimension set
+        # {dimensions: [(name, unit, high_resolution, [values])]}
+        groups = {}
+        for (dimensions, name), (unit, value) in counters.items():
+            groups.setdefault(dimensions, []).append((name, unit, False, [value]))
+        for (dimensions, name), (unit, high_resolution, _, values) in histograms.items():
+            groups.setdefault(dimensions, []).append((name, unit, high_resolution, values))
+
+        documents = []
+        for extra_dimensions, entries in groups.items():
+            dimensions = dict(self.default_dimensions, **invocation_dimensions)
+            dimensions.update(extra_dimensions)
+
+            # Split metrics into documents respecting the EMF limits
+            chunks = []
+            for name, unit, high_resolution, values in entries:
+                for i in range(0, len(values), MAX_VALUES):
+                    chunk = values[i:i+MAX_VALUES]
+                    for document in chunks:
+                        if name not in document and len(document) < MAX_METRICS:
+                            break
+                    else:
+                        document = {}
+                        chunks.append(document)
+                    document[name] = (unit, high_resolution, chunk)
+
+            for chunk in chunks:
+                definitions = []
+                document = {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [{
+                            "Namespace": self.namespace,
+                            "Dimensions": [list(dimensions.keys())],
+                            "Metrics": definitions
+                        }]
+                    },
+                    **dimensions
+                }
+                for name, (unit, high_resolution, values) in chunk.items():
+                    definition = {"Name": name, "Unit": unit}
+                    if high_resolution:
+                        definition["StorageResolution"] = 1
+                    definitions.append(definition)
+                    document[name] = values[0] if len(values) == 1 else values
+                documents.append(document)
+
+        return documents
+
+    def serialize(self) -> List[dict]:
+        """
+        Returns the EMF documents for the aggregated metrics
+        """
+
+        with self._lock:
+            dimensions = dict(self.dimensions)
+            counters = {key: list(counter) for key, counter in self._counters.items()}
+            histograms = {
+                key: [unit, high_resolution, seen, list(values)]
+                for key, (unit, high_resolution, seen, values) in self._histograms.items()
+            }
+        return self._serialize(dimensions, counters, histograms)
+
+    def _swap(self) -> Tuple[Dict[str, str], dict, dict]:
+        with self._lock:
+            state = (self.dimensions, self._counters, self._histograms)
+            self.dimensions = {}
+            self._counters = {}
+            self._histograms = {}
+        return state
+
+    def clear(self) -> None:
+        """
+        Remove all aggregated metrics and per-invocation dimensions
+        """
+
+        self._swap()
+
+    def flush(self) -> None:
+        """
+        Write the aggregated metrics to stdout and clear them
+
+        Metrics added while flushing are kept for the next flush.
+        """
+
+        for document in self._serialize(*self._swap()):
+            print(json.dumps(document, separators=(",", ":")))
+
+    def log_metrics(self, handler: Optional[Callable] = None, **_) -> Callable:
+        """
+        Decorator to flush metrics after each Lambda function invocation
+
+        This can be used as `@log_metrics` or `@log_metrics(...)`. Keyword
+        arguments are accepted for compatibility and ignored: nothing is
+        written if no metrics were added.
+        """
+
+        if handler is None:
+            return self.log_metrics
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            try:
+                return handler(event, context)
+            finally:
+                self.flush()
+
+        return wrapper
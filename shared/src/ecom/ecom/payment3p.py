@@ -0,0 +1,256 @@
+"""
+Client for the 3rd party payment API
+
+This module requires the 'requests' package and is therefore not imported by
+default. Use `from ecom.payment3p import Payment3PClient` in Lambda functions
+that have 'requests' in their requirements.txt.
+"""
+
+
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+
+__all__ = [
+    "CircuitBreaker", "CircuitOpenError", "Endpoint",
+    "Payment3PClient", "Payment3PError"
+]
+
+
+class Payment3PError(Exception):
+    """
+    The 3rd party payment API could not be reached or returned a server error
+    """
+
+
+class CircuitOpenError(Payment3PError):
+    """
+    The circuit breaker is open and calls fail fast
+    """
+
+
+class Endpoint(NamedTuple):
+    """
+    Settings for a 3rd party payment API endpoint
+
+    `retry_on_timeout` should only be set for endpoints that are safe to call
+    multiple times. Otherwise, only errors raised before the request was sent,
+    such as connect timeouts or refused connections, are retried. Other
+    connection errors, such as the server closing the connection before
+    responding, are handled like read timeouts, as the server may have
+    processed the request.
+    """
+
+    path: str
+    # (connect, read) timeouts in seconds
+    timeout: Tuple[float, float]
+    retries: int
+    retry_on_timeout: bool
+
+
+ENDPOINTS = {
+    "check": Endpoint("/check", (1.0, 2.0), 2, True),
+    "preauth": Endpoint("/preauth", (1.0, 3.0), 1, False),
+    "processPayment": Endpoint("/processPayment", (1.0, 5.0), 1, False),
+    "cancelPayment": Endpoint("/cancelPayment", (1.0, 5.0), 1, False),
+    "updateAmount": Endpoint("/updateAmount", (1.0, 5.0), 1, False)
+}
+
+
+def _before_send(exc: requests.exceptions.ConnectionError) -> bool:
+    """
+    Returns True if a connection error was raised before the request was sent
+    """
+
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    # Connection refused or DNS failures are wrapped in a MaxRetryError, while
+    # errors after sending the request are wrapped in a ProtocolError
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+class CircuitBreaker:
+    """
+    Fail fast after `failure_threshold` consecutive failures
+
+    Once open, the circuit lets a single trial call through after
+    `reset_timeout` seconds. A successful trial closes the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Returns the state of the circuit: 'closed', 'open' or 'half-open'
+        """
+
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        """
+        Raise CircuitOpenError if calls are not allowed
+        """
+
+        with self._lock:
+            state = self.state
+            if state == "open":
+                raise CircuitOpenError("Circuit open for the 3rd party payment API")
+            if state == "half-open":
+                # Only let one trial call through until it completes
+                self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        """
+        Record a successful call
+        """
+
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """
+        Record a failed call
+        """
+
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class Payment3PClient:
+    """
+    Client for the 3rd party payment API
+
+    The client reuses pooled connections across calls and Lambda invocations,
+    applies per-endpoint timeouts and retries, and stops calling the API while
+    it is degraded.
+
+    If `metrics` is provided, it must expose `add_metric(name, unit, value)`,
+    such as the Metrics class from AWS Lambda Powertools.
+    """
+
+    def __init__(
+            self,
+            api_url: str,
+            metrics: Any = None,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            endpoints: Optional[Dict[str, Endpoint]] = None,
+            backoff: float = 0.05,
+            pool_size: int = 10
+        ):
+        self.api_url = api_url
+        self.metrics = metrics
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.endpoints = dict(ENDPOINTS, **(endpoints or {}))
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _add_metric(self, name: str, unit: str, value: float) -> None:
+        if self.metrics is not None:
+            self.metrics.add_metric(name=name, unit=unit, value=value)
+
+    def post(self, name: str, payload: dict) -> dict:
+        """
+        Send a request to a 3rd party payment API endpoint
+
+        Returns the response body for 2XX and 4XX responses. Raises
+        Payment3PError for connection errors, timeouts and 5XX responses once
+        retries are exhausted.
+        """
+
+        endpoint = self.endpoints[name]
+        self.circuit_breaker.before_call()
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            error = None
+            try:
+                response = self.session.post(
+                    self.api_url+endpoint.path,
+                    json=payload,
+                    timeout=endpoint.timeout
+                )
+            except requests.exceptions.ConnectionError as exc:
+                # ConnectTimeout is a subclass of ConnectionError
+                error = exc
+                retryable = endpoint.retry_on_timeout or _before_send(exc)
+            except requests.exceptions.Timeout as exc:
+                error = exc
+                retryable = endpoint.retry_on_timeout
+            else:
+                if response.status_code >= 500:
+                    error = Payment3PError("{} returned status {}".format(endpoint.path, response.status_code))
+                    retryable = endpoint.retry_on_timeout
+            finally:
+                self._add_metric("payment3p{}Latency".format(name[0].upper()+name[1:]), "Milliseconds",
+                                 (time.perf_counter()-start)*1000)
+
+            if error is None:
+                self.circuit_breaker.record_success()
+                return response.json()
+
+            self._add_metric("payment3pErrors", "Count", 1)
+            if not retryable or attempt >= endpoint.retries:
+                self.circuit_breaker.record_failure()
+                raise Payment3PError("Failed to call {}: {}".format(endpoint.path, error)) from error
+
+            attempt += 1
+            self._add_metric("payment3pRetries", "Count", 1)
+            time.sleep(self.backoff * 2**(attempt-1))
+
+    def check(self, payment_token: str, amount: int) -> dict:
+        """
+        Check if a paymentToken and amount are correct
+        """
+
+        return self.post("check", {"paymentToken": payment_token, "amount": amount})
+
+    def preauth(self, card_number: str, amount: int) -> dict:
+        """
+        Returns a pre-authorization token for a payment
+        """
+
+        return self.post("preauth", {"cardNumber": card_number, "amount": amount})
+
+    def process_payment(self, payment_token: str) -> dict:
+        """
+        Process a payment
+        """
+
+        return self.post("processPayment", {"paymentToken": payment_token})
+
+    def cancel_payment(self, payment_token: str) -> dict:
+        """
+        Revoke a paymentToken
+        """
+
+        return self.post("cancelPayment", {"paymentToken": payment_token})
+
+    def update_amount(self, payment_token: str, amount: int) -> dict:
+        """
+        Update the amount for the paymentToken
+        """
+
+        return self.post("updateAmount", {"paymentToken": payment_token, "amount": amount})
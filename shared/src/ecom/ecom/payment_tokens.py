@@ -0,0 +1,242 @@
+"""
+Storage for payment tokens
+
+Payment tokens are kept in a DynamoDB table with 'orderId' as the partition
+key, from the creation of an order until its payment is processed or
+cancelled.
+
+Processing a token happens in two phases: the token is first claimed with a
+'PROCESSING' status, an owner and an expiration, then deleted once the 3rd
+party payment call succeeded. A failed call releases the claim, and a claim
+left behind by a crashed invocation can be taken over once it expires.
+
+This takes two round-trips per token, as many as reading then deleting it.
+A single DeleteItem returning the old item would lose the token if the
+invocation stopped before the payment went through. Batches amortize the
+cost instead: tokens are read with BatchGetItem and claimed in a single
+transaction, see `PaymentTokenStore.claim_many()`, then deleted with
+BatchWriteItem.
+"""
+
+
+import contextlib
+import time
+import uuid
+from typing import Dict, Iterator, List, Tuple
+import boto3
+from botocore.exceptions import ClientError
+
+
+__all__ = ["PaymentTokenInProgressError", "PaymentTokenNotFoundError", "PaymentTokenStore"]
+
+
+STATUS_PROCESSING = "PROCESSING"
+# Maximum number of keys in BatchGetItem and items in TransactWriteItems
+MAX_BATCH_SIZE = 100
+
+
+class PaymentTokenNotFoundError(Exception):
+    """
+    No paymentToken is stored for an order
+    """
+
+
+class PaymentTokenInProgressError(Exception):
+    """
+    The paymentToken of an order is being processed by another invocation
+    """
+
+
+class PaymentTokenStore:
+    """
+    Store paymentTokens for orders
+    """
+
+    def __init__(self, table_name: str, claim_ttl: int = 60):
+        self.table_name = table_name
+        self.claim_ttl = claim_ttl
+        self.table = boto3.resource("dynamodb").Table(table_name) # pylint: disable=no-member
+
+    def save(self, order_id: str, payment_token: str) -> None:
+        """
+        Save the paymentToken for an order
+        """
+
+        self.table.put_item(Item={
+            "orderId": order_id,
+            "paymentToken": payment_token
+        })
+
+    def get(self, order_id: str) -> str:
+        """
+        Retrieve the paymentToken for an order
+        """
+
+        response = self.table.get_item(Key={"orderId": order_id})
+
+        if "Item" not in response:
+            raise PaymentTokenNotFoundError("No paymentToken for order {}".format(order_id))
+
+        return response["Item"]["paymentToken"]
+
+    def _claim_args(self, order_id: str, owner: str, now: int) -> dict:
+        return {
+            "Key": {"orderId": order_id},
+            "UpdateExpression": "SET #status = :status, claimOwner = :owner, claimExpiration = :expiration",
+            "ConditionExpression": "attribute_exists(orderId) AND "
+                                   "(attribute_not_exists(claimExpiration) OR claimExpiration < :now)",
+            "ExpressionAttributeNames": {"#status": "status"},
+            "ExpressionAttributeValues": {
+                ":status": STATUS_PROCESSING,
+                ":owner": owner,
+                ":expiration": now + self.claim_ttl,
+                ":now": now
+            }
+        }
+
+    def claim(self, order_id: str, owner: str) -> str:
+        """
+        Mark the paymentToken of an order as being processed by `owner`
+
+        Returns the paymentToken. This raises PaymentTokenInProgressError if
+        another owner holds the token and its claim did not expire yet, so
+        that a retry can take over the token of an invocation that crashed or
+        timed out.
+        """
+
+        try:
+            item = self.table.update_item(
+                **self._claim_args(order_id, owner, int(time.time())),
+                ReturnValues="ALL_NEW",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD"
+            )["Attributes"]
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            if "Item" not in exc.response:
+                raise PaymentTokenNotFoundError("No paymentToken for order {}".format(order_id))
+            raise PaymentTokenInProgressError("paymentToken for order {} is being processed".format(order_id))
+
+        return item["paymentToken"]
+
+    def claim_many(self, order_ids: List[str], owner: str) -> Tuple[Dict[str, str], Dict[str, Exception]]:
+        """
+        Claim the paymentTokens of multiple orders for `owner`
+
+        Tokens are read with BatchGetItem and claimed with TransactWriteItems,
+        so that up to 100 orders take two round-trips. If the transaction is
+        cancelled, e.g. because another invocation claimed one of the tokens
+        in the meantime, or if keys are left unprocessed, these orders are
+        claimed one by one with `claim()`. `order_ids` must be unique.
+
+        Returns the paymentTokens of claimed orders, and the errors of the
+        other orders.
+        """
+
+        tokens = {}
+        errors = {}
+        fallback = []
+        now = int(time.time())
+
+        for start in range(0, len(order_ids), MAX_BATCH_SIZE):
+            chunk = order_ids[start:start+MAX_BATCH_SIZE]
+            response = self.table.meta.client.batch_get_item(RequestItems={self.table_name: {
+                "Keys": [{"orderId": order_id} for order_id in chunk],
+                "ConsistentRead": True
+            }})
+            items = {item["orderId"]: item for item in response["Responses"].get(self.table_name, [])}
+            unprocessed = {
+                key["orderId"]
+                for key in response.get("UnprocessedKeys", {}).get(self.table_name, {}).get("Keys", [])
+            }
+
+            candidates = []
+            for order_id in chunk:
+                if order_id in unprocessed:
+                    fallback.append(order_id)
+                elif order_id not in items:
+                    errors[order_id] = PaymentTokenNotFoundError("No paymentToken for order {}".format(order_id))
+                elif items[order_id].get("claimExpiration", 0) >= now:
+                    errors[order_id] = PaymentTokenInProgressError(
+                        "paymentToken for order {} is being processed".format(order_id)
+                    )
+                else:
+                    candidates.append(order_id)
+
+            if not candidates:
+                continue
+
+            try:
+                self.table.meta.client.transact_write_items(TransactItems=[
+                    {"Update": dict(self._claim_args(order_id, owner, now), TableName=self.table_name)}
+                    for order_id in candidates
+                ])
+            except ClientError as exc:
+                if exc.response["Error"]["Code"] != "TransactionCanceledException":
+                    raise
+                fallback.extend(candidates)
+                continue
+            tokens.update((order_id, items[order_id]["paymentToken"]) for order_id in candidates)
+
+        for order_id in fallback:
+            try:
+                tokens[order_id] = self.claim(order_id, owner)
+            except (PaymentTokenNotFoundError, PaymentTokenInProgressError) as exc:
+                errors[order_id] = exc
+
+        return tokens, errors
+
+    def release(self, order_id: str, owner: str) -> None:
+        """
+        Release a claimed paymentToken so that it can be processed again
+
+        This does nothing if the claim was taken over by another owner.
+        """
+
+        try:
+            self.table.update_item(
+                Key={"orderId": order_id},
+                UpdateExpression="REMOVE #status, claimOwner, claimExpiration",
+                ConditionExpression="claimOwner = :owner",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":owner": owner}
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    def delete_many(self, order_ids: List[str]) -> None:
+        """
+        Delete paymentTokens for multiple orders
+        """
+
+        with self.table.batch_writer() as batch:
+            for order_id in order_ids:
+                batch.delete_item(Key={"orderId": order_id})
+
+    @contextlib.contextmanager
+    def consume(self, order_id: str) -> Iterator[str]:
+        """
+        Claim a paymentToken, and delete it if the body of the `with`
+        statement succeeds
+
+        If the body raises an exception, the claim is released so that the
+        event can be retried. If the invocation stops before that, e.g. on a
+        timeout, retries take over the claim once it expires.
+
+        Usage:
+
+            with store.consume(order_id) as payment_token:
+                process_payment(payment_token)
+        """
+
+        owner = str(uuid.uuid4())
+        payment_token = self.claim(order_id, owner)
+
+        try:
+            yield payment_token
+        except Exception:
+            self.release(order_id, owner)
+            raise
+
+        self.table.delete_item(Key={"orderId": order_id})
@@ -0,0 +1,312 @@
+"""
+Replay helpers to regenerate events from table data
+
+These rebuild '*Created' events for every item of a DynamoDB table, either by
+scanning the table with parallel segments or by reading a DynamoDB export
+snapshot from local disk. Events are published to EventBridge in batches at
+a bounded rate, and progress is checkpointed to a local file so that an
+interrupted run resumes where it stopped.
+
+See `tools/replay` for the command line interface.
+"""
+
+
+import concurrent.futures
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .claimcheck import ClaimCheck
+from .eventbridge import batch_events, ddb_to_event
+
+
+__all__ = [
+    "Checkpoint", "EventPublisher", "RateLimiter",
+    "item_to_event", "read_snapshot", "replay_snapshot", "replay_table"
+]
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` operations per second on average
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int = 1) -> None:
+        """
+        Wait until `count` operations are allowed
+
+        Counts above the burst size are acquired in several steps, as the
+        bucket never holds more than `burst` tokens.
+        """
+
+        while count > 0:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now-self.updated_at)*self.rate)
+                self.updated_at = now
+                step = min(count, self.burst)
+                if self.tokens >= step:
+                    self.tokens -= step
+                    count -= step
+                    continue
+                wait = (step-self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EventPublisher:
+    """
+    Publish events to EventBridge in batches
+
+    Batches respect both the entry count and size limits of PutEvents, see
+    `ecom.eventbridge.batch_events()`. If `claim_check` is set, oversized
+    details are checked in before batching, as done by the table_update
+    functions.
+
+    Entries rejected by EventBridge are retried up to `retries` times with
+    exponential backoff. If `rate_limiter` is set, it is acquired once per
+    event.
+    """
+
+    def __init__(
+            self,
+            eventbridge: Any,
+            rate_limiter: Optional[RateLimiter] = None,
+            retries: int = 5,
+            backoff: float = 0.1,
+            claim_check: Optional[ClaimCheck] = None
+        ):
+        self.eventbridge = eventbridge
+        self.rate_limiter = rate_limiter
+        self.claim_check = claim_check
+        self.retries = retries
+        self.backoff = backoff
+        self.published = 0
+        self._lock = threading.Lock()
+
+    def _put_events(self, entries: List[dict]) -> None:
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(len(entries))
+
+            response = self.eventbridge.put_events(Entries=entries)
+            if response.get("FailedEntryCount", 0) == 0:
+                return
+
+            # Results are in the same order as entries
+            entries = [
+                entry for entry, result in zip(entries, response["Entries"])
+                if "ErrorCode" in result
+            ]
+            attempt += 1
+            if attempt > self.retries:
+                raise RuntimeError("Failed to publish {} event(s)".format(len(entries)))
+            time.sleep(self.backoff * 2**(attempt-1))
+
+    def publish(self, events: List[dict]) -> None:
+        """
+        Publish events to EventBridge
+        """
+
+        if self.claim_check is not None:
+            events = [self.claim_check.check_in(event) for event in events]
+
+        for batch in batch_events(events):
+            self._put_events(batch)
+
+        with self._lock:
+            self.published += len(events)
+
+
+class Checkpoint:
+    """
+    Progress of a replay, saved as a JSON file
+
+    Progress is stored per unit of work, such as a scan segment or a snapshot
+    file. When `path` is None, progress is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.isfile(path):
+            with open(path) as fp:
+                self.state = json.load(fp)
+
+    def get(self, unit: str, default: Any = None) -> Any:
+        """
+        Returns the progress for a unit of work
+        """
+
+        with self._lock:
+            return self.state.get(unit, default)
+
+    def set(self, unit: str, value: Any) -> None:
+        """
+        Save the progress for a unit of work
+        """
+
+        with self._lock:
+            self.state[unit] = value
+            if self.path is None:
+                return
+            # Write atomically so that an interruption cannot corrupt the file
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as fp:
+                json.dump(self.state, fp)
+            os.replace(tmp_path, self.path)
+
+
+def item_to_event(
+        item: dict,
+        event_bus_name: str,
+        source: str,
+        object_type: str,
+        resource_key: str
+    ) -> dict:
+    """
+    Transform an item in DynamoDB JSON format into a '*Created' event
+    """
+
+    record = {
+        "eventName": "INSERT",
+        "dynamodb": {
+            "Keys": {resource_key: item[resource_key]},
+            "NewImage": item
+        }
+    }
+
+    return ddb_to_event(record, event_bus_name, source, object_type, resource_key)
+
+
+def _snapshot_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(
+            glob.glob(os.path.join(path, "**", "*.json.gz"), recursive=True)
+            + glob.glob(os.path.join(path, "**", "*.json"), recursive=True)
+        )
+    return [path]
+
+
+def read_snapshot(path: str, skip: int = 0) -> Iterator[dict]:
+    """
+    Yield items from a DynamoDB export file in DynamoDB JSON format
+
+    Each line contains an object with an 'Item' key. Files ending in '.gz'
+    are decompressed. The first `skip` items are skipped.
+    """
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fp:
+        for i, line in enumerate(fp):
+            if i < skip or not line.strip():
+                continue
+            yield json.loads(line)["Item"]
+
+
+def _scan_segment(
+        client: Any,
+        table_name: str,
+        segment: int,
+        segments: int,
+        start_key: Optional[dict],
+        page_size: int
+    ) -> Iterator[Tuple[List[dict], Optional[dict]]]:
+    kwargs = {"TableName": table_name, "Segment": segment, "TotalSegments": segments, "Limit": page_size}
+    if start_key is not None:
+        kwargs["ExclusiveStartKey"] = start_key
+    while True:
+        res = client.scan(**kwargs)
+        last_key = res.get("LastEvaluatedKey", None)
+        yield res.get("Items", []), last_key
+        if last_key is None:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def replay_table(
+        client: Any,
+        table_name: str,
+        publisher: EventPublisher,
+        checkpoint: Checkpoint,
+        event_args: Dict[str, str],
+        segments: int = 8,
+        page_size: int = 1000
+    ) -> int:
+    """
+    Regenerate events for all items of a DynamoDB table
+
+    `client` is a low-level DynamoDB client, as items must be in DynamoDB
+    JSON format. `event_args` are passed to `item_to_event()`. The last
+    evaluated key of each segment is checkpointed once its page is
+    published. Returns the number of events published.
+    """
+
+    def worker(segment: int) -> int:
+        unit = "segment-{}-of-{}".format(segment, segments)
+        progress = checkpoint.get(unit, {})
+        if progress.get("done", False):
+            return 0
+
+        count = 0
+        for items, last_key in _scan_segment(
+                client, table_name, segment, segments, progress.get("key", None), page_size
+            ):
+            publisher.publish([item_to_event(item, **event_args) for item in items])
+            count += len(items)
+            checkpoint.set(unit, {"key": last_key, "done": last_key is None})
+        return count
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=segments) as executor:
+        return sum(executor.map(worker, range(segments)))
+
+
+def replay_snapshot(
+        path: str,
+        publisher: EventPublisher,
+        checkpoint: Checkpoint,
+        event_args: Dict[str, str],
+        workers: int = 8,
+        page_size: int = 1000
+    ) -> int:
+    """
+    Regenerate events for all items of a DynamoDB export on local disk
+
+    `path` is an export file or a directory containing export files, which
+    are processed in parallel. The number of items published per file is
+    checkpointed every `page_size` items. Returns the number of events
+    published.
+    """
+
+    def flush(unit: str, events: List[dict], done: int) -> None:
+        publisher.publish(events)
+        checkpoint.set(unit, done)
+
+    def worker(filename: str) -> int:
+        unit = os.path.abspath(filename)
+        done = checkpoint.get(unit, 0)
+        count = 0
+        events = []
+        for item in read_snapshot(filename, skip=done):
+            events.append(item_to_event(item, **event_args))
+            if len(events) >= page_size:
+                count += len(events)
+                flush(unit, events, done+count)
+                events = []
+        count += len(events)
+        flush(unit, events, done+count)
+        return count
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(worker, _snapshot_files(path)))
@@ -0,0 +1,340 @@
+"""
+Product search index
+
+Product fields are split into terms, and the index keeps one posting per
+term, field and product, weighted by field. Searches look up each query term
+as a prefix, keep the products matching all of them, and rank them by score.
+
+Two implementations share the same interface:
+ - `InMemorySearchIndex`, for tests, tools and benchmarks
+ - `DynamoDBSearchIndex`, storing postings in a table partitioned by the
+   first characters of the term, so that a prefix is read with one Query
+
+The index is maintained incrementally with `update()`, from the old and new
+versions of a product, e.g. from a DynamoDB stream record.
+"""
+
+
+import base64
+import binascii
+import bisect
+import heapq
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from boto3.dynamodb.conditions import Key
+from .dynamodb import query
+
+
+__all__ = [
+    "DynamoDBSearchIndex", "InMemorySearchIndex", "Posting",
+    "decode_cursor", "encode_cursor", "postings", "search", "tokenize"
+]
+
+
+# Weight of a term per field it appears in
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "category": 1}
+# Shorter query terms only match whole terms
+MIN_PREFIX_LENGTH = 2
+# Score factor for terms that only match as a prefix
+PREFIX_FACTOR = 0.5
+# Postings read per query term at most, so that very common prefixes have a
+# bounded cost
+MAX_POSTINGS = 10000
+
+_TERM_RE = re.compile(r"\w+")
+
+
+class Posting(NamedTuple):
+    """
+    Occurrence of a term in a field of a product
+    """
+
+    term: str
+    field: str
+    product_id: str
+    weight: int
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Returns the terms of a text, in lowercase
+    """
+
+    return _TERM_RE.findall(text.casefold())
+
+
+def postings(product: Optional[dict]) -> Dict[Tuple[str, str], int]:
+    """
+    Returns the weight of each (term, field) of a product
+    """
+
+    weights = {}
+    if product is None:
+        return weights
+
+    for field, weight in FIELD_WEIGHTS.items():
+        values = product.get(field, None)
+        if values is None:
+            continue
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        for value in values:
+            for term in tokenize(str(value)):
+                weights[(term, field)] = weights.get((term, field), 0) + weight
+
+    return weights
+
+
+# Postings to put and delete for a product
+_Change = Tuple[str, Dict[Tuple[str, str], int], List[Tuple[str, str]]]
+
+
+class _SearchIndex:
+    """
+    Base class for search indexes
+    """
+
+    def _write(self, changes: List[_Change]) -> None:
+        raise NotImplementedError
+
+    def lookup(self, term: str, prefix: bool = True, limit: Optional[int] = None) -> Iterator[Posting]:
+        """
+        Yield postings for a term, or for all terms starting with it
+        """
+
+        raise NotImplementedError
+
+    def update_many(self, products: Iterable[Tuple[str, Optional[dict], Optional[dict]]]) -> int:
+        """
+        Update the postings of products from their old and new versions
+
+        `products` contains (product ID, old, new) tuples, where either
+        version can be None for created and deleted products. A product can
+        appear several times, in order, as in a stream batch: its first old
+        and last new versions are compared. Only the postings that changed are
+        written. Returns the number of changes.
+        """
+
+        # A batch write cannot touch the same key twice
+        versions = {}
+        for product_id, old, new in products:
+            if product_id in versions:
+                old = versions[product_id][0]
+            versions[product_id] = (old, new)
+
+        changes = []
+        for product_id, (old, new) in versions.items():
+            old_postings = postings(old)
+            new_postings = postings(new)
+            puts = {k: v for k, v in new_postings.items() if old_postings.get(k, None) != v}
+            deletes = [k for k in old_postings if k not in new_postings]
+            if puts or deletes:
+                changes.append((product_id, puts, deletes))
+
+        if changes:
+            self._write(changes)
+        return sum(len(puts) + len(deletes) for _, puts, deletes in changes)
+
+    def update(self, product_id: str, old: Optional[dict], new: Optional[dict]) -> int:
+        """
+        Update the postings of a product from its old and new versions
+
+        See `update_many()`.
+        """
+
+        return self.update_many([(product_id, old, new)])
+
+
+class InMemorySearchIndex(_SearchIndex):
+    """
+    Search index kept in memory
+    """
+
+    def __init__(self):
+        # term -> field -> product ID -> weight
+        self._postings = {}
+        # Sorted terms, for prefix lookups
+        self._terms = []
+
+    def __len__(self) -> int:
+        return sum(len(products) for fields in self._postings.values() for products in fields.values())
+
+    def _write(self, changes: List[_Change]) -> None:
+        for product_id, puts, deletes in changes:
+            for (term, field), weight in puts.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    bisect.insort(self._terms, term)
+                self._postings[term].setdefault(field, {})[product_id] = weight
+
+            for term, field in deletes:
+                fields = self._postings.get(term, {})
+                fields.get(field, {}).pop(product_id, None)
+                if fields.get(field, None) == {}:
+                    del fields[field]
+                if term in self._postings and not fields:
+                    del self._postings[term]
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def load(self, products: List[dict]) -> None:
+        """
+        Index many new products at once
+
+        This is faster than calling `update()` for each product, as terms
+        are only sorted once.
+        """
+
+        for product in products:
+            for (term, field), weight in postings(product).items():
+                self._postings.setdefault(term, {}).setdefault(field, {})[product["productId"]] = weight
+        self._terms = sorted(self._postings)
+
+    def lookup(self, term: str, prefix: bool = True, limit: Optional[int] = None) -> Iterator[Posting]:
+        if prefix:
+            start = bisect.bisect_left(self._terms, term)
+            end = bisect.bisect_left(self._terms, term + "\U0010ffff")
+            terms = self._terms[start:end]
+        else:
+            terms = [term] if term in self._postings else []
+
+        count = 0
+        for matched in terms:
+            for field, products in self._postings[matched].items():
+                for product_id, weight in products.items():
+                    yield Posting(matched, field, product_id, weight)
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+
+
+class DynamoDBSearchIndex(_SearchIndex):
+    """
+    Search index stored in a DynamoDB table
+
+    The table has a 'shard' partition key, with the first `shard_length`
+    characters of the term, and a 'posting' sort key as 'term#field#productId'.
+    Terms only contain word characters, so '#' is a safe separator.
+    """
+
+    def __init__(self, table: Any, shard_length: int = MIN_PREFIX_LENGTH):
+        self.table = table
+        self.shard_length = shard_length
+
+    def _key(self, term: str, field: str, product_id: str) -> dict:
+        return {
+            "shard": term[:self.shard_length],
+            "posting": "{}#{}#{}".format(term, field, product_id)
+        }
+
+    def _write(self, changes: List[_Change]) -> None:
+        with self.table.batch_writer() as batch:
+            for product_id, puts, deletes in changes:
+                for (term, field), weight in puts.items():
+                    batch.put_item(Item=dict(
+                        self._key(term, field, product_id),
+                        productId=product_id, weight=weight
+                    ))
+                for term, field in deletes:
+                    batch.delete_item(Key=self._key(term, field, product_id))
+
+    def lookup(self, term: str, prefix: bool = True, limit: Optional[int] = None) -> Iterator[Posting]:
+        # Prefixes shorter than a shard would need to read many partitions
+        if len(term) < self.shard_length:
+            prefix = False
+
+        condition = Key("shard").eq(term[:self.shard_length])
+        condition &= Key("posting").begins_with(term if prefix else term + "#")
+
+        for item in query(self.table, KeyConditionExpression=condition, page_size=1000, limit=limit):
+            matched, field, product_id = item["posting"].split("#", 2)
+            yield Posting(matched, field, product_id, int(item["weight"]))
+
+
+def encode_cursor(score: float, product_id: str) -> str:
+    """
+    Returns an opaque cursor for the last result of a page
+    """
+
+    data = json.dumps([score, product_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Returns the score and product ID from a cursor
+
+    This raises a ValueError if the cursor is invalid.
+    """
+
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+    if (not isinstance(value, list) or len(value) != 2
+            or not isinstance(value[0], (int, float)) or not isinstance(value[1], str)):
+        raise ValueError("Invalid cursor")
+
+    return value[0], value[1]
+
+
+def _scores(index: _SearchIndex, term: str, field: Optional[str], max_postings: int) -> Dict[str, float]:
+    prefix = field is None and len(term) >= MIN_PREFIX_LENGTH
+    scores = {}
+    for posting in index.lookup(term, prefix=prefix, limit=max_postings):
+        if field is not None and posting.field != field:
+            continue
+        score = posting.weight * (1 if posting.term == term else PREFIX_FACTOR)
+        scores[posting.product_id] = scores.get(posting.product_id, 0) + score
+    return scores
+
+
+def search(
+        index: _SearchIndex,
+        text: str = "",
+        tags: Optional[List[str]] = None,
+        category: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        max_postings: int = MAX_POSTINGS
+    ) -> Tuple[List[dict], Optional[str]]:
+    """
+    Search products and returns a page of results and the cursor of the next
+    page, if any
+
+    Terms of `text` match as prefixes in any field. Terms of `tags` and
+    `category` only match whole terms in that field. Products must match
+    all terms, and are ranked by decreasing score then product ID, so that
+    cursors are stable across calls.
+    """
+
+    required = [(term, None) for term in dict.fromkeys(tokenize(text))]
+    required += [(term, "tags") for tag in (tags or []) for term in tokenize(tag)]
+    required += [(term, "category") for term in tokenize(category or "")]
+    if not required:
+        return [], None
+
+    results = None
+    for term, field in required:
+        scores = _scores(index, term, field, max_postings)
+        if results is None:
+            results = scores
+        else:
+            results = {k: v + scores[k] for k, v in results.items() if k in scores}
+        if not results:
+            return [], None
+
+    # Only the results of the page are sorted
+    ranked = ((-score, product_id) for product_id, score in results.items())
+    if cursor is not None:
+        score, product_id = decode_cursor(cursor)
+        ranked = (r for r in ranked if r > (-score, product_id))
+    ranked = heapq.nsmallest(limit+1, ranked)
+
+    page = [{"productId": product_id, "score": -score} for score, product_id in ranked[:limit]]
+    next_cursor = None
+    if len(ranked) > limit:
+        next_cursor = encode_cursor(page[-1]["score"], page[-1]["productId"])
+
+    return page, next_cursor
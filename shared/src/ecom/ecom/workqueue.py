@@ -0,0 +1,176 @@
+"""
+Work queues on DynamoDB tables
+
+Requests waiting to be processed carry two extra attributes: a constant
+partition value, such as isNew="true", and the date from which they are
+visible to workers. A sparse index on these attributes lists waiting requests
+oldest first, and requests leave it once processing starts.
+
+Leasing a request moves its visible date forward by the visibility timeout
+with a conditional update on the value read from the index. Only one worker
+can win that update, and leased requests sort after the ones still waiting,
+so dequeuing reads about as many index entries as requests leased, whatever
+the size of the backlog. If the worker does not start processing the request
+before the timeout, it becomes visible again.
+
+Requests written before a table had a queue index can be queued with
+`WorkQueue.backfill()`.
+"""
+
+
+import datetime
+from typing import Any, List, Optional
+from botocore.exceptions import ClientError
+from .dynamodb import parallel_scan, query, update_item_if
+
+
+__all__ = ["WorkQueue"]
+
+
+class WorkQueue:
+    """
+    Lease requests from a sparse index sorted by visible date
+
+    `key_fields` are the attributes of the table key. The index must use
+    `partition_key` as its partition key and `sort_key` as its sort key.
+    """
+
+    def __init__(
+            self,
+            table: Any,
+            index_name: str,
+            key_fields: List[str],
+            partition_key: str = "isNew",
+            partition_value: str = "true",
+            sort_key: str = "visibleDate",
+            owner_key: str = "leaseOwner"
+        ):
+        self.table = table
+        self.index_name = index_name
+        self.key_fields = list(key_fields)
+        self.partition_key = partition_key
+        self.partition_value = partition_value
+        self.sort_key = sort_key
+        self.owner_key = owner_key
+
+    def attributes(self, date: str) -> dict:
+        """
+        Returns the attributes to add to a new request for it to be queued
+        """
+
+        return {self.partition_key: self.partition_value, self.sort_key: date}
+
+    def _lease_one(self, key: dict, visible_date: str, owner: str, until: str) -> Optional[dict]:
+        # The index is eventually consistent: the condition fails if another
+        # worker leased the request or if processing started since.
+        try:
+            res = self.table.update_item(
+                Key=key,
+                UpdateExpression="SET #sk = :until, #owner = :owner",
+                ConditionExpression="#sk = :visibleDate",
+                ExpressionAttributeNames={"#sk": self.sort_key, "#owner": self.owner_key},
+                ExpressionAttributeValues={
+                    ":until": until,
+                    ":owner": owner,
+                    ":visibleDate": visible_date
+                },
+                ReturnValues="ALL_NEW"
+            )
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return None
+        return res["Attributes"]
+
+    def lease(
+            self,
+            count: int,
+            owner: str,
+            timeout: int,
+            max_candidates: Optional[int] = None,
+            now: Optional[datetime.datetime] = None
+        ) -> List[dict]:
+        """
+        Lease up to `count` of the oldest visible requests for `timeout`
+        seconds
+
+        Requests leased by other workers in the meantime are skipped. At most
+        `max_candidates` index entries are read, three times `count` by
+        default. Returns the leased items.
+        """
+
+        if now is None:
+            now = datetime.datetime.now()
+        if max_candidates is None:
+            max_candidates = 3*count
+        until = (now + datetime.timedelta(seconds=timeout)).isoformat()
+
+        leased = []
+        for candidate in query(
+                self.table,
+                IndexName=self.index_name,
+                KeyConditionExpression="#pk = :pk AND #sk <= :now",
+                ExpressionAttributeNames={"#pk": self.partition_key, "#sk": self.sort_key},
+                ExpressionAttributeValues={":pk": self.partition_value, ":now": now.isoformat()},
+                ScanIndexForward=True,
+                page_size=count,
+                limit=max_candidates
+            ):
+            key = {k: candidate[k] for k in self.key_fields}
+            item = self._lease_one(key, candidate[self.sort_key], owner, until)
+            if item is not None:
+                leased.append(item)
+                if len(leased) >= count:
+                    break
+
+        return leased
+
+    def backfill(
+            self,
+            status_key: str = "status",
+            status_value: str = "NEW",
+            date_key: str = "newDate",
+            segments: int = 4,
+            now: Optional[datetime.datetime] = None
+        ) -> int:
+        """
+        Queue waiting requests that were written without queue attributes
+
+        Requests whose `status_key` is `status_value` but that have no visible
+        date are found with a parallel scan. They become visible from their
+        `date_key` value, or from `now` if they have none. Updates are
+        conditional, so this is safe to run while the table is in use and to
+        run again. Returns the number of requests queued.
+        """
+
+        if now is None:
+            now = datetime.datetime.now()
+
+        # DynamoDB rejects unused attribute names, so the scan leaves out #pk
+        names = {"#status": status_key, "#sk": self.sort_key}
+        condition = "#status = :status AND attribute_not_exists(#sk)"
+
+        count = 0
+        for item in parallel_scan(
+                self.table,
+                segments=segments,
+                projection=self.key_fields + [date_key],
+                FilterExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":status": status_value}
+            ):
+            if update_item_if(
+                    self.table,
+                    {k: item[k] for k in self.key_fields},
+                    condition,
+                    UpdateExpression="SET #pk = :pk, #sk = :date",
+                    ExpressionAttributeNames={**names, "#pk": self.partition_key},
+                    ExpressionAttributeValues={
+                        ":status": status_value,
+                        ":pk": self.partition_value,
+                        ":date": item.get(date_key, now.isoformat())
+                    }
+                ):
+                count += 1
+
+        return count
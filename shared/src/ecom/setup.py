@@ -7,6 +7,7 @@ from setuptools import find_packages, setup
 setup(
     author="Amazon Web Services",
     install_requires=["boto3"],
+    extras_require={"bulk_import": ["jsonschema", "PyYAML"], "payment3p": ["requests"]},
     license="MIT-0",
     name="ecom",
     packages=find_packages(),
@@ -0,0 +1,296 @@
+import datetime
+import io
+import os
+import threading
+from decimal import Decimal
+import pytest
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+from ecom import bulk_import, replay # pylint: disable=import-error
+
+
+SCHEMAS_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "resources", "schemas.yaml")
+NOW = datetime.datetime(2021, 1, 2, 3, 4, 5)
+
+
+class FakeDynamoDB:
+    """
+    Low-level client for a single table keyed by 'productId'
+
+    Writes can be throttled with a ClientError or left unprocessed.
+    """
+
+    def __init__(self, items=None, throttle_first=0, unprocess_first=0):
+        self.items = {item["productId"]: item for item in items or []}
+        self.throttle_first = throttle_first
+        self.unprocess_first = unprocess_first
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    def batch_get_item(self, RequestItems): # pylint: disable=invalid-name
+        (table_name, request), = RequestItems.items()
+        assert len(request["Keys"]) <= 100
+        with self._lock:
+            found = [self.items[key["productId"]["S"]] for key in request["Keys"] if key["productId"]["S"] in self.items]
+        return {"Responses": {table_name: [
+            {k: self._serializer.serialize(v) for k, v in item.items()} for item in found
+        ]}}
+
+    def batch_write_item(self, RequestItems): # pylint: disable=invalid-name
+        (table_name, requests), = RequestItems.items()
+        assert len(requests) <= 25
+        with self._lock:
+            if self.throttle_first > 0:
+                self.throttle_first -= 1
+                raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+            unprocessed = []
+            if self.unprocess_first > 0:
+                self.unprocess_first -= 1
+                requests, unprocessed = requests[:1], requests[1:]
+            for request in requests:
+                item = {k: self._deserializer.deserialize(v) for k, v in request["PutRequest"]["Item"].items()}
+                self.items[item["productId"]] = item
+                self.writes += 1
+        if unprocessed:
+            return {"UnprocessedItems": {table_name: unprocessed}}
+        return {"UnprocessedItems": {}}
+
+
+@pytest.fixture(scope="module")
+def schema():
+    return bulk_import.ItemSchema(SCHEMAS_FILE, "Product")
+
+
+def get_product(i, price=100):
+    return {
+        "productId": "00000000-0000-0000-0000-{:012d}".format(i),
+        "name": "Product {}".format(i),
+        "tags": ["tag{}".format(i % 3)],
+        "package": {"weight": 100, "height": 10, "length": 10, "width": 10},
+        "price": price
+    }
+
+
+def get_importer(client, schema=None, **kwargs):
+    return bulk_import.BulkImporter(
+        client, "TABLE_NAME", ["productId"], schema=schema,
+        workers=4, backoff=0, now=lambda: NOW, **kwargs
+    )
+
+
+def test_schema_validate(schema):
+    """
+    Test ItemSchema.validate() with references
+    """
+
+    assert schema.validate(get_product(1)) is None
+    assert schema.validate(dict(get_product(1), price=-1)).startswith("price:")
+
+    product = get_product(1)
+    product["package"]["weight"] = "heavy"
+    assert schema.validate(product).startswith("package.weight:")
+
+    product = get_product(1)
+    del product["name"]
+    assert "'name' is a required property" in schema.validate(product)
+
+
+def test_read_jsonl():
+    """
+    Test read_jsonl()
+    """
+
+    fp = io.StringIO('{"productId": "1", "price": 1.5}\n\nnot json\n[1]\n')
+
+    rows = list(bulk_import.read_jsonl(fp))
+
+    assert rows[0] == bulk_import.Row(1, {"productId": "1", "price": Decimal("1.5")})
+    assert [(r.line, r.item) for r in rows[1:]] == [(3, None), (4, None)]
+    assert all(r.error for r in rows[1:])
+
+
+def test_read_csv(schema):
+    """
+    Test read_csv() with nested properties and arrays
+    """
+
+    fp = io.StringIO("\n".join([
+        "productId,name,tags,price,package.weight,package.width",
+        "1,Shoes,red|shoes,100,200,",
+        "2,Hat,,abc,1,1",
+        "3,Short row"
+    ]))
+
+    rows = list(bulk_import.read_csv(fp, schema))
+
+    assert rows[0] == bulk_import.Row(2, {
+        "productId": "1", "name": "Shoes", "tags": ["red", "shoes"],
+        "price": 100, "package": {"weight": 200}
+    })
+    assert rows[1].line == 3 and rows[1].error.startswith("price:")
+    assert rows[2].line == 4 and rows[2].error is not None
+
+
+def test_content_hash():
+    """
+    Test that content_hash() ignores bookkeeping fields and number types
+    """
+
+    product = get_product(1)
+    stored = dict(product, price=Decimal("100"), createdDate="2020-01-01T00:00:00")
+    stored["package"] = {k: Decimal(v) for k, v in reversed(list(product["package"].items()))}
+
+    assert bulk_import.content_hash(product) == bulk_import.content_hash(stored)
+    assert bulk_import.content_hash(product) != bulk_import.content_hash(dict(product, price=101))
+
+
+def test_run(schema):
+    """
+    Test importing new products, with an invalid row
+    """
+
+    client = FakeDynamoDB()
+    rows = [bulk_import.Row(i+1, get_product(i)) for i in range(60)]
+    rows.append(bulk_import.Row(61, dict(get_product(61), price=-1)))
+
+    stats = get_importer(client, schema).run(rows)
+
+    assert stats.as_dict() == {"read": 61, "invalid": 1, "unchanged": 0, "created": 60, "updated": 0}
+    assert [line for line, _ in stats.errors] == [61]
+    assert len(client.items) == 60
+    assert client.items[get_product(0)["productId"]]["createdDate"] == NOW.isoformat()
+
+
+def test_run_unchanged():
+    """
+    Test that unchanged products are not written again
+    """
+
+    created = "2020-01-01T00:00:00"
+    client = FakeDynamoDB([
+        dict(get_product(i), createdDate=created, modifiedDate=created) for i in range(50)
+    ])
+    products = [get_product(i, price=200 if i % 10 == 0 else 100) for i in range(55)]
+
+    stats = get_importer(client).run(bulk_import.Row(i+1, p) for i, p in enumerate(products))
+
+    assert stats.as_dict() == {"read": 55, "invalid": 0, "unchanged": 45, "created": 5, "updated": 5}
+    assert client.writes == 10
+    updated = client.items[get_product(0)["productId"]]
+    assert updated["price"] == 200
+    assert updated["createdDate"] == created
+    assert updated["modifiedDate"] == NOW.isoformat()
+
+
+def test_run_duplicates():
+    """
+    Test that the last version of a product in a batch wins
+    """
+
+    client = FakeDynamoDB()
+    rows = [bulk_import.Row(1, get_product(1)), bulk_import.Row(2, get_product(1, price=300))]
+
+    stats = get_importer(client).run(rows)
+
+    assert stats.created == 1
+    assert client.items[get_product(1)["productId"]]["price"] == 300
+
+
+def test_run_throttled():
+    """
+    Test that throttled writes are retried and slow down the import
+    """
+
+    client = FakeDynamoDB(throttle_first=2, unprocess_first=2)
+    limiter = bulk_import.AdaptiveRateLimiter(rate=10000)
+
+    stats = get_importer(client, rate_limiter=limiter).run(
+        bulk_import.Row(i+1, get_product(i)) for i in range(100)
+    )
+
+    assert stats.created == 100
+    assert len(client.items) == 100
+    assert limiter.throttle_count == 4
+    assert limiter.rate < 10000
+
+
+def test_run_too_many_retries():
+    """
+    Test that an import fails when writes keep being throttled
+    """
+
+    client = FakeDynamoDB(throttle_first=100)
+
+    with pytest.raises(RuntimeError):
+        get_importer(client, retries=2).run([bulk_import.Row(1, get_product(1))])
+
+
+def test_adaptive_rate_limiter():
+    """
+    Test AdaptiveRateLimiter
+    """
+
+    limiter = bulk_import.AdaptiveRateLimiter(rate=100, min_rate=10, max_rate=120, increase=10)
+
+    limiter.throttled()
+    assert limiter.rate == 50
+    for _ in range(5):
+        limiter.throttled()
+    assert limiter.rate == 10
+
+    limiter.succeeded(10)
+    assert limiter.rate == 20
+    for _ in range(100):
+        limiter.succeeded(1000)
+    assert limiter.rate == 120
+
+
+def test_run_throttled_below_batch_size(monkeypatch):
+    """
+    Test that full batches are still written once throttling brings the
+    rate below the batch size
+    """
+
+    class Clock:
+        # Sleeping moves the clock of the rate limiter forward
+        now = 0.0
+
+        def monotonic(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    clock = Clock()
+    monkeypatch.setattr(replay, "time", clock)
+
+    limiter = bulk_import.AdaptiveRateLimiter(rate=100)
+    for _ in range(3):
+        limiter.throttled()
+    assert limiter.rate == 12.5
+    client = FakeDynamoDB()
+
+    stats = get_importer(client, rate_limiter=limiter).run(
+        bulk_import.Row(i+1, get_product(i)) for i in range(25)
+    )
+
+    assert stats.created == 25
+    assert client.writes == 25
+    assert clock.now == pytest.approx(2)
+
+
+def test_run_invalid_keys(schema):
+    """
+    Test that rows without a key are reported as invalid
+    """
+
+    client = FakeDynamoDB()
+    product = get_product(1)
+    del product["productId"]
+
+    stats = get_importer(client, schema).run([bulk_import.Row(1, product), bulk_import.Row(2, None, "invalid JSON")])
+
+    assert stats.as_dict() == {"read": 2, "invalid": 2, "unchanged": 0, "created": 0, "updated": 0}
+    assert stats.errors == [(1, "missing key field(s): productId"), (2, "invalid JSON")]
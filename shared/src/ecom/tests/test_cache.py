@@ -0,0 +1,65 @@
+import time
+from ecom.cache import TTLCache # pylint: disable=import-error
+
+
+def test_get_set():
+    """
+    Test TTLCache get() and set()
+    """
+
+    cache = TTLCache(60)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.get("missing", "default") == "default"
+    assert "key" in cache
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_expiration():
+    """
+    Test that entries expire
+    """
+
+    cache = TTLCache(0.05)
+    cache.set("key", "value")
+    cache.set("long", "value", ttl=60)
+    time.sleep(0.1)
+
+    assert cache.get("key") is None
+    assert cache.get("long") == "value"
+    assert len(cache) == 1
+
+
+def test_maxsize():
+    """
+    Test that the least recently used entries are evicted
+    """
+
+    cache = TTLCache(60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Refresh 'a'
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_delete_clear():
+    """
+    Test delete() and clear()
+    """
+
+    cache = TTLCache(60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    cache.delete("missing")
+
+    assert "a" not in cache
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,261 @@
+import threading
+import pytest
+from botocore.exceptions import ClientError
+from ecom import category_pages # pylint: disable=import-error
+
+
+class PageTable:
+    """
+    Stand-in for a DynamoDB table with the key conditions and condition
+    expressions used by DynamoDBPageStore
+    """
+
+    name = "TABLE_NAME"
+
+    def __init__(self):
+        self.items = {}
+        self.reads = 0
+        self._lock = threading.Lock()
+        table = self
+
+        class Client:
+            def transact_write_items(self, TransactItems): # pylint: disable=invalid-name
+                with table._lock:
+                    for action in TransactItems:
+                        (kind, params), = action.items()
+                        key = params["Key"] if kind == "Delete" else params["Item"]
+                        if not table._check(key, params):
+                            raise ClientError({"Error": {"Code": "TransactionCanceledException"}}, "TransactWriteItems")
+                    for action in TransactItems:
+                        (kind, params), = action.items()
+                        if kind == "Delete":
+                            del table.items[(params["Key"]["category"], params["Key"]["page"])]
+                        else:
+                            table.items[(params["Item"]["category"], params["Item"]["page"])] = params["Item"]
+
+        class Meta:
+            client = Client()
+
+        self.meta = Meta()
+
+    def _check(self, key, params):
+        current = self.items.get((key["category"], key["page"]), None)
+        if params["ConditionExpression"] == "attribute_not_exists(category)":
+            return current is None
+        assert params["ConditionExpression"] == "version = :version"
+        return current is not None and current["version"] == params["ExpressionAttributeValues"][":version"]
+
+    def put_item(self, Item, ConditionExpression, **kwargs): # pylint: disable=invalid-name
+        with self._lock:
+            if not self._check(Item, dict(kwargs, ConditionExpression=ConditionExpression)):
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem")
+            self.items[(Item["category"], Item["page"])] = Item
+
+    def query(self, KeyConditionExpression, Limit, ScanIndexForward=True): # pylint: disable=invalid-name
+        category_condition, page_condition = KeyConditionExpression.get_expression()["values"]
+        category = category_condition.get_expression()["values"][1]
+        operator = page_condition.get_expression()["operator"]
+        value = page_condition.get_expression()["values"][1]
+        with self._lock:
+            self.reads += 1
+            pages = sorted(p for c, p in self.items if c == category)
+            if operator == "<=":
+                pages = [p for p in pages if p <= value]
+            else:
+                assert operator == ">"
+                pages = [p for p in pages if p > value]
+            if not ScanIndexForward:
+                pages.reverse()
+            return {"Items": [dict(self.items[(category, p)]) for p in pages[:Limit]]}
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def store(request):
+    if request.param == "memory":
+        return category_pages.InMemoryPageStore()
+    return category_pages.DynamoDBPageStore(PageTable())
+
+
+def get_product(i, category="shoes", modified_date="2021-01-01T00:00:00"):
+    return {"productId": "{:04d}".format(i), "category": category, "name": "Product {}".format(i), "modifiedDate": modified_date}
+
+
+def all_pages(pages, category, limit=3):
+    results = []
+    cursor = None
+    while True:
+        page, cursor = pages.get(category, limit=limit, cursor=cursor)
+        results.append([p["productId"] for p in page])
+        if cursor is None:
+            return results
+
+
+def test_update(store):
+    """
+    Test that pages are split as products are added
+    """
+
+    pages = category_pages.CategoryPages(store, max_page_size=4)
+    for i in [5, 1, 9, 3, 7, 2, 8, 4, 6, 0]:
+        pages.update(get_product(i)["productId"], None, get_product(i))
+
+    assert [p for page in all_pages(pages, "shoes") for p in page] == ["{:04d}".format(i) for i in range(10)]
+    assert pages.get("hats") == ([], None)
+
+    # Every stored page is within bounds
+    page = store.find("shoes")
+    keys = []
+    while page is not None:
+        assert 0 < len(page.products) <= 4
+        keys.append(page.key)
+        page = store.next_page("shoes", page.key)
+    assert keys[0] == ""
+    assert len(keys) > 2
+
+
+def test_get_cursor(store):
+    """
+    Test paginating through pages of different sizes
+    """
+
+    pages = category_pages.CategoryPages(store, max_page_size=4)
+    for i in range(10):
+        pages.update(get_product(i)["productId"], None, get_product(i))
+
+    results = all_pages(pages, "shoes")
+
+    assert [p for page in results for p in page] == ["{:04d}".format(i) for i in range(10)]
+    assert all(len(page) == 3 for page in results[:3])
+
+
+def test_get_cursor_stable(store):
+    """
+    Test that a cursor stays valid when pages change
+    """
+
+    pages = category_pages.CategoryPages(store, max_page_size=4)
+    for i in range(0, 20, 2):
+        pages.update(get_product(i)["productId"], None, get_product(i))
+
+    first, cursor = pages.get("shoes", limit=3)
+    assert [p["productId"] for p in first] == ["0000", "0002", "0004"]
+
+    # Splits pages after the cursor, and removes the page holding the cursor
+    for i in range(5, 12, 2):
+        pages.update(get_product(i)["productId"], None, get_product(i))
+    for i in [0, 2, 4]:
+        pages.update(get_product(i)["productId"], get_product(i), None)
+
+    second, _ = pages.get("shoes", limit=3, cursor=cursor)
+    assert [p["productId"] for p in second] == ["0005", "0006", "0007"]
+
+
+def test_get_invalid_cursor(store):
+    """
+    Test get() with an invalid cursor
+    """
+
+    pages = category_pages.CategoryPages(store)
+
+    with pytest.raises(ValueError):
+        pages.get("shoes", cursor="invalid")
+    with pytest.raises(ValueError):
+        pages.get("shoes", cursor=category_pages.encode_cursor("0001")[:-4])
+
+
+def test_update_modified(store):
+    """
+    Test product modifications, including category changes
+    """
+
+    pages = category_pages.CategoryPages(store)
+    product = get_product(1)
+    pages.update("0001", None, product)
+
+    renamed = dict(product, name="New name", modifiedDate="2021-01-02T00:00:00")
+    assert pages.update("0001", product, renamed) == 1
+    assert pages.get("shoes")[0] == [renamed]
+
+    # Unchanged and out of order versions are ignored
+    assert pages.update("0001", product, renamed) == 0
+    assert pages.update("0001", None, product) == 0
+    assert pages.get("shoes")[0] == [renamed]
+
+    moved = dict(renamed, category="hats", modifiedDate="2021-01-03T00:00:00")
+    assert pages.update("0001", renamed, moved) == 2
+    assert pages.get("shoes") == ([], None)
+    assert pages.get("hats")[0] == [moved]
+
+
+def test_update_deleted(store):
+    """
+    Test that empty pages are removed
+    """
+
+    pages = category_pages.CategoryPages(store, max_page_size=2)
+    for i in range(6):
+        pages.update(get_product(i)["productId"], None, get_product(i))
+
+    for i in [0, 1]:
+        pages.update(get_product(i)["productId"], get_product(i), None)
+    # The first page takes over the products of the next page
+    assert store.find("shoes").products[0]["productId"] == "0002"
+    assert [p for page in all_pages(pages, "shoes", limit=2) for p in page] == ["0002", "0003", "0004", "0005"]
+
+    for i in range(2, 6):
+        pages.update(get_product(i)["productId"], get_product(i), None)
+    assert store.find("shoes") is None
+
+
+def test_update_conflict(store):
+    """
+    Test that concurrent updates are not lost
+    """
+
+    pages = category_pages.CategoryPages(store, max_page_size=5, retries=100)
+
+    def worker(start):
+        for i in range(start, 40, 4):
+            pages.update(get_product(i)["productId"], None, get_product(i))
+
+    threads = [threading.Thread(target=worker, args=(start,)) for start in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [p for page in all_pages(pages, "shoes") for p in page] == ["{:04d}".format(i) for i in range(40)]
+
+
+def test_update_too_many_conflicts():
+    """
+    Test that updates fail when pages keep changing
+    """
+
+    class ConflictStore(category_pages.InMemoryPageStore):
+        def save(self, puts, deletes):
+            return False
+
+    pages = category_pages.CategoryPages(ConflictStore())
+
+    with pytest.raises(category_pages.PageConflictError):
+        pages.update("0001", None, get_product(1))
+
+
+def test_get_reads():
+    """
+    Test that a page is served with at most two reads
+    """
+
+    table = PageTable()
+    pages = category_pages.CategoryPages(category_pages.DynamoDBPageStore(table), max_page_size=10)
+    for i in range(100):
+        pages.update(get_product(i)["productId"], None, get_product(i))
+
+    cursor = None
+    while True:
+        table.reads = 0
+        _, cursor = pages.get("shoes", limit=5, cursor=cursor)
+        assert table.reads <= 2
+        if cursor is None:
+            break
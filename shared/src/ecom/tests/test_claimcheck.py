@@ -0,0 +1,144 @@
+import json
+import uuid
+from botocore import stub
+import pytest
+from ecom import claimcheck, eventbridge # pylint: disable=import-error
+
+
+@pytest.fixture
+def order():
+    return {
+        "orderId": str(uuid.uuid4()),
+        "status": "NEW",
+        "products": [{"productId": str(uuid.uuid4()), "name": "x"*100} for _ in range(20)]
+    }
+
+
+@pytest.fixture
+def event(order):
+    return {
+        "Source": "ecommerce.orders",
+        "DetailType": "OrderCreated",
+        "Resources": [order["orderId"]],
+        "Detail": json.dumps(order),
+        "EventBusName": "EVENT_BUS_NAME"
+    }
+
+
+def test_check_in_small(tmp_path, event):
+    """
+    Test ClaimCheck.check_in() with an event below the threshold
+    """
+
+    check = claimcheck.ClaimCheck(claimcheck.LocalBlobStore(str(tmp_path)))
+
+    assert check.check_in(event) == event
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_check_in_large(tmp_path, event, order):
+    """
+    Test ClaimCheck.check_in() with an event above the threshold
+    """
+
+    check = claimcheck.ClaimCheck(
+        claimcheck.get_store("file://" + str(tmp_path)),
+        threshold=1000, keep=["orderId", "status", "missing"]
+    )
+
+    retval = check.check_in(event)
+    pointer = json.loads(retval["Detail"])
+
+    assert retval["Source"] == event["Source"]
+    assert pointer["orderId"] == order["orderId"]
+    assert pointer["status"] == order["status"]
+    assert "missing" not in pointer
+    assert "products" not in pointer
+    assert pointer["claimCheck"]["size"] == eventbridge.event_size(event)
+    assert pointer["claimCheck"]["uri"].startswith("file://" + str(tmp_path))
+    assert json.loads(claimcheck.fetch(pointer["claimCheck"]["uri"])) == order
+
+
+def test_lazy_detail(tmp_path, event, order, monkeypatch):
+    """
+    Test LazyDetail with a claim-checked detail
+    """
+
+    check = claimcheck.ClaimCheck(
+        claimcheck.LocalBlobStore(str(tmp_path)), threshold=1000, keep=["orderId"]
+    )
+    pointer = json.loads(check.check_in(event)["Detail"])
+
+    fetched = []
+    fetch = claimcheck.fetch
+    monkeypatch.setattr(claimcheck, "fetch", lambda uri: fetched.append(uri) or fetch(uri))
+
+    detail = claimcheck.LazyDetail(pointer)
+
+    # Kept fields do not download the payload
+    assert detail["orderId"] == order["orderId"]
+    assert detail.claim_checked
+    assert fetched == []
+
+    # Other fields download the payload once
+    assert detail["status"] == order["status"]
+    assert detail["products"] == order["products"]
+    assert dict(detail) == order
+    assert len(fetched) == 1
+
+
+def test_lazy_detail_encoded(tmp_path, event, order):
+    """
+    Test LazyDetail with a claim-checked and encoded detail
+    """
+
+    event["Detail"] = eventbridge.encode_detail(order, eventbridge.ENCODING_ZLIB, keep=["orderId"])
+    check = claimcheck.ClaimCheck(claimcheck.LocalBlobStore(str(tmp_path)), threshold=100)
+    detail = claimcheck.LazyDetail(json.loads(check.check_in(event)["Detail"]))
+
+    assert detail["products"] == order["products"]
+    assert "claimCheck" not in detail
+
+
+def test_lazy_detail_plain(order):
+    """
+    Test LazyDetail with plain and encoded details
+    """
+
+    assert dict(claimcheck.LazyDetail(order)) == order
+    assert claimcheck.LazyDetail(order).get("missing") is None
+
+    encoded = json.loads(eventbridge.encode_detail(order, eventbridge.ENCODING_ZLIB, keep=["orderId"]))
+    detail = claimcheck.LazyDetail(encoded)
+    assert detail["orderId"] == order["orderId"]
+    assert "data" not in detail
+    assert detail["products"] == order["products"]
+
+
+def test_s3_blob_store(monkeypatch):
+    """
+    Test S3BlobStore.put()
+    """
+
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    store = claimcheck.get_store("s3://BUCKET/orders/")
+    import boto3 # pylint: disable=import-outside-toplevel
+    store.client = boto3.client("s3")
+
+    s3 = stub.Stubber(store.client)
+    s3.add_response("put_object", {}, {"Bucket": "BUCKET", "Key": "orders/KEY", "Body": b"DATA"})
+    s3.activate()
+
+    assert store.put("KEY", b"DATA") == "s3://BUCKET/orders/KEY"
+
+    s3.assert_no_pending_responses()
+    s3.deactivate()
+
+
+def test_get_store_unsupported():
+    """
+    Test get_store() with an unsupported URI
+    """
+
+    with pytest.raises(ValueError):
+        claimcheck.get_store("http://example.com/")
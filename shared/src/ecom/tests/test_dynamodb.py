@@ -0,0 +1,277 @@
+import threading
+from botocore.exceptions import ClientError
+import pytest
+from ecom import dynamodb # pylint: disable=import-error
+
+
+class FakeTable:
+    """
+    Table returning items from a list, honoring Limit and Segment
+    """
+
+    def __init__(self, items, segments=1):
+        self.items = items
+        self.segments = segments
+        self.calls = []
+
+    def _page(self, items, kwargs):
+        start = kwargs.get("ExclusiveStartKey", {}).get("index", 0)
+        end = start + kwargs["Limit"]
+        res = {"Items": items[start:end]}
+        if end < len(items):
+            res["LastEvaluatedKey"] = {"index": end}
+        return res
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        return self._page(self.items, kwargs)
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        segment = kwargs.get("Segment", 0)
+        total = kwargs.get("TotalSegments", 1)
+        items = [item for i, item in enumerate(self.items) if i % total == segment]
+        return self._page(items, kwargs)
+
+
+def test_query():
+    """
+    Test that all pages are read
+    """
+
+    table = FakeTable([{"id": i} for i in range(25)])
+
+    items = list(dynamodb.query(table, page_size=10, KeyConditionExpression="EXPR"))
+
+    assert items == table.items
+    assert [c["Limit"] for c in table.calls] == [10, 10, 10]
+    assert table.calls[1]["ExclusiveStartKey"] == {"index": 10}
+    assert all(c["KeyConditionExpression"] == "EXPR" for c in table.calls)
+
+
+def test_query_adaptive():
+    """
+    Test that the page size grows for long results
+    """
+
+    table = FakeTable([{"id": i} for i in range(100)])
+
+    items = list(dynamodb.query(table, page_size=10, max_page_size=40))
+
+    assert len(items) == 100
+    assert [c["Limit"] for c in table.calls] == [10, 20, 40, 40]
+
+
+def test_query_limit():
+    """
+    Test early termination
+    """
+
+    table = FakeTable([{"id": i} for i in range(100)])
+
+    items = list(dynamodb.query(table, page_size=10, limit=15))
+
+    assert len(items) == 15
+    assert [c["Limit"] for c in table.calls] == [10, 5]
+
+
+def test_query_lazy():
+    """
+    Test that pages are only read when needed
+    """
+
+    table = FakeTable([{"id": i} for i in range(100)])
+
+    items = dynamodb.query(table, page_size=10)
+    assert table.calls == []
+    next(items)
+    assert len(table.calls) == 1
+
+
+def test_query_projection():
+    """
+    Test projections
+    """
+
+    table = FakeTable([])
+
+    list(dynamodb.query(
+        table, projection=["id", "name"],
+        ExpressionAttributeNames={"#service": "service"}
+    ))
+
+    assert table.calls[0]["ProjectionExpression"] == "#proj0, #proj1"
+    assert table.calls[0]["ExpressionAttributeNames"] == {
+        "#service": "service", "#proj0": "id", "#proj1": "name"
+    }
+
+
+def test_parallel_scan():
+    """
+    Test parallel scan over multiple segments
+    """
+
+    table = FakeTable([{"id": i} for i in range(1000)])
+
+    items = list(dynamodb.parallel_scan(table, segments=4, page_size=50))
+
+    assert sorted(item["id"] for item in items) == list(range(1000))
+    assert {c["Segment"] for c in table.calls} == {0, 1, 2, 3}
+    assert all(c["TotalSegments"] == 4 for c in table.calls)
+
+
+def test_parallel_scan_early_stop():
+    """
+    Test that workers stop when the consumer stops
+    """
+
+    table = FakeTable([{"id": i} for i in range(10000)])
+
+    items = dynamodb.parallel_scan(table, segments=2, page_size=10, buffer_size=10)
+    assert len([next(items) for _ in range(5)]) == 5
+    items.close()
+
+    calls = len(table.calls)
+    assert calls < 1000
+
+
+def test_parallel_scan_error():
+    """
+    Test that worker errors are raised
+    """
+
+    class ErrorTable:
+        def scan(self, **kwargs):
+            raise ValueError("Scan failed")
+
+    with pytest.raises(ValueError):
+        list(dynamodb.parallel_scan(ErrorTable(), segments=2))
+
+
+class ConditionalTable:
+    """
+    Stand-in for a table where some writes fail their condition
+    """
+
+    def __init__(self, conflicts, error=None):
+        self.conflicts = set(conflicts)
+        self.error = error
+        self.puts = []
+        self.updates = []
+
+    def _check(self, key, operation):
+        code = None
+        if key in self.conflicts:
+            code = "ConditionalCheckFailedException"
+        elif self.error is not None:
+            code = self.error
+        if code is not None:
+            raise ClientError({"Error": {"Code": code}}, operation)
+
+    def put_item(self, Item, ConditionExpression, **kwargs): # pylint: disable=invalid-name
+        self.puts.append((Item, ConditionExpression, kwargs))
+        self._check(Item["id"], "PutItem")
+
+    def update_item(self, Key, ConditionExpression, **kwargs): # pylint: disable=invalid-name
+        self.updates.append((Key, ConditionExpression, kwargs))
+        self._check(Key["id"], "UpdateItem")
+
+
+def test_put_item_if():
+    """
+    Test put_item_if()
+    """
+
+    table = ConditionalTable(["b"])
+
+    assert dynamodb.put_item_if(table, {"id": "a"}, "attribute_not_exists(id)")
+    assert not dynamodb.put_item_if(table, {"id": "b"}, "attribute_not_exists(id)")
+    assert table.puts[0] == ({"id": "a"}, "attribute_not_exists(id)", {})
+
+
+def test_update_item_if():
+    """
+    Test update_item_if()
+    """
+
+    table = ConditionalTable(["b"])
+    kwargs = {"UpdateExpression": "SET #s = :s", "ExpressionAttributeValues": {":s": "NEW"}}
+
+    assert dynamodb.update_item_if(table, {"id": "a"}, "attribute_exists(id)", **kwargs)
+    assert not dynamodb.update_item_if(table, {"id": "b"}, "attribute_exists(id)", **kwargs)
+    assert table.updates[0] == ({"id": "a"}, "attribute_exists(id)", kwargs)
+
+    with pytest.raises(ClientError):
+        dynamodb.update_item_if(ConditionalTable([], error="InternalServerError"), {"id": "a"}, "attribute_exists(id)")
+
+
+def test_update_items_if():
+    """
+    Test update_items_if()
+    """
+
+    table = ConditionalTable(["b", "d"])
+    updates = [
+        {"Key": {"id": i}, "UpdateExpression": "SET #s = :s", "ExpressionAttributeValues": {":s": i}}
+        for i in "abcde"
+    ]
+
+    failed = dynamodb.update_items_if(table, updates, "attribute_exists(id)")
+
+    assert [u["Key"] for u in failed] == [{"id": "b"}, {"id": "d"}]
+    assert len(table.updates) == 5
+    assert sorted(u[2]["ExpressionAttributeValues"][":s"] for u in table.updates) == list("abcde")
+    assert dynamodb.update_items_if(table, [], "attribute_exists(id)") == []
+
+
+def test_update_items_if_error():
+    """
+    Test update_items_if() with an error other than a failed condition
+    """
+
+    table = ConditionalTable([], error="ProvisionedThroughputExceededException")
+
+    with pytest.raises(ClientError):
+        dynamodb.update_items_if(table, [{"Key": {"id": "a"}}], "attribute_exists(id)")
+
+
+class PartitionTable:
+    """
+    Table returning the items of the partition in a key condition
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def query(self, KeyConditionExpression, **kwargs): # pylint: disable=invalid-name
+        with self._lock:
+            self.calls.append(kwargs)
+        value = KeyConditionExpression.get_expression()["values"][1]
+        items = [item for item in self.items if item["pk"] == value]
+        start = kwargs.get("ExclusiveStartKey", {}).get("index", 0)
+        end = start + kwargs["Limit"]
+        res = {"Items": items[start:end]}
+        if end < len(items):
+            res["LastEvaluatedKey"] = {"index": end}
+        return res
+
+
+def test_query_partitions():
+    """
+    Test query_partitions()
+    """
+
+    items = [{"pk": pk, "sk": i} for pk in "abc" for i in range(5)]
+    table = PartitionTable(items)
+
+    partitions = dynamodb.query_partitions(table, "pk", ["a", "c", "d", "a"], page_size=2)
+
+    assert partitions == {
+        "a": [item for item in items if item["pk"] == "a"],
+        "c": [item for item in items if item["pk"] == "c"]
+    }
+    # 3 pages for each of a and c, 1 for d
+    assert len(table.calls) == 7
+    assert dynamodb.query_partitions(table, "pk", []) == {}
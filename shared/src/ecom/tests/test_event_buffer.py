@@ -0,0 +1,117 @@
+import datetime
+import json
+from botocore import stub
+from botocore.exceptions import ClientError
+import boto3
+from ecom import event_buffer, replay # pylint: disable=import-error
+
+
+class FakeEventBridge:
+    def __init__(self, fail_first=0):
+        self.fail_first = fail_first
+        self.entries = []
+
+    def put_events(self, Entries): # pylint: disable=invalid-name
+        results = []
+        failed = 0
+        for entry in Entries:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                failed += 1
+                results.append({"ErrorCode": "InternalFailure"})
+            else:
+                self.entries.append(entry)
+                results.append({"EventId": "ID"})
+        return {"FailedEntryCount": failed, "Entries": results}
+
+
+def test_put_sqs():
+    """
+    Test EventBuffer.put() with an SQS queue
+    """
+
+    sqs = boto3.client("sqs", region_name="eu-west-1")
+    buffer = event_buffer.EventBuffer("QUEUE_URL", sqs=sqs)
+    event = {"Time": datetime.datetime(2021, 1, 1), "DetailType": "UserCreated", "Detail": "{}"}
+
+    stubber = stub.Stubber(sqs)
+    stubber.add_response("send_message", {}, {
+        "QueueUrl": "QUEUE_URL",
+        "MessageBody": json.dumps({"Time": "2021-01-01T00:00:00", "DetailType": "UserCreated", "Detail": "{}"})
+    })
+    stubber.activate()
+
+    buffer.put(event)
+
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
+
+
+def test_put_memory():
+    """
+    Test EventBuffer without a queue
+    """
+
+    buffer = event_buffer.EventBuffer(None)
+    buffer.put({"Time": datetime.datetime(2021, 1, 1), "Detail": "{}"})
+
+    assert buffer.drain() == [{"Time": "2021-01-01T00:00:00", "Detail": "{}"}]
+    assert buffer.drain() == []
+
+
+def test_publish_records():
+    """
+    Test publish_records() with invalid messages and failed entries
+    """
+
+    buffer = event_buffer.EventBuffer(None)
+    for i in range(25):
+        buffer.put({"Detail": str(i)})
+    records = [
+        {"messageId": str(i), "body": json.dumps(event)}
+        for i, event in enumerate(buffer.drain())
+    ]
+    records += [{"messageId": "invalid", "body": "{"}, {"messageId": "list", "body": "[]"}]
+
+    eventbridge = FakeEventBridge(fail_first=3)
+    failures = event_buffer.publish_records(records, replay.EventPublisher(eventbridge, backoff=0))
+
+    assert failures == ["invalid", "list"]
+    assert sorted(int(e["Detail"]) for e in eventbridge.entries) == list(range(25))
+
+
+def test_publish_records_size():
+    """
+    Test that oversized messages only fail their own batch
+    """
+
+    records = [
+        {"messageId": str(i), "body": json.dumps({"Detail": ("a" if i != 2 else "a"*300*1024)})}
+        for i in range(5)
+    ]
+
+    class SizeLimitedEventBridge(FakeEventBridge):
+        def put_events(self, Entries): # pylint: disable=invalid-name
+            if sum(len(e["Detail"]) for e in Entries) > 256*1024:
+                raise ClientError({"Error": {"Code": "ValidationException"}}, "PutEvents")
+            return super().put_events(Entries)
+
+    eventbridge = SizeLimitedEventBridge()
+    failures = event_buffer.publish_records(records, replay.EventPublisher(eventbridge))
+
+    assert failures == ["2"]
+    assert [e["Detail"] for e in eventbridge.entries] == ["a"]*4
+
+
+def test_publish_records_failed_batch():
+    """
+    Test that messages of a batch that keeps failing are reported
+    """
+
+    records = [{"messageId": str(i), "body": json.dumps({"Detail": str(i)})} for i in range(15)]
+
+    eventbridge = FakeEventBridge(fail_first=10)
+    failures = event_buffer.publish_records(records, replay.EventPublisher(eventbridge, retries=0))
+
+    assert failures == [str(i) for i in range(10)]
+    assert [e["Detail"] for e in eventbridge.entries] == [str(i) for i in range(10, 15)]
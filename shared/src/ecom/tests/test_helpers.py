@@ -204,4 +204,223 @@ def test_response_status():
 
     status_code = 400
     retval = apigateway.response("Message", status_code)
-    assert retval["statusCode"] == status_code
\ No newline at end of file
+    assert retval["statusCode"] == status_code
+
+
+def test_header():
+    """
+    Test header()
+    """
+
+    event = {"headers": {"If-None-Match": '"abc"'}}
+
+    assert apigateway.header(event, "if-none-match") == '"abc"'
+    assert apigateway.header(event, "Authorization") is None
+    assert apigateway.header({"headers": None}, "Authorization") is None
+
+
+def test_is_not_modified():
+    """
+    Test etag() and is_not_modified()
+    """
+
+    etag = apigateway.etag(json.dumps({"key": "value"}))
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == apigateway.etag(json.dumps({"key": "value"}))
+    assert etag != apigateway.etag(json.dumps({"key": "other"}))
+
+    assert apigateway.is_not_modified({"headers": {"If-None-Match": etag}}, etag)
+    assert apigateway.is_not_modified({"headers": {"if-none-match": '"x", W/' + etag}}, etag)
+    assert apigateway.is_not_modified({"headers": {"If-None-Match": "*"}}, etag)
+    assert not apigateway.is_not_modified({"headers": {"If-None-Match": '"x"'}}, etag)
+    assert not apigateway.is_not_modified({"headers": {}}, etag)
+
+
+def _modify_record(old: dict, new: dict) -> dict:
+    """
+    Returns a MODIFY record for the given images
+    """
+
+    return {
+        "awsRegion": "eu-west-1",
+        "dynamodb": {
+            "Keys": {"pk": {"S": "123"}},
+            "NewImage": new,
+            "OldImage": old,
+            "SequenceNumber": "1234567890123456789012345",
+            "SizeBytes": 123,
+            "StreamViewType": "NEW_AND_OLD_IMAGES"
+        },
+        "eventID": str(uuid.uuid4()),
+        "eventName": "MODIFY",
+        "eventSource": "aws:dynamodb",
+        "eventVersion": "1.0"
+    }
+
+
+def test_ddb_to_event_filter_ignored():
+    """
+    Test ddb_to_event() with a StreamFilter and only ignored fields changed
+    """
+
+    stream_filter = eventbridge.StreamFilter(ignored_fields=["modifiedDate"])
+    record = _modify_record(
+        {"pk": {"S": "123"}, "modifiedDate": {"S": "2020-01-01"}},
+        {"pk": {"S": "123"}, "modifiedDate": {"S": "2020-01-02"}}
+    )
+
+    retval = eventbridge.ddb_to_event(record, "BUS", "SOURCE", "Object", "pk", stream_filter)
+
+    assert retval is None
+    assert stream_filter.pop_counts() == {"recordsDroppedNoChange": 1}
+    assert stream_filter.pop_counts() == {}
+
+
+def test_ddb_to_event_filter_keep():
+    """
+    Test ddb_to_event() with a StreamFilter and a relevant change
+    """
+
+    stream_filter = eventbridge.StreamFilter(ignored_fields=["modifiedDate"])
+    record = _modify_record(
+        {"pk": {"S": "123"}, "modifiedDate": {"S": "2020-01-01"}, "total": {"N": "10"}},
+        {"pk": {"S": "123"}, "modifiedDate": {"S": "2020-01-02"}, "total": {"N": "20"}}
+    )
+
+    retval = eventbridge.ddb_to_event(record, "BUS", "SOURCE", "Object", "pk", stream_filter)
+
+    assert retval["DetailType"] == "ObjectModified"
+    assert json.loads(retval["Detail"])["changed"] == ["modifiedDate", "total"]
+    assert stream_filter.pop_counts() == {}
+
+
+def test_stream_filter_required():
+    """
+    Test StreamFilter with required fields
+    """
+
+    stream_filter = eventbridge.StreamFilter(required_fields=["status"])
+
+    assert not stream_filter.keep({"total": 2}, {"total": 1}, ["total"])
+    assert stream_filter.keep({"status": "B"}, {"status": "A"}, ["status"])
+    assert stream_filter.pop_counts() == {"recordsDroppedNotRequired": 1}
+
+
+def test_stream_filter_transitions():
+    """
+    Test StreamFilter with allowed transitions
+    """
+
+    stream_filter = eventbridge.StreamFilter(
+        allowed_transitions=[("NEW", "COMPLETED"), ("*", "FAILED")]
+    )
+
+    assert stream_filter.keep({"status": "COMPLETED"}, {"status": "NEW"}, ["status"])
+    assert stream_filter.keep({"status": "FAILED"}, {"status": "IN_PROGRESS"}, ["status"])
+    assert not stream_filter.keep({"status": "IN_PROGRESS"}, {"status": "NEW"}, ["status"])
+    assert not stream_filter.keep({"total": 2}, {"total": 1}, ["total"])
+    assert stream_filter.pop_counts() == {"recordsDroppedTransition": 2}
+
+
+def test_encode_detail_json():
+    """
+    Test encode_detail() with the default encoding
+    """
+
+    detail = {"orderId": "123", "total": decimal.Decimal("10")}
+
+    assert json.loads(eventbridge.encode_detail(detail)) == {"orderId": "123", "total": 10}
+    assert eventbridge.decode_detail({"orderId": "123"}) == {"orderId": "123"}
+
+
+def test_encode_detail_zlib():
+    """
+    Test encode_detail() with a compressed encoding
+    """
+
+    detail = {"orderId": "123", "products": [{"productId": str(i)} for i in range(100)]}
+
+    encoded = json.loads(eventbridge.encode_detail(detail, eventbridge.ENCODING_ZLIB, keep=["orderId", "missing"]))
+
+    assert encoded["encoding"] == eventbridge.ENCODING_ZLIB
+    assert encoded["version"] == eventbridge.ENCODING_VERSION
+    assert encoded["orderId"] == "123"
+    assert "missing" not in encoded
+    assert "products" not in encoded
+    assert eventbridge.decode_detail(encoded) == detail
+
+
+def test_encode_detail_unsupported():
+    """
+    Test encode_detail() and decode_detail() with unsupported encodings
+    """
+
+    with pytest.raises(ValueError):
+        eventbridge.encode_detail({}, "msgpack")
+    with pytest.raises(ValueError):
+        eventbridge.decode_detail({"encoding": "msgpack", "data": ""})
+
+
+def test_parse_encodings():
+    """
+    Test parse_encodings()
+    """
+
+    assert eventbridge.parse_encodings("") == {}
+    assert eventbridge.parse_encodings("OrderCreated=zlib+json, OrderModified=json") == {
+        "OrderCreated": "zlib+json",
+        "OrderModified": "json"
+    }
+
+
+def test_ddb_to_event_encodings():
+    """
+    Test ddb_to_event() with an encoding for the detail-type
+    """
+
+    record = _modify_record(
+        {"pk": {"S": "123"}, "total": {"N": "10"}},
+        {"pk": {"S": "123"}, "total": {"N": "20"}}
+    )
+
+    retval = eventbridge.ddb_to_event(
+        record, "BUS", "SOURCE", "Object", "pk",
+        encodings={"ObjectModified": eventbridge.ENCODING_ZLIB}
+    )
+
+    detail = json.loads(retval["Detail"])
+    # Kept for EventBridge rules
+    assert detail["changed"] == ["total"]
+    assert eventbridge.decode_detail(detail)["new"] == {"pk": "123", "total": 20}
+
+
+def test_event_size():
+    """
+    Test event_size()
+    """
+
+    event = {
+        "Time": datetime.datetime.now(),
+        "Source": "ecommerce.orders",
+        "DetailType": "OrderCreated",
+        "Resources": ["123"],
+        "Detail": '{"name": "é"}',
+        "EventBusName": "EVENT_BUS_NAME"
+    }
+
+    # Time, Source, DetailType, Resources and Detail in UTF-8
+    assert eventbridge.event_size(event) == 14 + 16 + 12 + 3 + 14
+
+
+def test_batch_events():
+    """
+    Test batch_events() with many or large events
+    """
+
+    small = {"Source": "s", "DetailType": "d", "Detail": "{}"}
+    large = {"Source": "s", "DetailType": "d", "Detail": "x"*(eventbridge.MAX_EVENT_SIZE//2)}
+
+    assert [len(b) for b in eventbridge.batch_events([small]*25)] == [10, 10, 5]
+    assert [len(b) for b in eventbridge.batch_events([large, large, small])] == [1, 2]
+    assert list(eventbridge.batch_events([])) == []
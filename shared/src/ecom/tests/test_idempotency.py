@@ -0,0 +1,153 @@
+import uuid
+from botocore import stub
+import pytest
+from ecom import idempotency # pylint: disable=import-error
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    return idempotency.IdempotencyStore("TABLE_NAME", namespace="test")
+
+
+def test_memory_only():
+    """
+    Test the in-memory cache without a table
+    """
+
+    store = idempotency.IdempotencyStore(None)
+    calls = []
+
+    @idempotency.idempotent(store)
+    def handler(event, _):
+        calls.append(event["id"])
+        return "done"
+
+    event = {"id": str(uuid.uuid4())}
+    assert handler(event, None) == "done"
+    assert handler(event, None) is None
+    assert calls == [event["id"]]
+
+
+def test_no_key():
+    """
+    Test that events without a key are always processed
+    """
+
+    store = idempotency.IdempotencyStore(None)
+    calls = []
+
+    @idempotency.idempotent(store)
+    def handler(event, _):
+        calls.append(event)
+
+    handler({}, None)
+    handler({}, None)
+    assert len(calls) == 2
+
+
+def test_release_on_error():
+    """
+    Test that a failed invocation can be retried
+    """
+
+    store = idempotency.IdempotencyStore(None)
+    calls = []
+
+    @idempotency.idempotent(store)
+    def handler(event, _):
+        calls.append(event["id"])
+        if len(calls) == 1:
+            raise ValueError("First call fails")
+
+    event = {"id": str(uuid.uuid4())}
+    with pytest.raises(ValueError):
+        handler(event, None)
+    handler(event, None)
+    assert len(calls) == 2
+
+
+def test_cache_size():
+    """
+    Test that the in-memory cache is bounded
+    """
+
+    store = idempotency.IdempotencyStore(None, cache_size=2)
+    for key in ["a", "b", "c"]:
+        assert store.start(key)
+        store.complete(key)
+
+    assert store.start("a")
+    assert not store.start("c")
+
+
+def test_table(store):
+    """
+    Test the DynamoDB-backed store
+    """
+
+    key = str(uuid.uuid4())
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("put_item", {}, {
+        "TableName": "TABLE_NAME",
+        "Item": {"id": "test#"+key, "status": "IN_PROGRESS", "expiration": stub.ANY},
+        "ConditionExpression": stub.ANY,
+        "ExpressionAttributeNames": stub.ANY,
+        "ExpressionAttributeValues": stub.ANY
+    })
+    table.add_response("put_item", {}, {
+        "TableName": "TABLE_NAME",
+        "Item": {"id": "test#"+key, "status": "COMPLETED", "expiration": stub.ANY}
+    })
+    table.activate()
+
+    assert store.start(key)
+    store.complete(key)
+    # Served from the in-memory cache
+    assert not store.start(key)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_table_duplicate(store):
+    """
+    Test the DynamoDB-backed store with a completed key
+    """
+
+    key = str(uuid.uuid4())
+    table = stub.Stubber(store.table.meta.client)
+    table.add_client_error("put_item", "ConditionalCheckFailedException")
+    table.add_response("get_item", {"Item": {
+        "id": {"S": "test#"+key},
+        "status": {"S": "COMPLETED"},
+        "expiration": {"N": "9999999999"}
+    }}, {"TableName": "TABLE_NAME", "Key": {"id": "test#"+key}, "ConsistentRead": True})
+    table.activate()
+
+    assert not store.start(key)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_table_in_progress(store):
+    """
+    Test the DynamoDB-backed store with an in-progress key
+    """
+
+    key = str(uuid.uuid4())
+    table = stub.Stubber(store.table.meta.client)
+    table.add_client_error("put_item", "ConditionalCheckFailedException")
+    table.add_response("get_item", {"Item": {
+        "id": {"S": "test#"+key},
+        "status": {"S": "IN_PROGRESS"},
+        "expiration": {"N": "9999999999"}
+    }})
+    table.activate()
+
+    with pytest.raises(idempotency.IdempotencyInProgressError):
+        store.start(key)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
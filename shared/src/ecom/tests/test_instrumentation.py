@@ -0,0 +1,80 @@
+import boto3
+from botocore import stub
+import pytest
+from ecom import instrumentation, metrics # pylint: disable=import-error
+
+
+@pytest.fixture
+def aggregator():
+    return metrics.MetricsAggregator("NAMESPACE")
+
+
+def get_metric(aggregator, name):
+    for document in aggregator.serialize():
+        if name in document:
+            return document
+
+
+def test_instrument_client(aggregator):
+    """
+    Test that API calls are recorded
+    """
+
+    client = boto3.client("dynamodb", region_name="eu-west-1")
+    instrumentation.instrument_client(client, aggregator)
+
+    # Instrumentation runs before the stubber
+    stubber = stub.Stubber(client)
+    stubber.add_response("get_item", {"ResponseMetadata": {"RetryAttempts": 2}})
+    stubber.add_client_error("get_item", "ResourceNotFoundException")
+    stubber.activate()
+
+    client.get_item(TableName="TABLE_NAME", Key={"id": {"S": "ID"}})
+    with pytest.raises(client.exceptions.ResourceNotFoundException):
+        client.get_item(TableName="TABLE_NAME", Key={"id": {"S": "ID"}})
+
+    stubber.deactivate()
+
+    document = get_metric(aggregator, instrumentation.LATENCY_METRIC)
+    assert document["dependency"] == "dynamodb.GetItem"
+    assert len(document[instrumentation.LATENCY_METRIC]) == 2
+    assert get_metric(aggregator, instrumentation.RETRIES_METRIC)[instrumentation.RETRIES_METRIC] == 2
+    assert get_metric(aggregator, instrumentation.ERRORS_METRIC)[instrumentation.ERRORS_METRIC] == 1
+
+
+def test_instrument_resource(aggregator):
+    """
+    Test instrumenting a DynamoDB table
+    """
+
+    table = boto3.resource("dynamodb", region_name="eu-west-1").Table("TABLE_NAME")
+    instrumentation.instrument_client(table, aggregator)
+
+    stubber = stub.Stubber(table.meta.client)
+    stubber.add_response("put_item", {})
+    stubber.activate()
+
+    table.put_item(Item={"id": "ID"})
+
+    stubber.deactivate()
+
+    document = get_metric(aggregator, instrumentation.LATENCY_METRIC)
+    assert document["dependency"] == "dynamodb.PutItem"
+
+
+def test_timed(aggregator):
+    """
+    Test timing a block of code
+    """
+
+    with instrumentation.timed(aggregator, "service.call"):
+        pass
+
+    with pytest.raises(ValueError):
+        with instrumentation.timed(aggregator, "service.call"):
+            raise ValueError("Call failed")
+
+    document = get_metric(aggregator, instrumentation.LATENCY_METRIC)
+    assert document["dependency"] == "service.call"
+    assert len(document[instrumentation.LATENCY_METRIC]) == 2
+    assert get_metric(aggregator, instrumentation.ERRORS_METRIC)[instrumentation.ERRORS_METRIC] == 1
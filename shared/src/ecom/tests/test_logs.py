@@ -0,0 +1,109 @@
+import logging
+from ecom import logs # pylint: disable=import-error
+
+
+class FakeLogger:
+    def __init__(self, level=logging.INFO):
+        self.level = level
+        self.records = []
+
+    def isEnabledFor(self, level): # pylint: disable=invalid-name
+        return level >= self.level
+
+    def log(self, level, msg, stacklevel=1): # pylint: disable=unused-argument
+        self.records.append((level, msg))
+
+
+def test_truncate():
+    """
+    Test truncate()
+    """
+
+    value = {"items": list(range(20)), "text": "a"*20, "nested": {"a": {"b": {"c": [1]}}}}
+
+    retval = logs.truncate(value, max_items=5, max_length=10, depth=3)
+
+    assert retval["items"] == [0, 1, 2, 3, 4, "...(15 more)"]
+    assert retval["text"] == "a"*10 + "...(10 more)"
+    assert retval["nested"] == {"a": {"b": "{1 key(s)}"}}
+    # The original value is unchanged
+    assert len(value["items"]) == 20
+
+
+def test_truncate_dict():
+    """
+    Test truncate() with a large dict
+    """
+
+    retval = logs.truncate({str(i): i for i in range(4)}, max_items=2)
+
+    assert retval == {"0": 0, "1": 1, "...": "2 more"}
+
+
+def test_lazy_disabled():
+    """
+    Test that payloads are not evaluated when the level is disabled
+    """
+
+    logger = FakeLogger(logging.INFO)
+    log = logs.LazyLogger(logger)
+    called = []
+
+    log.debug("Message", value=lambda: called.append(True))
+    log.verbose("Message", value=lambda: called.append(True))
+
+    assert called == []
+    assert logger.records == []
+
+
+def test_lazy_enabled():
+    """
+    Test that payloads are evaluated and truncated when the level is enabled
+    """
+
+    logger = FakeLogger(logging.DEBUG)
+    log = logs.LazyLogger(logger, max_items=2)
+
+    log.debug("Message", value=lambda: [1, 2, 3], other="value")
+    log.info("Info")
+
+    assert logger.records == [
+        (logging.DEBUG, {"message": "Message", "value": [1, 2, "...(1 more)"], "other": "value"}),
+        (logging.INFO, {"message": "Info"})
+    ]
+
+
+def test_verbose_sampling():
+    """
+    Test sampling of verbose records
+    """
+
+    logger = FakeLogger(logging.DEBUG)
+    log = logs.LazyLogger(logger, sample_rate=0)
+
+    log.verbose("Message")
+    assert logger.records == []
+
+    log.verbose("Message", sample_rate=1)
+    assert logger.records == [(logging.DEBUG, {"message": "Message"})]
+
+
+def test_lazy_caller_location():
+    """
+    Test that records point at the caller rather than at ecom.logs
+    """
+
+    logger = logging.getLogger("test_lazy_caller_location")
+    logger.setLevel(logging.DEBUG)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    log = logs.LazyLogger(logger)
+
+    log.info("Message")
+    log.log(logging.INFO, "Message")
+    log.verbose("Message")
+
+    assert [r.funcName for r in records] == ["test_lazy_caller_location"]*3
+    assert all(r.filename == "test_logs.py" for r in records)
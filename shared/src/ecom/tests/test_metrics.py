@@ -0,0 +1,112 @@
+import json
+import threading
+from ecom import metrics # pylint: disable=import-error
+
+
+def test_add_metric():
+    """
+    Test that counters are aggregated into one datapoint
+    """
+
+    aggregator = metrics.MetricsAggregator("NAMESPACE", dimensions={"service": "test"})
+    aggregator.add_dimension("environment", "dev")
+    for _ in range(1000):
+        aggregator.add_metric("deliveryCompleted", "Count", 1)
+    aggregator.add_metric("deliveryFailed", "Count", 2)
+
+    documents = aggregator.serialize()
+
+    assert len(documents) == 1
+    document = documents[0]
+    assert document["deliveryCompleted"] == 1000
+    assert document["deliveryFailed"] == 2
+    assert document["service"] == "test"
+    assert document["environment"] == "dev"
+    assert document["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "NAMESPACE"
+    assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["service", "environment"]]
+    assert document["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+        {"Name": "deliveryCompleted", "Unit": "Count"},
+        {"Name": "deliveryFailed", "Unit": "Count"}
+    ]
+
+
+def test_extra_dimensions():
+    """
+    Test metrics with extra dimensions
+    """
+
+    aggregator = metrics.MetricsAggregator("NAMESPACE")
+    aggregator.add_metric("packageCreated", "Count")
+    aggregator.add_metric("packageCreated", "Count", dimensions={"warehouse": "A"})
+    aggregator.add_metric("packageCreated", "Count", dimensions={"warehouse": "A"})
+
+    documents = aggregator.serialize()
+
+    assert len(documents) == 2
+    assert documents[0]["packageCreated"] == 1
+    assert documents[1]["packageCreated"] == 2
+    assert documents[1]["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["warehouse"]]
+
+
+def test_add_histogram():
+    """
+    Test histograms with more values than allowed per EMF document
+    """
+
+    aggregator = metrics.MetricsAggregator("NAMESPACE", max_samples=250)
+    for i in range(300):
+        aggregator.add_histogram("latency", "Milliseconds", i, high_resolution=True)
+
+    documents = aggregator.serialize()
+
+    assert [len(d["latency"]) for d in documents] == [100, 100, 50]
+    assert documents[0]["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+        {"Name": "latency", "Unit": "Milliseconds", "StorageResolution": 1}
+    ]
+
+
+def test_log_metrics(capsys):
+    """
+    Test that metrics are flushed after each invocation
+    """
+
+    aggregator = metrics.MetricsAggregator("NAMESPACE")
+
+    @aggregator.log_metrics
+    def handler(event, _):
+        aggregator.add_dimension("environment", "dev")
+        for _ in range(event["count"]):
+            aggregator.add_metric("processed", "Count")
+
+    handler({"count": 3}, None)
+    handler({"count": 0}, None)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["processed"] == 3
+    assert aggregator.dimensions == {}
+
+
+def test_flush_concurrent(capsys):
+    """
+    Test that metrics added from other threads during a flush are neither
+    lost nor counted twice
+    """
+
+    aggregator = metrics.MetricsAggregator("NAMESPACE")
+
+    def worker():
+        for _ in range(10000):
+            aggregator.add_metric("processed", "Count")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        aggregator.flush()
+    for thread in threads:
+        thread.join()
+    aggregator.flush()
+
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sum(d["processed"] for d in documents) == 40000
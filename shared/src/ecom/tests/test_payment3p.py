@@ -0,0 +1,210 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+import uuid
+import pytest
+import yaml
+from ecom import payment3p # pylint: disable=import-error
+
+
+OPENAPI_FILE = os.path.join(
+    os.path.dirname(__file__),
+    "..", "..", "..", "..", "payment-3p", "resources", "openapi.yaml"
+)
+
+
+class Payment3PStub(BaseHTTPRequestHandler):
+    """
+    Local stub of the 3rd party payment API based on its OpenAPI document
+    """
+
+    # Set by the stub_server fixture
+    spec = {}
+    tokens = {}
+    # Per-path overrides: {"delay": seconds, "status": code, "drop": True}
+    faults = {}
+    calls = []
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        pass
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self): # pylint: disable=invalid-name
+        self.calls.append(self.path)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        fault = self.faults.get(self.path, {})
+        if fault.get("delay"):
+            time.sleep(fault["delay"])
+        if fault.get("drop"):
+            # Close the connection after receiving the request
+            self.close_connection = True
+            return None
+        if fault.get("status"):
+            return self._send(fault["status"], {"message": "Internal error"})
+
+        if self.path not in self.spec["paths"]:
+            return self._send(404, {"message": "Not found"})
+
+        schema = self.spec["paths"][self.path]["post"]["requestBody"]["content"]["application/json"]["schema"]
+        for key in schema["required"]:
+            if key not in body:
+                return self._send(400, {"message": "Missing '{}' in request body.".format(key)})
+
+        if self.path == "/preauth":
+            token = str(uuid.uuid4())
+            self.tokens[token] = body["amount"]
+            return self._send(200, {"paymentToken": token})
+        if self.path == "/check":
+            return self._send(200, {"ok": self.tokens.get(body["paymentToken"], -1) >= body["amount"]})
+        if self.path in ["/processPayment", "/cancelPayment"]:
+            return self._send(200, {"ok": self.tokens.pop(body["paymentToken"], None) is not None})
+        # /updateAmount
+        if self.tokens.get(body["paymentToken"], -1) < body["amount"]:
+            return self._send(400, {"message": "Amount is higher than the authorized amount"})
+        self.tokens[body["paymentToken"]] = body["amount"]
+        return self._send(200, {"ok": True})
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.metrics = []
+
+    def add_metric(self, name, unit, value):
+        self.metrics.append((name, unit, value))
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    with open(OPENAPI_FILE) as fp:
+        Payment3PStub.spec = yaml.safe_load(fp)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Payment3PStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_address[1])
+    server.shutdown()
+
+
+@pytest.fixture
+def client(stub_server):
+    Payment3PStub.faults = {}
+    Payment3PStub.calls = []
+    return payment3p.Payment3PClient(stub_server, metrics=FakeMetrics(), backoff=0)
+
+
+def test_payment_flow(client):
+    """
+    Test all endpoints against the stub
+    """
+
+    token = client.preauth("1234567890123456", 3000)["paymentToken"]
+
+    assert client.check(token, 3000) == {"ok": True}
+    assert client.check(token, 3001) == {"ok": False}
+    assert client.update_amount(token, 2000) == {"ok": True}
+    assert "message" in client.update_amount(token, 5000)
+    assert client.process_payment(token) == {"ok": True}
+    assert client.cancel_payment(token) == {"ok": False}
+
+    names = [m[0] for m in client.metrics.metrics]
+    assert "payment3pCheckLatency" in names
+    assert "payment3pErrors" not in names
+
+
+def test_retry_server_error(client):
+    """
+    Test that /check is retried on 5XX responses
+    """
+
+    Payment3PStub.faults = {"/check": {"status": 500}}
+
+    with pytest.raises(payment3p.Payment3PError):
+        client.check("TOKEN", 100)
+
+    # One call and two retries
+    assert Payment3PStub.calls == ["/check"]*3
+    names = [m[0] for m in client.metrics.metrics]
+    assert names.count("payment3pRetries") == 2
+    assert names.count("payment3pErrors") == 3
+
+
+def test_no_retry_timeout(client):
+    """
+    Test that /processPayment is not retried on read timeouts
+    """
+
+    client.endpoints["processPayment"] = payment3p.Endpoint("/processPayment", (1.0, 0.1), 1, False)
+    Payment3PStub.faults = {"/processPayment": {"delay": 0.3}}
+
+    with pytest.raises(payment3p.Payment3PError):
+        client.process_payment("TOKEN")
+
+    assert Payment3PStub.calls == ["/processPayment"]
+
+
+def test_retry_connection_error():
+    """
+    Test that connection errors before sending the request are retried
+    """
+
+    client = payment3p.Payment3PClient("http://127.0.0.1:9", metrics=FakeMetrics(), backoff=0)
+
+    with pytest.raises(payment3p.Payment3PError):
+        client.process_payment("TOKEN")
+
+    assert client.circuit_breaker.failures == 1
+    assert [m[0] for m in client.metrics.metrics].count("payment3pRetries") == 1
+
+
+def test_no_retry_dropped_connection(client):
+    """
+    Test that /processPayment is not retried when the connection is closed
+    after the request was received
+    """
+
+    Payment3PStub.faults = {"/processPayment": {"drop": True}, "/check": {"drop": True}}
+
+    with pytest.raises(payment3p.Payment3PError):
+        client.process_payment("TOKEN")
+    assert Payment3PStub.calls == ["/processPayment"]
+
+    # Endpoints that are safe to call multiple times are still retried
+    with pytest.raises(payment3p.Payment3PError):
+        client.check("TOKEN", 100)
+    assert Payment3PStub.calls == ["/processPayment"] + ["/check"]*3
+
+
+def test_circuit_breaker(client):
+    """
+    Test that the circuit breaker fails fast once open
+    """
+
+    client.circuit_breaker = payment3p.CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    Payment3PStub.faults = {"/check": {"status": 503}}
+
+    for _ in range(2):
+        with pytest.raises(payment3p.Payment3PError):
+            client.check("TOKEN", 100)
+    assert client.circuit_breaker.state == "open"
+
+    calls = len(Payment3PStub.calls)
+    with pytest.raises(payment3p.CircuitOpenError):
+        client.check("TOKEN", 100)
+    assert len(Payment3PStub.calls) == calls
+
+    # Half-open: a successful trial closes the circuit
+    time.sleep(0.2)
+    Payment3PStub.faults = {}
+    assert client.circuit_breaker.state == "half-open"
+    assert client.check("TOKEN", 100) == {"ok": False}
+    assert client.circuit_breaker.state == "closed"
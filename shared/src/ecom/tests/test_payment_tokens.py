@@ -0,0 +1,282 @@
+import uuid
+from botocore import stub
+import pytest
+from ecom import payment_tokens # pylint: disable=import-error
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    return payment_tokens.PaymentTokenStore("TABLE_NAME")
+
+
+@pytest.fixture
+def order_id():
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def payment_token():
+    return str(uuid.uuid4())
+
+
+def test_save(store, order_id, payment_token):
+    """
+    Test save()
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("put_item", {}, {
+        "TableName": "TABLE_NAME",
+        "Item": {"orderId": order_id, "paymentToken": payment_token}
+    })
+    table.activate()
+
+    store.save(order_id, payment_token)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_get(store, order_id, payment_token):
+    """
+    Test get()
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("get_item", {"Item": {
+        "orderId": {"S": order_id},
+        "paymentToken": {"S": payment_token}
+    }}, {"TableName": "TABLE_NAME", "Key": {"orderId": order_id}})
+    table.add_response("get_item", {})
+    table.activate()
+
+    assert store.get(order_id) == payment_token
+    with pytest.raises(payment_tokens.PaymentTokenNotFoundError):
+        store.get(order_id)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_delete_many(store, order_id):
+    """
+    Test delete_many()
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("batch_write_item", {"UnprocessedItems": {}}, {"RequestItems": {"TABLE_NAME": [
+        {"DeleteRequest": {"Key": {"orderId": order_id}}}
+    ]}})
+    table.activate()
+
+    store.delete_many([order_id])
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def claim_params(order_id, owner=stub.ANY):
+    return {
+        "TableName": "TABLE_NAME",
+        "Key": {"orderId": order_id},
+        "UpdateExpression": "SET #status = :status, claimOwner = :owner, claimExpiration = :expiration",
+        "ConditionExpression": "attribute_exists(orderId) AND "
+                               "(attribute_not_exists(claimExpiration) OR claimExpiration < :now)",
+        "ExpressionAttributeNames": {"#status": "status"},
+        "ExpressionAttributeValues": {
+            ":status": "PROCESSING",
+            ":owner": owner,
+            ":expiration": stub.ANY,
+            ":now": stub.ANY
+        },
+        "ReturnValues": "ALL_NEW",
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD"
+    }
+
+
+def claimed_item(order_id, payment_token, owner="OWNER"):
+    return {"Attributes": {
+        "orderId": {"S": order_id},
+        "paymentToken": {"S": payment_token},
+        "status": {"S": "PROCESSING"},
+        "claimOwner": {"S": owner},
+        "claimExpiration": {"N": "1600000000"}
+    }}
+
+
+def test_claim(store, order_id, payment_token):
+    """
+    Test claim()
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("update_item", claimed_item(order_id, payment_token), claim_params(order_id, "OWNER"))
+    table.activate()
+
+    assert store.claim(order_id, "OWNER") == payment_token
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_claim_in_progress(store, order_id, payment_token):
+    """
+    Test claim() when another owner holds the paymentToken
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_client_error(
+        "update_item", "ConditionalCheckFailedException",
+        modeled_fields={"Item": claimed_item(order_id, payment_token)["Attributes"]}
+    )
+    table.add_client_error("update_item", "ConditionalCheckFailedException")
+    table.activate()
+
+    with pytest.raises(payment_tokens.PaymentTokenInProgressError):
+        store.claim(order_id, "OWNER")
+    with pytest.raises(payment_tokens.PaymentTokenNotFoundError):
+        store.claim(order_id, "OWNER")
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_claim_many(store, payment_token):
+    """
+    Test claim_many()
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(3)]
+    claimed = claimed_item(order_ids[1], payment_token)["Attributes"]
+    claimed["claimExpiration"] = {"N": "9999999999"}
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("batch_get_item", {"Responses": {"TABLE_NAME": [
+        {"orderId": {"S": order_ids[0]}, "paymentToken": {"S": payment_token}},
+        claimed
+    ]}}, {"RequestItems": {"TABLE_NAME": {
+        "Keys": [{"orderId": order_id} for order_id in order_ids],
+        "ConsistentRead": True
+    }}})
+    update = claim_params(order_ids[0], "OWNER")
+    del update["ReturnValues"], update["ReturnValuesOnConditionCheckFailure"]
+    table.add_response("transact_write_items", {}, {"TransactItems": [{"Update": update}]})
+    table.activate()
+
+    tokens, errors = store.claim_many(order_ids, "OWNER")
+
+    assert tokens == {order_ids[0]: payment_token}
+    assert isinstance(errors[order_ids[1]], payment_tokens.PaymentTokenInProgressError)
+    assert isinstance(errors[order_ids[2]], payment_tokens.PaymentTokenNotFoundError)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_claim_many_cancelled(store, payment_token):
+    """
+    Test that claim_many() claims tokens one by one if the transaction is
+    cancelled
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(2)]
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("batch_get_item", {"Responses": {"TABLE_NAME": [
+        {"orderId": {"S": order_id}, "paymentToken": {"S": payment_token}}
+        for order_id in order_ids
+    ]}})
+    table.add_client_error("transact_write_items", "TransactionCanceledException")
+    table.add_response("update_item", claimed_item(order_ids[0], payment_token), claim_params(order_ids[0], "OWNER"))
+    table.add_client_error(
+        "update_item", "ConditionalCheckFailedException",
+        modeled_fields={"Item": claimed_item(order_ids[1], payment_token)["Attributes"]}
+    )
+    table.activate()
+
+    tokens, errors = store.claim_many(order_ids, "OWNER")
+
+    assert tokens == {order_ids[0]: payment_token}
+    assert isinstance(errors[order_ids[1]], payment_tokens.PaymentTokenInProgressError)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_release(store, order_id):
+    """
+    Test release(), including when the claim was taken over
+    """
+
+    params = {
+        "TableName": "TABLE_NAME",
+        "Key": {"orderId": order_id},
+        "UpdateExpression": "REMOVE #status, claimOwner, claimExpiration",
+        "ConditionExpression": "claimOwner = :owner",
+        "ExpressionAttributeNames": {"#status": "status"},
+        "ExpressionAttributeValues": {":owner": "OWNER"}
+    }
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("update_item", {}, params)
+    table.add_client_error("update_item", "ConditionalCheckFailedException", expected_params=params)
+    table.activate()
+
+    store.release(order_id, "OWNER")
+    store.release(order_id, "OWNER")
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_consume(store, order_id, payment_token):
+    """
+    Test that consume() deletes the paymentToken after the body succeeds
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("update_item", claimed_item(order_id, payment_token), claim_params(order_id))
+    table.add_response("delete_item", {}, {"TableName": "TABLE_NAME", "Key": {"orderId": order_id}})
+    table.activate()
+
+    with store.consume(order_id) as token:
+        assert token == payment_token
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_consume_release(store, order_id, payment_token):
+    """
+    Test that consume() releases the paymentToken on errors
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_response("update_item", claimed_item(order_id, payment_token), claim_params(order_id))
+    table.add_response("update_item", {})
+    table.activate()
+
+    with pytest.raises(ValueError):
+        with store.consume(order_id):
+            raise ValueError("Payment failed")
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_consume_not_found(store, order_id):
+    """
+    Test consume() without a paymentToken
+    """
+
+    table = stub.Stubber(store.table.meta.client)
+    table.add_client_error("update_item", "ConditionalCheckFailedException")
+    table.activate()
+
+    with pytest.raises(payment_tokens.PaymentTokenNotFoundError):
+        with store.consume(order_id):
+            pass
+
+    table.assert_no_pending_responses()
+    table.deactivate()
@@ -0,0 +1,236 @@
+import gzip
+import json
+import os
+import pytest
+from ecom import claimcheck, replay # pylint: disable=import-error
+
+
+EVENT_ARGS = {
+    "event_bus_name": "EVENT_BUS_NAME",
+    "source": "ecommerce.orders",
+    "object_type": "Order",
+    "resource_key": "orderId"
+}
+
+
+class FakeEventBridge:
+    def __init__(self, fail_first=0):
+        self.fail_first = fail_first
+        self.entries = []
+        self.requests = []
+
+    def put_events(self, Entries): # pylint: disable=invalid-name
+        self.requests.append(Entries)
+        results = []
+        failed = 0
+        for entry in Entries:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                failed += 1
+                results.append({"ErrorCode": "InternalFailure"})
+            else:
+                self.entries.append(entry)
+                results.append({"EventId": "ID"})
+        return {"FailedEntryCount": failed, "Entries": results}
+
+
+class FakeDynamoDB:
+    def __init__(self, items, fail_after=None):
+        self.items = items
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def scan(self, **kwargs):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("Interrupted")
+        items = [
+            item for i, item in enumerate(self.items)
+            if i % kwargs["TotalSegments"] == kwargs["Segment"]
+        ]
+        start = kwargs.get("ExclusiveStartKey", {}).get("index", {}).get("N", 0)
+        start = int(start)
+        end = start + kwargs["Limit"]
+        res = {"Items": items[start:end]}
+        if end < len(items):
+            res["LastEvaluatedKey"] = {"index": {"N": str(end)}}
+        return res
+
+
+class FakeClock:
+    """
+    Stand-in for the time module, where sleeping advances the clock
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(replay, "time", fake)
+    return fake
+
+
+def get_items(n):
+    return [{"orderId": {"S": "order-{}".format(i)}, "total": {"N": str(i)}} for i in range(n)]
+
+
+def test_item_to_event():
+    """
+    Test item_to_event()
+    """
+
+    event = replay.item_to_event(get_items(1)[0], **EVENT_ARGS)
+
+    assert event["DetailType"] == "OrderCreated"
+    assert event["Source"] == "ecommerce.orders"
+    assert event["Resources"] == ["order-0"]
+    assert json.loads(event["Detail"]) == {"orderId": "order-0", "total": 0}
+
+
+def test_publisher_retry():
+    """
+    Test that failed entries are retried
+    """
+
+    eventbridge = FakeEventBridge(fail_first=3)
+    publisher = replay.EventPublisher(eventbridge, backoff=0)
+
+    publisher.publish([{"Detail": str(i)} for i in range(25)])
+
+    assert sorted(e["Detail"] for e in eventbridge.entries) == sorted(str(i) for i in range(25))
+    assert publisher.published == 25
+
+
+def test_publisher_batch_size():
+    """
+    Test that batches fit in the PutEvents size limit
+    """
+
+    eventbridge = FakeEventBridge()
+    publisher = replay.EventPublisher(eventbridge)
+
+    publisher.publish([{"Detail": "a"*100*1024} for _ in range(5)])
+
+    assert [len(r) for r in eventbridge.requests] == [2, 2, 1]
+
+
+def test_publisher_claim_check(tmp_path):
+    """
+    Test that oversized details are claim-checked before publishing
+    """
+
+    eventbridge = FakeEventBridge()
+    check = claimcheck.ClaimCheck(claimcheck.LocalBlobStore(str(tmp_path)), keep=["orderId"])
+    publisher = replay.EventPublisher(eventbridge, claim_check=check)
+    detail = json.dumps({"orderId": "order-0", "products": ["a"*1024]*300})
+
+    publisher.publish([{"Source": "ecommerce.orders", "DetailType": "OrderCreated", "Detail": detail}])
+
+    pointer = json.loads(eventbridge.entries[0]["Detail"])
+    assert pointer["orderId"] == "order-0"
+    assert claimcheck.fetch(pointer["claimCheck"]["uri"]).decode("utf-8") == detail
+
+
+def test_rate_limiter():
+    """
+    Test that the rate limiter does not exceed its burst
+    """
+
+    limiter = replay.RateLimiter(rate=1000, burst=10)
+    limiter.acquire(10)
+    assert limiter.tokens < 1
+    limiter.acquire(5)
+
+
+def test_rate_limiter_above_burst(clock):
+    """
+    Test that counts above the burst size are acquired in steps
+    """
+
+    limiter = replay.RateLimiter(rate=5)
+    limiter.acquire(10)
+
+    assert clock.now == pytest.approx(1)
+
+
+def test_publisher_low_rate(clock):
+    """
+    Test publishing full batches at less than 10 events per second
+    """
+
+    eventbridge = FakeEventBridge()
+    publisher = replay.EventPublisher(eventbridge, rate_limiter=replay.RateLimiter(rate=5))
+
+    publisher.publish([{"Detail": str(i)} for i in range(20)])
+
+    assert publisher.published == 20
+    assert clock.now == pytest.approx(3)
+
+
+def test_replay_table_resume(tmp_path):
+    """
+    Test that an interrupted table replay resumes from the checkpoint
+    """
+
+    items = get_items(50)
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+
+    # First run fails after a few pages
+    eventbridge = FakeEventBridge()
+    try:
+        replay.replay_table(
+            FakeDynamoDB(items, fail_after=3), "TABLE_NAME",
+            replay.EventPublisher(eventbridge), replay.Checkpoint(checkpoint_file),
+            EVENT_ARGS, segments=2, page_size=5
+        )
+        assert False
+    except RuntimeError:
+        pass
+    first = len(eventbridge.entries)
+    assert 0 < first < 50
+
+    eventbridge2 = FakeEventBridge()
+    count = replay.replay_table(
+        FakeDynamoDB(items), "TABLE_NAME",
+        replay.EventPublisher(eventbridge2), replay.Checkpoint(checkpoint_file),
+        EVENT_ARGS, segments=2, page_size=5
+    )
+
+    resources = [e["Resources"][0] for e in eventbridge.entries + eventbridge2.entries]
+    assert count == 50 - first
+    assert sorted(resources) == sorted("order-{}".format(i) for i in range(50))
+
+
+def test_replay_snapshot(tmp_path):
+    """
+    Test replaying a snapshot directory with a checkpoint
+    """
+
+    items = get_items(30)
+    for i in range(2):
+        with gzip.open(str(tmp_path / "part-{}.json.gz".format(i)), "wt") as fp:
+            for item in items[i*15:(i+1)*15]:
+                fp.write(json.dumps({"Item": item}) + "\n")
+
+    checkpoint = replay.Checkpoint(None)
+    # Pretend the first 10 items of the first file were already published
+    checkpoint.set(os.path.abspath(str(tmp_path / "part-0.json.gz")), 10)
+
+    eventbridge = FakeEventBridge()
+    count = replay.replay_snapshot(
+        str(tmp_path), replay.EventPublisher(eventbridge), checkpoint,
+        EVENT_ARGS, workers=2, page_size=4
+    )
+
+    assert count == 20
+    assert len(eventbridge.entries) == 20
+    assert checkpoint.get(os.path.abspath(str(tmp_path / "part-1.json.gz"))) == 15
@@ -0,0 +1,203 @@
+import pytest
+from ecom import search # pylint: disable=import-error
+
+
+PRODUCTS = [
+    {"productId": "1", "name": "Trail Running Shoes", "tags": ["outdoor", "running"], "category": "Shoes"},
+    {"productId": "2", "name": "Running Shirt", "tags": ["running", "summer"], "category": "Clothes"},
+    {"productId": "3", "name": "Leather Shoes", "tags": ["formal"], "category": "Shoes"},
+    {"productId": "4", "name": "Shoelaces", "tags": ["accessories"], "category": "Accessories"}
+]
+
+
+class QueryTable:
+    """
+    Stand-in for a DynamoDB table supporting writes and begins_with queries
+    """
+
+    def __init__(self):
+        self.items = {}
+
+    def batch_writer(self):
+        table = self
+
+        class Writer:
+            def __init__(self):
+                self.keys = set()
+
+            def __enter__(self):
+                return self
+
+            def _check(self, key):
+                # DynamoDB rejects batches with the same key twice
+                if key in self.keys:
+                    raise ValueError("Provided list of item keys contains duplicates")
+                self.keys.add(key)
+
+            def __exit__(self, *args):
+                pass
+
+            def put_item(self, Item): # pylint: disable=invalid-name
+                self._check((Item["shard"], Item["posting"]))
+                table.items[(Item["shard"], Item["posting"])] = Item
+
+            def delete_item(self, Key): # pylint: disable=invalid-name
+                self._check((Key["shard"], Key["posting"]))
+                table.items.pop((Key["shard"], Key["posting"]), None)
+
+        return Writer()
+
+    def query(self, KeyConditionExpression, Limit, **kwargs): # pylint: disable=invalid-name
+        shard_condition, posting_condition = KeyConditionExpression.get_expression()["values"]
+        shard = shard_condition.get_expression()["values"][1]
+        prefix = posting_condition.get_expression()["values"][1]
+        items = sorted(
+            (item for (s, p), item in self.items.items() if s == shard and p.startswith(prefix)),
+            key=lambda item: item["posting"]
+        )
+        return {"Items": items[:Limit]}
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def index(request):
+    if request.param == "memory":
+        index = search.InMemorySearchIndex()
+    else:
+        index = search.DynamoDBSearchIndex(QueryTable())
+    index.update_many((p["productId"], None, p) for p in PRODUCTS)
+    return index
+
+
+def test_tokenize():
+    """
+    Test tokenize()
+    """
+
+    assert search.tokenize("Trail-Running SHOES, size 42") == ["trail", "running", "shoes", "size", "42"]
+
+
+def test_postings():
+    """
+    Test postings()
+    """
+
+    assert search.postings({"name": "Shoes shoes", "tags": ["shoes"], "category": None}) == {
+        ("shoes", "name"): 6,
+        ("shoes", "tags"): 2
+    }
+    assert search.postings(None) == {}
+
+
+def test_search(index):
+    """
+    Test search() with prefixes
+    """
+
+    results, cursor = search.search(index, "shoe")
+
+    # Whole terms rank before prefix matches
+    assert [r["productId"] for r in results] == ["1", "3", "4"]
+    assert cursor is None
+
+
+def test_search_all_terms(index):
+    """
+    Test that results match all terms
+    """
+
+    results, _ = search.search(index, "running sh")
+
+    assert [r["productId"] for r in results] == ["1", "2"]
+
+
+def test_search_tags(index):
+    """
+    Test search() with tag and category filters
+    """
+
+    results, _ = search.search(index, tags=["running"])
+    assert {r["productId"] for r in results} == {"1", "2"}
+
+    results, _ = search.search(index, tags=["running"], category="shoes")
+    assert [r["productId"] for r in results] == ["1"]
+
+    # Tags only match whole terms
+    results, _ = search.search(index, tags=["run"])
+    assert results == []
+
+
+def test_search_cursor(index):
+    """
+    Test paginating search results
+    """
+
+    pages = []
+    cursor = None
+    while True:
+        results, cursor = search.search(index, "shoe", limit=1, cursor=cursor)
+        pages.append([r["productId"] for r in results])
+        if cursor is None:
+            break
+
+    assert pages == [["1"], ["3"], ["4"]]
+
+
+def test_search_invalid_cursor(index):
+    """
+    Test search() with an invalid cursor
+    """
+
+    with pytest.raises(ValueError):
+        search.search(index, "shoe", cursor="invalid")
+    with pytest.raises(ValueError):
+        search.search(index, "shoe", cursor=search.encode_cursor(1, "1")[:-4])
+
+
+def test_update(index):
+    """
+    Test that updates only write the postings that changed
+    """
+
+    old = PRODUCTS[2]
+    new = dict(old, name="Leather Boots")
+
+    assert index.update("3", old, new) == 2
+    assert [r["productId"] for r in search.search(index, "boots")[0]] == ["3"]
+    assert [r["productId"] for r in search.search(index, "shoes", category="shoes")[0]] == ["1", "3"]
+
+    assert index.update("3", new, new) == 0
+
+    assert index.update("3", new, None) == 4
+    assert search.search(index, "leather")[0] == []
+
+
+def test_update_many_same_product(index):
+    """
+    Test updates with several versions of the same product
+    """
+
+    first = PRODUCTS[2]
+    second = dict(first, name="Leather Boots")
+    third = dict(first, name="Suede Boots")
+
+    assert index.update_many([("3", first, second), ("3", second, third)]) == 4
+    assert [r["productId"] for r in search.search(index, "suede boots")[0]] == ["3"]
+    assert search.search(index, "leather")[0] == []
+
+    assert index.update_many([("3", third, None), ("3", None, first)]) == 4
+    assert [r["productId"] for r in search.search(index, "leather")[0]] == ["3"]
+    assert search.search(index, "boots")[0] == []
+
+
+def test_in_memory_load():
+    """
+    Test InMemorySearchIndex.load()
+    """
+
+    index = search.InMemorySearchIndex()
+    index.load(PRODUCTS)
+    reference = search.InMemorySearchIndex()
+    reference.update_many((p["productId"], None, p) for p in PRODUCTS)
+
+    assert len(index) == len(reference)
+    assert search.search(index, "sh") == search.search(reference, "sh")
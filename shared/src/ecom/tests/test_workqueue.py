@@ -0,0 +1,242 @@
+import concurrent.futures
+import datetime
+import threading
+from botocore.exceptions import ClientError
+import pytest
+from ecom.workqueue import WorkQueue # pylint: disable=import-error
+
+
+NOW = datetime.datetime(2021, 1, 1, 12, 0, 0)
+
+
+class QueueTable:
+    """
+    Stand-in for a table with a sparse index on isNew and visibleDate
+
+    `stale` items are returned by the index with their visible date before
+    the last update, as the index is eventually consistent.
+    """
+
+    def __init__(self, items, stale=()):
+        self.items = {item["id"]: dict(item) for item in items}
+        self.stale = {i: dict(self.items[i]) for i in stale}
+        self.queries = []
+        self.updates = []
+        self._lock = threading.Lock()
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        values = kwargs["ExpressionAttributeValues"]
+        with self._lock:
+            index = [
+                item for item in (self.stale.get(i, item) for i, item in self.items.items())
+                if item.get("isNew") == values[":pk"] and item["visibleDate"] <= values[":now"]
+            ]
+        index.sort(key=lambda item: (item["visibleDate"], item["id"]))
+        # Pages start after the last key, as items may move between calls
+        if "ExclusiveStartKey" in kwargs:
+            start_key = kwargs["ExclusiveStartKey"]
+            index = [i for i in index if (i["visibleDate"], i["id"]) > (start_key["visibleDate"], start_key["id"])]
+        page = index[:kwargs["Limit"]]
+        res = {"Items": [dict(item) for item in page]}
+        if len(index) > len(page):
+            res["LastEvaluatedKey"] = {"visibleDate": page[-1]["visibleDate"], "id": page[-1]["id"]}
+        return res
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs): # pylint: disable=invalid-name
+        with self._lock:
+            self.updates.append(Key)
+            item = self.items[Key["id"]]
+            if item.get("visibleDate") != ExpressionAttributeValues[":visibleDate"]:
+                raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+            item["visibleDate"] = ExpressionAttributeValues[":until"]
+            item["leaseOwner"] = ExpressionAttributeValues[":owner"]
+            return {"Attributes": dict(item)}
+
+
+def make_items(count, started=()):
+    items = []
+    for i in range(count):
+        item = {"id": str(i), "visibleDate": (NOW - datetime.timedelta(minutes=count-i)).isoformat()}
+        if str(i) not in started:
+            item["isNew"] = "true"
+        items.append(item)
+    return items
+
+
+def test_attributes():
+    """
+    Test WorkQueue.attributes()
+    """
+
+    queue = WorkQueue(None, "INDEX", ["id"])
+
+    assert queue.attributes("2021-01-01") == {"isNew": "true", "visibleDate": "2021-01-01"}
+
+
+def test_lease():
+    """
+    Test that the oldest requests are leased
+    """
+
+    table = QueueTable(make_items(10))
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    leased = queue.lease(3, "owner", 60, now=NOW)
+
+    assert [item["id"] for item in leased] == ["0", "1", "2"]
+    assert all(item["leaseOwner"] == "owner" for item in leased)
+    assert all(item["visibleDate"] == (NOW + datetime.timedelta(seconds=60)).isoformat() for item in leased)
+    # Only the requests needed were read
+    assert len(table.queries) == 1
+    assert table.queries[0]["Limit"] == 3
+    assert table.queries[0]["IndexName"] == "INDEX"
+    assert table.queries[0]["ScanIndexForward"]
+
+
+def test_lease_skip_leased():
+    """
+    Test that leased requests are not leased again before the timeout
+    """
+
+    table = QueueTable(make_items(5))
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    first = queue.lease(2, "first", 60, now=NOW)
+    second = queue.lease(2, "second", 60, now=NOW)
+    expired = queue.lease(5, "third", 60, now=NOW + datetime.timedelta(seconds=61))
+
+    assert [item["id"] for item in first] == ["0", "1"]
+    assert [item["id"] for item in second] == ["2", "3"]
+    assert [item["id"] for item in expired] == ["4", "0", "1", "2", "3"]
+
+
+def test_lease_skip_started():
+    """
+    Test that requests being processed are not leased
+    """
+
+    table = QueueTable(make_items(4, started=["0", "2"]))
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    leased = queue.lease(5, "owner", 60, now=NOW)
+
+    assert [item["id"] for item in leased] == ["1", "3"]
+
+
+def test_lease_stale_index():
+    """
+    Test that entries outdated in the index are skipped
+    """
+
+    # Request 0 was leased by another worker, but the index is not updated yet
+    table = QueueTable(make_items(4), stale=["0"])
+    table.items["0"]["visibleDate"] = (NOW + datetime.timedelta(seconds=30)).isoformat()
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    leased = queue.lease(2, "owner", 60, now=NOW)
+
+    assert [item["id"] for item in leased] == ["1", "2"]
+    assert table.items["0"].get("leaseOwner") is None
+
+
+def test_lease_max_candidates():
+    """
+    Test that at most max_candidates index entries are tried
+    """
+
+    table = QueueTable(make_items(10), stale=[str(i) for i in range(10)])
+    for item in table.items.values():
+        item["visibleDate"] = "LEASED"
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    leased = queue.lease(2, "owner", 60, now=NOW)
+
+    assert leased == []
+    assert len(table.updates) == 6
+
+
+def test_lease_concurrent():
+    """
+    Test that concurrent workers never lease the same request
+    """
+
+    table = QueueTable(make_items(50))
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: queue.lease(5, str(i), 60, now=NOW), range(8)))
+
+    leased = [item["id"] for result in results for item in result]
+    assert len(leased) == len(set(leased))
+    for owner, result in enumerate(results):
+        assert all(table.items[item["id"]]["leaseOwner"] == str(owner) for item in result)
+    assert len(leased) <= 40
+
+
+def test_lease_error():
+    """
+    Test that errors other than a failed condition are raised
+    """
+
+    table = QueueTable(make_items(1))
+    def update_item(**kwargs):
+        raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "UpdateItem")
+    table.update_item = update_item
+    queue = WorkQueue(table, "INDEX", ["id"])
+
+    with pytest.raises(ClientError):
+        queue.lease(1, "owner", 60, now=NOW)
+
+
+class BackfillTable:
+    """
+    Stand-in for a table scanned and updated by WorkQueue.backfill()
+    """
+
+    def __init__(self, items):
+        self.items = {item["id"]: dict(item) for item in items}
+        self.scans = []
+
+    def scan(self, **kwargs):
+        self.scans.append(kwargs)
+        if kwargs["Segment"] != 0:
+            return {"Items": []}
+        return {"Items": [
+            {"id": item["id"], **({"newDate": item["newDate"]} if "newDate" in item else {})}
+            for item in self.items.values()
+            if item["status"] == "NEW" and "visibleDate" not in item
+        ]}
+
+    def update_item(self, Key, ExpressionAttributeValues, **kwargs): # pylint: disable=invalid-name
+        item = self.items[Key["id"]]
+        if item["status"] != ExpressionAttributeValues[":status"] or "visibleDate" in item:
+            raise ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+        item["isNew"] = ExpressionAttributeValues[":pk"]
+        item["visibleDate"] = ExpressionAttributeValues[":date"]
+
+
+def test_backfill():
+    """
+    Test WorkQueue.backfill()
+    """
+
+    table = BackfillTable([
+        {"id": "old", "status": "NEW", "newDate": "2020-12-01T00:00:00"},
+        {"id": "nodate", "status": "NEW"},
+        {"id": "queued", "status": "NEW", "isNew": "true", "visibleDate": "2021-01-01T13:00:00"},
+        {"id": "started", "status": "IN_PROGRESS"}
+    ])
+    work_queue = WorkQueue(table, "new-visible", ["id"])
+
+    assert work_queue.backfill(segments=2, now=NOW) == 2
+    assert table.items["old"]["isNew"] == "true"
+    assert table.items["old"]["visibleDate"] == "2020-12-01T00:00:00"
+    assert table.items["nodate"]["visibleDate"] == NOW.isoformat()
+    assert table.items["queued"]["visibleDate"] == "2021-01-01T13:00:00"
+    assert "isNew" not in table.items["started"]
+    assert len(table.scans) == 2
+    assert "#pk" not in table.scans[0]["ExpressionAttributeNames"]
+
+    # Running it again finds nothing left to queue
+    assert work_queue.backfill(segments=2, now=NOW) == 0
@@ -0,0 +1,161 @@
+"""
+Benchmark of the record processing in Delivery's table_update function
+
+This compares building every event before classifying records, as the
+function did previously, with classifying records on raw values and only
+building events for the records that are published. The batch follows a
+realistic mix where most records are dropped:
+ - 30% INSERT of new shipping requests
+ - 40% MODIFY to IN_PROGRESS
+ - 18% REMOVE of completed shipping requests
+ - 10% MODIFY to COMPLETED
+ - 2% MODIFY to FAILED
+
+Usage: python shared/tests/perf/bench_delivery_records.py
+"""
+
+
+import datetime
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from boto3.dynamodb.types import TypeSerializer
+
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "..")
+RECORDS = 1000
+ITERATIONS = 50
+
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-west-1",
+    "ENVIRONMENT": "bench",
+    "EVENT_BUS_NAME": "EVENT_BUS_NAME",
+    "POWERTOOLS_TRACE_DISABLED": "true",
+    "LOG_LEVEL": "WARNING"
+})
+sys.path.insert(0, os.path.join(ROOT, "shared", "src", "ecom"))
+sys.path.insert(0, os.path.join(ROOT, "delivery", "src", "table_update"))
+import main as function # pylint: disable=import-error,wrong-import-position
+
+
+serialize = TypeSerializer().serialize
+
+
+def get_record(event_name: str, old_status: str, new_status: str) -> dict:
+    """
+    Generate a DynamoDB stream record for a shipping request
+    """
+
+    order_id = str(uuid.uuid4())
+
+    def _image(status: str) -> dict:
+        return {
+            "orderId": serialize(order_id),
+            "status": serialize(status),
+            "address": serialize({
+                "name": "John Doe",
+                "companyName": "Test Co",
+                "streetAddress": "123 Test St",
+                "postCode": "12345",
+                "city": "Test City",
+                "state": "Test State",
+                "country": "SE",
+                "phoneNumber": "+123456789"
+            })
+        }
+
+    record = {
+        "eventName": event_name,
+        "dynamodb": {"Keys": {"orderId": serialize(order_id)}}
+    }
+    if old_status is not None:
+        record["dynamodb"]["OldImage"] = _image(old_status)
+    if new_status is not None:
+        record["dynamodb"]["NewImage"] = _image(new_status)
+    return record
+
+
+def get_records(n: int) -> list:
+    """
+    Generate `n` records following the mix described above
+    """
+
+    mix = [
+        (30, ("INSERT", None, "NEW")),
+        (40, ("MODIFY", "NEW", "IN_PROGRESS")),
+        (18, ("REMOVE", "COMPLETED", None)),
+        (10, ("MODIFY", "IN_PROGRESS", "COMPLETED")),
+        (2, ("MODIFY", "IN_PROGRESS", "FAILED"))
+    ]
+    kinds = random.choices([k for _, k in mix], weights=[w for w, _ in mix], k=n)
+    return [get_record(*kind) for kind in kinds]
+
+
+def eager_process_record(record: dict):
+    """
+    Previous implementation, building the event before classifying records
+    """
+    # pylint: disable=no-else-return
+
+    deserialize = function.deserialize
+    event = {
+        "Time": datetime.datetime.now(),
+        "Source": "ecommerce.delivery",
+        "Resources": [deserialize(record["dynamodb"]["Keys"]["orderId"])],
+        "EventBusName": function.EVENT_BUS_NAME
+    }
+    image = record["dynamodb"].get("OldImage", None) or record["dynamodb"]["NewImage"]
+    event["Detail"] = json.dumps({
+        "orderId": deserialize(image["orderId"]),
+        "address": deserialize(image["address"])
+    }, cls=function.Encoder)
+
+    if record["eventName"].upper() == "INSERT":
+        return None
+    elif record["eventName"].upper() == "REMOVE":
+        if deserialize(record["dynamodb"]["OldImage"]["status"]) in ["COMPLETED", "FAILED"]:
+            return None
+        event["DetailType"] = "DeliveryFailed"
+        return event
+    elif deserialize(record["dynamodb"]["NewImage"]["status"]) == "FAILED":
+        event["DetailType"] = "DeliveryFailed"
+        return event
+    elif deserialize(record["dynamodb"]["NewImage"]["status"]) == "COMPLETED":
+        event["DetailType"] = "DeliveryCompleted"
+        return event
+    return None
+
+
+def bench(func, records: list) -> float:
+    """
+    Returns the CPU time per batch in milliseconds
+    """
+
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        events = [func(record) for record in records]
+        function.metrics.clear()
+    return (time.process_time() - start) / ITERATIONS * 1000, sum(e is not None for e in events)
+
+
+def main():
+    records = get_records(RECORDS)
+    # Only compare record processing, not logging
+    function.logger.setLevel("ERROR")
+
+    eager_ms, eager_count = bench(eager_process_record, records)
+    lazy_ms, lazy_count = bench(function.process_record, records)
+    assert eager_count == lazy_count
+
+    print("{} records, {} published".format(RECORDS, lazy_count))
+    print("eager: {:8.2f} ms  lazy: {:8.2f} ms  saved: {:5.1f}%".format(
+        eager_ms, lazy_ms, (1-lazy_ms/eager_ms)*100
+    ))
+
+
+if __name__ == "__main__":
+    main()
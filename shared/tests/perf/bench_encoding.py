@@ -0,0 +1,76 @@
+"""
+Benchmark of the event detail encodings
+
+This compares the size and CPU cost of encoding and decoding the detail of
+a large OrderCreated event as plain JSON and as compressed JSON.
+
+Usage: python shared/tests/perf/bench_encoding.py
+"""
+
+
+import datetime
+import json
+import time
+import uuid
+from ecom.eventbridge import ENCODING_JSON, ENCODING_ZLIB, decode_detail, encode_detail # pylint: disable=import-error
+
+
+PRODUCTS = 500
+ITERATIONS = 200
+
+
+def get_detail(n: int) -> dict:
+    """
+    Generate an order detail with `n` products
+    """
+
+    return {
+        "orderId": str(uuid.uuid4()),
+        "userId": str(uuid.uuid4()),
+        "status": "NEW",
+        "createdDate": datetime.datetime.now().isoformat(),
+        "address": {
+            "name": "John Doe",
+            "streetAddress": "123 Main Street",
+            "city": "Anytown",
+            "country": "SE"
+        },
+        "products": [{
+            "productId": str(uuid.uuid4()),
+            "name": "Product {}".format(i),
+            "package": {"width": 200, "length": 100, "height": 50, "weight": 1000},
+            "price": 1000 + i,
+            "quantity": 1
+        } for i in range(n)]
+    }
+
+
+def bench(func, *args) -> float:
+    """
+    Returns the CPU time per call in milliseconds
+    """
+
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        func(*args)
+    return (time.process_time() - start) / ITERATIONS * 1000
+
+
+def main():
+    detail = get_detail(PRODUCTS)
+
+    for encoding in [ENCODING_JSON, ENCODING_ZLIB]:
+        encoded = encode_detail(detail, encoding, keep=["orderId"])
+        parsed = json.loads(encoded)
+
+        encode_ms = bench(encode_detail, detail, encoding, ["orderId"])
+        decode_ms = bench(lambda: decode_detail(json.loads(encoded)))
+        assert decode_detail(parsed) == detail
+
+        print("{:<10} size: {:8d} bytes  encode: {:6.2f} ms  decode: {:6.2f} ms".format(
+            encoding, len(encoded), encode_ms, decode_ms
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark of bulk product imports against a simulated DynamoDB table
+
+This compares:
+ - a single batch writer putting every product, as done by
+   perf_happy_path.get_products()
+ - ecom.bulk_import.BulkImporter with parallel batch writers, for a first
+   import and for a refresh where only a few products changed
+
+Each DynamoDB call takes a fixed latency, so that the results reflect the
+number of round trips and how they overlap rather than local CPU time.
+
+Usage: python shared/tests/perf/bench_import.py [PRODUCTS]
+"""
+
+
+import os
+import sys
+import threading
+import time
+import uuid
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "..")
+PRODUCTS = 20000
+# Latency of each DynamoDB call, in seconds
+LATENCY = 0.005
+WORKERS = 8
+# Share of products changed between two imports
+CHANGED = 0.05
+
+
+sys.path.insert(0, os.path.join(ROOT, "shared", "src", "ecom"))
+from ecom.bulk_import import BulkImporter, ItemSchema, Row # pylint: disable=import-error,wrong-import-position
+
+
+class SimulatedDynamoDB:
+    """
+    Low-level DynamoDB client keeping items in memory
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.calls = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    def batch_get_item(self, RequestItems): # pylint: disable=invalid-name
+        time.sleep(LATENCY)
+        (table_name, request), = RequestItems.items()
+        with self._lock:
+            self.calls += 1
+            found = [self.items[k["productId"]["S"]] for k in request["Keys"] if k["productId"]["S"] in self.items]
+        return {"Responses": {table_name: found}}
+
+    def batch_write_item(self, RequestItems): # pylint: disable=invalid-name
+        time.sleep(LATENCY)
+        (_, requests), = RequestItems.items()
+        with self._lock:
+            self.calls += 1
+            for request in requests:
+                item = request["PutRequest"]["Item"]
+                self.items[item["productId"]["S"]] = item
+                self.writes += 1
+        return {"UnprocessedItems": {}}
+
+    def put_products(self, products: list) -> None:
+        """
+        Put products 25 at a time from a single thread, like a batch_writer
+        """
+
+        for i in range(0, len(products), 25):
+            self.batch_write_item(RequestItems={"TABLE_NAME": [
+                {"PutRequest": {"Item": {k: self._serializer.serialize(v) for k, v in p.items()}}}
+                for p in products[i:i+25]
+            ]})
+
+
+def get_products(n: int) -> list:
+    """
+    Returns valid products
+    """
+
+    return [
+        {
+            "productId": str(uuid.UUID(int=i)),
+            "name": "Product {}".format(i),
+            "category": "Category {}".format(i % 20),
+            "tags": ["tag{}".format(i % 50), "tag{}".format(i % 7)],
+            "package": {"weight": i % 1000, "height": 10, "length": 20, "width": 30},
+            "price": 100 + i % 5000
+        }
+        for i in range(n)
+    ]
+
+
+def run_import(client: SimulatedDynamoDB, schema: ItemSchema, products: list) -> None:
+    calls, writes = client.calls, client.writes
+    importer = BulkImporter(client, "TABLE_NAME", ["productId"], schema=schema, workers=WORKERS)
+    start = time.perf_counter()
+    stats = importer.run(Row(i+1, p) for i, p in enumerate(products))
+    elapsed = time.perf_counter() - start
+    print("  {:.2f} s, {} calls, {} writes, {}".format(
+        elapsed, client.calls-calls, client.writes-writes, stats.as_dict()
+    ))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCTS
+    products = get_products(count)
+    schema = ItemSchema(os.path.join(ROOT, "shared", "resources", "schemas.yaml"), "Product")
+
+    print("Single batch writer, {} products".format(count))
+    client = SimulatedDynamoDB()
+    start = time.perf_counter()
+    client.put_products(products)
+    print("  {:.2f} s, {} calls, {} writes".format(time.perf_counter() - start, client.calls, client.writes))
+
+    print("BulkImporter with {} workers, first import".format(WORKERS))
+    client = SimulatedDynamoDB()
+    run_import(client, schema, products)
+
+    changed = int(count * CHANGED)
+    print("BulkImporter with {} workers, refresh with {} changed products".format(WORKERS, changed))
+    step = max(1, count // max(1, changed))
+    refreshed = [
+        dict(p, price=p["price"]+1) if i % step == 0 else p
+        for i, p in enumerate(products)
+    ]
+    run_import(client, schema, refreshed)
+
+
+if __name__ == "__main__":
+    main()
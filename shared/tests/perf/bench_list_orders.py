@@ -0,0 +1,202 @@
+"""
+Benchmark of the order listing for a user with 10k orders
+
+This runs ListOrdersFunction's list_orders() against an in-memory stand-in
+for the orders table and compares, for the first page and for walking all
+orders with cursors:
+ - full items from the 'user' index, as returned by the previous query
+ - the summary fields from the 'user-summary' index
+ - products from the 'user' index with a projection
+
+Read units are estimated from the size of the items read in the index,
+before projection, as DynamoDB bills them.
+
+Usage: python shared/tests/perf/bench_list_orders.py
+"""
+
+
+import datetime
+import json
+import math
+import os
+import sys
+import time
+import uuid
+
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "..")
+ORDERS = 10000
+PAGE_SIZE = 20
+PRODUCTS_PER_ORDER = 5
+# Maximum size of data read per Query call
+MAX_READ_SIZE = 1024 * 1024
+
+
+os.environ.update({
+    "AWS_DEFAULT_REGION": "eu-west-1",
+    "ENVIRONMENT": "bench",
+    "TABLE_NAME": "TABLE_NAME",
+    "USER_INDEX_NAME": "user",
+    "SUMMARY_INDEX_NAME": "user-summary",
+    "POWERTOOLS_TRACE_DISABLED": "true",
+    "LOG_LEVEL": "WARNING"
+})
+sys.path.insert(0, os.path.join(ROOT, "shared", "src", "ecom"))
+sys.path.insert(0, os.path.join(ROOT, "orders", "src", "list_orders"))
+import main as function # pylint: disable=import-error,wrong-import-position
+
+
+class FakeTable:
+    """
+    In-memory stand-in for the orders table, with the orders of one user
+    """
+
+    def __init__(self, orders):
+        # Most recent first, as with ScanIndexForward=False
+        self.orders = sorted(orders, key=lambda o: o["createdDate"], reverse=True)
+        self.sizes = [len(json.dumps(o)) for o in self.orders]
+        self.summary_sizes = [
+            len(json.dumps({k: v for k, v in o.items() if k in function.SUMMARY_FIELDS}))
+            for o in self.orders
+        ]
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.read_units = 0
+        self.returned_size = 0
+
+    def query(self, IndexName, Limit, ExclusiveStartKey=None, ProjectionExpression=None, # pylint: disable=invalid-name
+              ExpressionAttributeNames=None, **_):
+        self.calls += 1
+        start = 0
+        if ExclusiveStartKey is not None:
+            start = next(
+                i+1 for i, o in enumerate(self.orders)
+                if o["orderId"] == ExclusiveStartKey["orderId"]
+            )
+
+        sizes = self.summary_sizes if IndexName == "user-summary" else self.sizes
+        fields = None
+        if ProjectionExpression is not None:
+            fields = {ExpressionAttributeNames[p.strip()] for p in ProjectionExpression.split(",")}
+
+        items = []
+        read_size = 0
+        end = start
+        while end < len(self.orders) and len(items) < Limit and read_size < MAX_READ_SIZE:
+            order = self.orders[end]
+            if IndexName == "user-summary":
+                order = {k: v for k, v in order.items() if k in function.SUMMARY_FIELDS}
+            if fields is not None:
+                order = {k: v for k, v in order.items() if k in fields}
+            items.append(order)
+            read_size += sizes[end]
+            end += 1
+
+        # Eventually consistent reads: 0.5 unit per 4 KB
+        self.read_units += math.ceil(read_size / 4096) / 2
+        self.returned_size += sum(len(json.dumps(i)) for i in items)
+
+        res = {"Items": items}
+        if end < len(self.orders):
+            res["LastEvaluatedKey"] = {k: items[-1][k] for k in function.KEY_FIELDS} if items else ExclusiveStartKey
+        return res
+
+
+def get_orders(user_id: str, n: int) -> list:
+    """
+    Generate `n` orders for a user
+    """
+
+    now = datetime.datetime.now()
+    return [{
+        "orderId": str(uuid.uuid4()),
+        "userId": user_id,
+        "createdDate": (now - datetime.timedelta(minutes=i)).isoformat(),
+        "modifiedDate": now.isoformat(),
+        "status": "COMPLETED",
+        "paymentToken": str(uuid.uuid4()),
+        "products": [{
+            "productId": str(uuid.uuid4()),
+            "name": "Product {}".format(j),
+            "package": {"width": 200, "length": 100, "height": 50, "weight": 1000},
+            "price": 1000,
+            "quantity": 1
+        } for j in range(PRODUCTS_PER_ORDER)],
+        "address": {
+            "name": "John Doe",
+            "streetAddress": "123 Main Street",
+            "city": "Anytown",
+            "country": "SE"
+        },
+        "deliveryPrice": 200,
+        "total": 5200
+    } for i in range(n)]
+
+
+def full_items(table: FakeTable, user_id: str, start_key=None):
+    """
+    Query full items from the 'user' index, like the previous getOrders query
+    """
+
+    kwargs = {"ExclusiveStartKey": start_key} if start_key else {}
+    res = table.query(IndexName="user", Limit=PAGE_SIZE, KeyConditionExpression=user_id, **kwargs)
+    return res["Items"], res.get("LastEvaluatedKey", None)
+
+
+def list_orders(fields: list):
+    """
+    Returns a function listing orders with ListOrdersFunction
+    """
+
+    def _list(_, user_id: str, start_key=None):
+        return function.list_orders(user_id, fields, PAGE_SIZE, start_key=start_key)
+    return _list
+
+
+def bench(table: FakeTable, user_id: str, func, walk: bool) -> dict:
+    """
+    Read the first page, or all pages if `walk` is true
+    """
+
+    table.reset()
+    start = time.process_time()
+    count = 0
+    start_key = None
+    while True:
+        items, start_key = func(table, user_id, start_key)
+        count += len(items)
+        if not walk or start_key is None:
+            break
+    return {
+        "cpu_ms": (time.process_time() - start) * 1000,
+        "calls": table.calls,
+        "read_units": table.read_units,
+        "kb": table.returned_size / 1024,
+        "count": count
+    }
+
+
+def main():
+    user_id = str(uuid.uuid4())
+    table = FakeTable(get_orders(user_id, ORDERS))
+    function.table = table
+
+    strategies = [
+        ("full items", full_items),
+        ("summary", list_orders(sorted(function.SUMMARY_FIELDS))),
+        ("products", list_orders(["orderId", "createdDate", "products"]))
+    ]
+
+    for walk in [False, True]:
+        print("{} ({} orders)".format("All pages" if walk else "First page", ORDERS))
+        for name, func in strategies:
+            result = bench(table, user_id, func, walk)
+            print("  {:<10} orders: {:6d}  calls: {:4d}  read units: {:8.1f}  returned: {:9.1f} KB  cpu: {:7.1f} ms".format(
+                name, result["count"], result["calls"], result["read_units"], result["kb"], result["cpu_ms"]
+            ))
+
+
+if __name__ == "__main__":
+    main()
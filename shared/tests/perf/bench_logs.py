@@ -0,0 +1,106 @@
+"""
+Benchmark of the logging overhead in stream handlers
+
+This compares logging a 1000-record DynamoDB stream batch with plain
+Logger calls and with ecom.logs.LazyLogger, at INFO and DEBUG levels.
+
+Usage: python shared/tests/perf/bench_logs.py
+"""
+
+
+import datetime
+import os
+import time
+import uuid
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.logs import LazyLogger # pylint: disable=import-error
+
+
+RECORDS = 1000
+ITERATIONS = 20
+
+
+def get_event(n: int) -> dict:
+    """
+    Generate a DynamoDB stream event with `n` MODIFY records
+    """
+
+    def _image(order_id: str, status: str) -> dict:
+        return {
+            "orderId": {"S": order_id},
+            "status": {"S": status},
+            "address": {"M": {
+                "name": {"S": "John Doe"},
+                "streetAddress": {"S": "123 Main Street"},
+                "city": {"S": "Anytown"},
+                "country": {"S": "SE"}
+            }},
+            "lastModified": {"S": datetime.datetime.now().isoformat()}
+        }
+
+    records = []
+    for _ in range(n):
+        order_id = str(uuid.uuid4())
+        records.append({
+            "eventName": "MODIFY",
+            "dynamodb": {
+                "OldImage": _image(order_id, "IN_PROGRESS"),
+                "NewImage": _image(order_id, "COMPLETED")
+            }
+        })
+    return {"Records": records}
+
+
+def plain(logger: Logger, event: dict) -> None:
+    """
+    Log the batch like the handlers did before LazyLogger
+    """
+
+    logger.debug({"message": "Input event", "event": event})
+    logger.debug({"message": "Records received", "records": event.get("Records", [])})
+    for record in event["Records"]:
+        logger.info({"message": "Delivery completed", "record": record})
+    logger.debug({"message": "Events processed from records", "events": event["Records"]})
+
+
+def lazy(log: LazyLogger, event: dict) -> None:
+    """
+    Log the batch with LazyLogger
+    """
+
+    log.verbose("Input event", event=event)
+    for record in event["Records"]:
+        log.info("Delivery completed", orderId=lambda: record["dynamodb"]["NewImage"]["orderId"]["S"])
+        log.verbose("Completed delivery record", record=record)
+    log.verbose("Events processed from records", events=event["Records"])
+
+
+def bench(func, *args) -> float:
+    """
+    Returns the CPU time per call in milliseconds
+    """
+
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        func(*args)
+    return (time.process_time() - start) / ITERATIONS * 1000
+
+
+def main():
+    event = get_event(RECORDS)
+
+    with open(os.devnull, "w") as stream:
+        for level in ["INFO", "DEBUG"]:
+            logger = Logger(service="bench", level=level, stream=stream)
+            log = LazyLogger(logger, sample_rate=0.1)
+
+            plain_ms = bench(plain, logger, event)
+            lazy_ms = bench(lazy, log, event)
+
+            print("{:<6} plain: {:8.1f} ms  lazy: {:8.1f} ms  saved: {:5.1f}%".format(
+                level, plain_ms, lazy_ms, (1-lazy_ms/plain_ms)*100
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark of product search on a synthetic catalogue of 1M products
+
+This compares, for a few queries:
+ - a client-side search over all products, as done today by paging through
+   getProducts scans and filtering locally
+ - ecom.search.search() over an in-memory inverted index
+
+It also measures the cost of building the index and of incremental updates,
+as done by products' TableUpdateFunction.
+
+Usage: python shared/tests/perf/bench_search.py [PRODUCTS]
+"""
+
+
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "..")
+PRODUCTS = 1000000
+ITERATIONS = 20
+UPDATES = 10000
+# Vocabulary sizes of the synthetic catalogue
+NAME_WORDS = 5000
+TAGS = 500
+CATEGORIES = 50
+QUERIES = [
+    # (text, tags, category)
+    ("word123", None, None),
+    ("word12", None, None),
+    ("word45 word46", None, None),
+    ("", ["tag7"], None),
+    ("word3", ["tag1"], "category2")
+]
+
+
+sys.path.insert(0, os.path.join(ROOT, "shared", "src", "ecom"))
+from ecom.search import InMemorySearchIndex, search, tokenize # pylint: disable=import-error,wrong-import-position
+
+
+def get_products(n: int) -> list:
+    """
+    Returns a synthetic catalogue with Zipf-like word frequencies
+    """
+
+    rng = random.Random(42)
+    cum_weights = list(itertools.accumulate(1/(i+1) for i in range(NAME_WORDS)))
+    words = ["word{}".format(i) for i in range(NAME_WORDS)]
+
+    return [
+        {
+            "productId": str(uuid.UUID(int=rng.getrandbits(128))),
+            "name": " ".join(rng.choices(words, cum_weights=cum_weights, k=3)),
+            "tags": ["tag{}".format(rng.randrange(TAGS)) for _ in range(2)],
+            "category": "category{}".format(rng.randrange(CATEGORIES)),
+            "price": rng.randrange(100, 10000)
+        }
+        for _ in range(n)
+    ]
+
+
+def scan_search(products: list, text: str, tags, category) -> list:
+    """
+    Client-side search: prefix match on every product
+
+    All products are read, as results cannot be ranked otherwise.
+    """
+
+    terms = tokenize(text)
+    results = []
+    for product in products:
+        product_terms = tokenize(" ".join([product["name"]] + product["tags"] + [product["category"]]))
+        if not all(any(t.startswith(term) for t in product_terms) for term in terms):
+            continue
+        if tags and not all(tag in product["tags"] for tag in tags):
+            continue
+        if category and product["category"] != category:
+            continue
+        results.append(product["productId"])
+    return results
+
+
+def timed(func, iterations: int) -> list:
+    """
+    Returns the latency of each call in milliseconds
+    """
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else PRODUCTS
+
+    start = time.perf_counter()
+    products = get_products(count)
+    print("Generated {} products in {:.1f} s".format(count, time.perf_counter() - start))
+
+    index = InMemorySearchIndex()
+    start = time.perf_counter()
+    index.load(products)
+    print("Built index with {} postings in {:.1f} s".format(len(index), time.perf_counter() - start))
+
+    for text, tags, category in QUERIES:
+        results, _ = search(index, text, tags=tags, category=category)
+        indexed = timed(lambda: search(index, text, tags=tags, category=category), ITERATIONS)
+        # A scan costs the same whatever the query, so fewer iterations are enough
+        scanned = timed(lambda: scan_search(products, text, tags, category), 2)
+        print("{:<30} results: {:3d}  index p50: {:8.2f} ms  max: {:8.2f} ms  scan p50: {:9.1f} ms".format(
+            repr((text, tags, category)), len(results),
+            statistics.median(indexed), max(indexed), statistics.median(scanned)
+        ))
+
+    # Incremental updates, as from the table stream: rename products
+    rng = random.Random(0)
+    changes = []
+    for product in rng.sample(products, min(UPDATES, count)):
+        new = dict(product, name=product["name"] + " word{}".format(rng.randrange(NAME_WORDS)))
+        changes.append((product["productId"], product, new))
+    start = time.perf_counter()
+    written = index.update_many(changes)
+    elapsed = time.perf_counter() - start
+    print("Updated {} products ({} postings written) in {:.1f} ms".format(len(changes), written, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
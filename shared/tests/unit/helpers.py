@@ -65,7 +65,7 @@ def mock_table(
     """
 
     SUPPORTED_ACTIONS = [
-        "delete_item", "get_item", "put_item",
+        "delete_item", "get_item", "put_item", "update_item",
         "query", "scan", "batch_write_item"
     ]
 
@@ -84,7 +84,7 @@ def mock_table(
         items = [items]
 
     # Key-based, one item
-    if action in ["delete_item", "get_item"]:
+    if action in ["delete_item", "get_item", "update_item"]:
         assert items is None or len(items) == 1
         response = response or {
             "ConsumedCapacity": {}
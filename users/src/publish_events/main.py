@@ -0,0 +1,51 @@
+"""
+PublishEventsFunction
+
+Publishes events buffered in SQS by SignUpFunction to EventBridge.
+"""
+
+
+import os
+import boto3
+from aws_lambda_powertools.tracing import Tracer
+from aws_lambda_powertools.logging.logger import Logger
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from ecom.event_buffer import publish_records # pylint: disable=import-error
+from ecom.replay import EventPublisher # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+
+
+eventbridge = boto3.client("events") # pylint: disable=invalid-name
+publisher = EventPublisher(eventbridge) # pylint: disable=invalid-name
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.users") # pylint: disable=invalid-name
+
+
+@metrics.log_metrics(raise_on_empty_metrics=False)
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda handler
+    """
+
+    records = event.get("Records", [])
+    failures = publish_records(records, publisher)
+
+    logger.info({
+        "message": "Published {} event(s)".format(len(records) - len(failures)),
+        "failures": len(failures)
+    })
+
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    metrics.add_metric(name="eventsPublished", unit=MetricUnit.Count, value=len(records) - len(failures))
+    if failures:
+        metrics.add_metric(name="eventsFailed", unit=MetricUnit.Count, value=len(failures))
+
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]
+    }
@@ -1,5 +1,9 @@
 """
 SignUpFunction
+
+The UserCreated event is put in an SQS queue, and published to EventBridge
+by PublishEventsFunction, so that EventBridge latency or throttling does not
+slow down or fail sign-ups.
 """
 
 
@@ -8,14 +12,16 @@ import json
 import os
 from aws_lambda_powertools.tracing import Tracer
 from aws_lambda_powertools.logging.logger import Logger
-import boto3
+from ecom.event_buffer import EventBuffer # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 EVENT_BUS_NAME = os.environ["EVENT_BUS_NAME"]
+# Events are kept in memory when this is not set, e.g. for local testing
+EVENT_QUEUE_URL = os.environ.get("EVENT_QUEUE_URL", None)
 
 
-eventbridge = boto3.client("events") # pylint: disable=invalid-name
+event_buffer = EventBuffer(EVENT_QUEUE_URL) # pylint: disable=invalid-name
 logger = Logger() # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
 
@@ -44,10 +50,10 @@ def process_request(input_: dict) -> dict:
 @tracer.capture_method
 def send_event(event: dict):
     """
-    Send event to EventBridge
+    Buffer the event for PublishEventsFunction
     """
 
-    eventbridge.put_events(Entries=[event])
+    event_buffer.put(event)
 
 
 @logger.inject_lambda_context
@@ -83,7 +89,7 @@ def handler(event, _):
     # Prepare the event
     eb_event = process_request(event)
 
-    # Send the event to EventBridge
+    # Buffer the event, it is sent to EventBridge asynchronously
     send_event(eb_event)
 
     # Always return the event at the end
@@ -0,0 +1,60 @@
+import json
+import uuid
+import pytest
+from botocore import stub
+from fixtures import context, lambda_module # pylint: disable=import-error,no-name-in-module
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "publish_events",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "EVENT_BUS_NAME": "EVENT_BUS_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+def _entry(user_id):
+    return {
+        "Time": "2021-01-01T00:00:00",
+        "Source": "ecommerce.users",
+        "Resources": [user_id],
+        "DetailType": "UserCreated",
+        "Detail": json.dumps({"userId": user_id, "email": "john.doe@example.com"}),
+        "EventBusName": "EVENT_BUS_NAME"
+    }
+
+
+def test_handler(lambda_module, context):
+    """
+    Test handler() with a batch of SQS messages
+    """
+
+    entries = [_entry(str(uuid.uuid4())) for _ in range(12)]
+    records = [
+        {"messageId": "MESSAGE_{}".format(i), "body": json.dumps(entry)}
+        for i, entry in enumerate(entries)
+    ]
+    records.append({"messageId": "MESSAGE_INVALID", "body": "not json"})
+
+    eventbridge = stub.Stubber(lambda_module.eventbridge)
+    eventbridge.add_response("put_events", {
+        "FailedEntryCount": 0,
+        "Entries": [{"EventId": str(i)} for i in range(10)]
+    }, {"Entries": entries[:10]})
+    eventbridge.add_client_error("put_events", "InternalException", expected_params={"Entries": entries[10:]})
+    eventbridge.activate()
+
+    response = lambda_module.handler({"Records": records}, context)
+
+    eventbridge.assert_no_pending_responses()
+    eventbridge.deactivate()
+
+    assert response == {"batchItemFailures": [
+        {"itemIdentifier": "MESSAGE_INVALID"},
+        {"itemIdentifier": "MESSAGE_10"},
+        {"itemIdentifier": "MESSAGE_11"}
+    ]}
@@ -6,6 +6,7 @@ import pytest
 from botocore import stub
 from fixtures import context, lambda_module # pylint: disable=import-error,no-name-in-module
 from helpers import compare_event # pylint: disable=import-error,no-name-in-module
+from ecom.event_buffer import EventBuffer # pylint: disable=import-error
 
 
 lambda_module = pytest.fixture(scope="module", params=[{
@@ -14,6 +15,7 @@ lambda_module = pytest.fixture(scope="module", params=[{
     "environ": {
         "ENVIRONMENT": "test",
         "EVENT_BUS_NAME": "EVENT_BUS_NAME",
+        "EVENT_QUEUE_URL": "https://sqs.eu-west-1.amazonaws.com/123456789012/EVENT_QUEUE",
         "POWERTOOLS_TRACE_DISABLED": "true"
     }
 }])(lambda_module)
@@ -69,86 +71,75 @@ def test_process_request(lambda_module, postconfirm_data):
     compare_event(postconfirm_data["output"], retval)
 
 
+@pytest.fixture
+def event_buffer(lambda_module, monkeypatch):
+    """
+    Keep buffered events in memory
+    """
+
+    buffer = EventBuffer(None)
+    monkeypatch.setattr(lambda_module, "event_buffer", buffer)
+    return buffer
+
+
 def test_send_event(lambda_module, postconfirm_data):
     """
     Test send_event()
     """
 
-    eventbridge = stub.Stubber(lambda_module.eventbridge)
+    sqs = stub.Stubber(lambda_module.event_buffer.sqs)
 
     event = postconfirm_data["output"]
-    response = {}
-    expected_params = {"Entries": [event]}
+    expected_params = {
+        "QueueUrl": lambda_module.EVENT_QUEUE_URL,
+        "MessageBody": json.dumps(event)
+    }
 
-    eventbridge.add_response("put_events", response, expected_params)
-    eventbridge.activate()
+    sqs.add_response("send_message", {}, expected_params)
+    sqs.activate()
 
     lambda_module.send_event(event)
 
-    eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
+    sqs.assert_no_pending_responses()
+    sqs.deactivate()
 
 
-def test_handler(lambda_module, context, postconfirm_data):
+def test_handler(lambda_module, context, postconfirm_data, event_buffer):
     """
     Test handler()
     """
 
-    output = copy.deepcopy(postconfirm_data["output"])
-    output["Time"] = stub.ANY
-
-    # Prepare stub
-    eventbridge = stub.Stubber(lambda_module.eventbridge)
-    response = {}
-    expected_params = {"Entries": [output]}
-    eventbridge.add_response("put_events", response, expected_params)
-    eventbridge.activate()
-
     # Execute function
     lambda_module.handler(postconfirm_data["input"], context)
 
-    # End
-    eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
+    events = event_buffer.drain()
+    assert len(events) == 1
+    compare_event(postconfirm_data["output"], events[0])
+    # Time is kept as an ISO 8601 string
+    datetime.datetime.fromisoformat(events[0]["Time"])
 
-def test_handler_wrong_event(lambda_module, context, postconfirm_data):
+def test_handler_wrong_event(lambda_module, context, postconfirm_data, event_buffer):
     """
     Test handler()
     """
 
     postconfirm_data["input"]["triggerSource"] += "_WRONG_EVENT"
 
-    # Prepare stub
-    eventbridge = stub.Stubber(lambda_module.eventbridge)
-    eventbridge.activate()
-
     # Execute function
     lambda_module.handler(postconfirm_data["input"], context)
 
-    # End
-    eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
+    assert event_buffer.drain() == []
 
-def test_handler_admin_event(lambda_module, context, postconfirm_data):
+def test_handler_admin_event(lambda_module, context, postconfirm_data, event_buffer):
     """
     Test handler()
     """
 
     postconfirm_data["input"]["triggerSource"] = "PreSignUp_AdminCreateUser"
 
-    output = copy.deepcopy(postconfirm_data["output"])
-    output["Time"] = stub.ANY
-
-    # Prepare stub
-    eventbridge = stub.Stubber(lambda_module.eventbridge)
-    response = {}
-    expected_params = {"Entries": [output]}
-    eventbridge.add_response("put_events", response, expected_params)
-    eventbridge.activate()
-
     # Execute function
     lambda_module.handler(postconfirm_data["input"], context)
 
-    # End
-    eventbridge.assert_no_pending_responses()
-    eventbridge.deactivate()
\ No newline at end of file
+    events = event_buffer.drain()
+    assert len(events) == 1
+    compare_event(postconfirm_data["output"], events[0])
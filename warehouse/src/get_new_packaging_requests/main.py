@@ -0,0 +1,62 @@
+"""
+GetNewPackagingRequestsFunction
+"""
+
+
+import os
+import boto3
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from aws_lambda_powertools import Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from ecom.workqueue import WorkQueue # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+QUEUE_INDEX_NAME = os.environ["QUEUE_INDEX_NAME"]
+# Number of packaging requests leased when the client does not ask for a count
+LEASE_COUNT = int(os.environ.get("LEASE_COUNT", "10"))
+MAX_LEASE_COUNT = 100
+# Seconds before a leased packaging request that is not started is visible again
+LEASE_TIMEOUT = int(os.environ.get("LEASE_TIMEOUT", "300"))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+# Only metadata items are in the index
+work_queue = WorkQueue(table, QUEUE_INDEX_NAME, ["orderId", "productId"]) # pylint: disable=invalid-name
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+metrics = Metrics(namespace="ecommerce.warehouse") # pylint: disable=invalid-name
+
+
+@metrics.log_metrics
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the getNewPackagingRequestIds AppSync resolver
+
+    This leases the oldest new packaging requests to the user calling the
+    API, so that concurrent users do not receive the same requests.
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    owner = event["userId"]
+    count = event.get("count", None) or LEASE_COUNT
+    count = max(1, min(count, MAX_LEASE_COUNT))
+
+    items = work_queue.lease(count, owner, LEASE_TIMEOUT)
+    order_ids = [item["orderId"] for item in items]
+
+    logger.info({
+        "message": "Leased {} packaging requests".format(len(items)),
+        "userId": owner,
+        "orderIds": order_ids
+    })
+    metrics.add_dimension(name="environment", value=ENVIRONMENT)
+    metrics.add_metric(name="packagingRequestLeased", unit=MetricUnit.Count, value=len(items))
+
+    return {"packagingRequestIds": order_ids}
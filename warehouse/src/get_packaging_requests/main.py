@@ -0,0 +1,90 @@
+"""
+GetPackagingRequestsFunction
+"""
+
+
+import os
+from typing import List
+import boto3
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.dynamodb import query_partitions # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+METADATA_KEY = os.environ["METADATA_KEY"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+# Same limit as the number of requests that can be leased at once
+MAX_ORDER_IDS = 100
+# Concurrent queries against the table
+MAX_WORKERS = int(os.environ.get("MAX_WORKERS", "20"))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+
+
+def to_packaging_request(order_id: str, items: List[dict]) -> dict:
+    """
+    Returns a packaging request from the items of an order
+    """
+
+    packaging_request = {"orderId": order_id, "products": []}
+    for item in items:
+        if item["productId"] == METADATA_KEY:
+            packaging_request["status"] = item["status"]
+        else:
+            packaging_request["products"].append({
+                "productId": item["productId"],
+                # Decimals cannot be serialized by the Lambda runtime
+                "quantity": int(item["quantity"])
+            })
+
+    return packaging_request
+
+
+@tracer.capture_method
+def get_packaging_requests(order_ids: List[str]) -> List[dict]:
+    """
+    Returns the packaging requests of many orders, in the same order
+
+    Orders without a packaging request are left out.
+    """
+
+    partitions = query_partitions(
+        table, "orderId", order_ids,
+        max_workers=MAX_WORKERS,
+        projection=["orderId", "productId", "quantity", "status"]
+    )
+
+    return [
+        to_packaging_request(order_id, partitions[order_id])
+        for order_id in dict.fromkeys(order_ids)
+        # Metadata are written last, so this skips partially written requests
+        if any(item["productId"] == METADATA_KEY for item in partitions.get(order_id, []))
+    ]
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the getPackagingRequests AppSync resolver
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    order_ids = event["orderIds"]
+    if len(order_ids) > MAX_ORDER_IDS:
+        raise ValueError("At most {} packaging requests can be retrieved at once".format(MAX_ORDER_IDS))
+
+    packaging_requests = get_packaging_requests(order_ids)
+
+    logger.info({
+        "message": "Retrieved {} packaging requests out of {}".format(len(packaging_requests), len(order_ids)),
+        "orderIds": order_ids
+    })
+
+    return packaging_requests
@@ -9,11 +9,16 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
 from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.dynamodb import query, update_item_if # pylint: disable=import-error
+from ecom.claimcheck import LazyDetail # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
 METADATA_KEY = os.environ["METADATA_KEY"]
 TABLE_NAME = os.environ["TABLE_NAME"]
+# NEW metadata is only written for new requests, or over an older version of
+# a request that is still NEW
+METADATA_CONDITION = "attribute_not_exists(orderId) OR (#status = :status AND modifiedDate <= :modifiedDate)"
 
 
 dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
@@ -81,33 +86,19 @@ def get_products(order_id: str) -> List[dict]:
     Retrieve products from the DynamoDB table
     """
 
-    res = table.query(
+    products = list(query(
+        table,
         KeyConditionExpression=Key("orderId").eq(order_id),
-        Limit=100
-    )
+        page_size=100,
+        max_page_size=1000
+    ))
     logger.info({
-        "message": "Retrieving {} products from order {}".format(
-            len(res.get("Items", [])), order_id
+        "message": "Retrieved {} products from order {}".format(
+            len(products), order_id
         ),
         "operation": "query",
         "orderId": order_id
     })
-    products = res.get("Items", [])
-
-    while res.get("LastEvaluatedKey", None) is not None:
-        res = table.query(
-            KeyConditionExpression=Key("orderId").eq(order_id),
-            ExclusiveStartKey=res["LastEvaluatedKey"],
-            Limit=100
-        )
-        logger.info({
-            "message": "Retrieving {} products from order {}".format(
-                len(res.get("Items", [])), order_id
-            ),
-            "operation": "query",
-            "orderId": order_id
-        })
-        products.extend(res.get("Items", []))
 
     return products
 
@@ -169,19 +160,42 @@ def save_metadata(order_id: str, modified_date: str, status: str = "NEW") -> Non
     Save metadata in the DynamoDB table
     """
 
-    item = {
-        "orderId": order_id,
-        "productId": METADATA_KEY,
-        "modifiedDate": modified_date,
-        "status": status
-    }
+    if status != "NEW":
+        table.put_item(Item={
+            "orderId": order_id,
+            "productId": METADATA_KEY,
+            "modifiedDate": modified_date,
+            "status": status
+        })
+        return
 
     # Inject newDate for new requests
     # This allow to make a sparse projects in DynamoDB using a Local Secondary Index.
-    if status == "NEW":
-        item["newDate"] = modified_date
-
-    table.put_item(Item=item)
+    # New requests are leased oldest first through the visibleDate index, see
+    # ecom.workqueue. Requests that are already queued keep their position
+    # and lease, and redelivered or out-of-order events cannot move a request
+    # back to NEW or to an older version.
+    if not update_item_if(
+            table,
+            {"orderId": order_id, "productId": METADATA_KEY},
+            METADATA_CONDITION,
+            UpdateExpression="SET modifiedDate = :modifiedDate, #status = :status, "
+                             "newDate = if_not_exists(newDate, :modifiedDate), "
+                             "isNew = if_not_exists(isNew, :isNew), "
+                             "visibleDate = if_not_exists(visibleDate, :modifiedDate)",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={
+                ":modifiedDate": modified_date,
+                ":status": status,
+                ":isNew": "true"
+            }
+        ):
+        logger.info({
+            "message": "Will not save metadata: packaging request for order {} is not NEW or is newer".format(
+                order_id
+            ),
+            "orderId": order_id
+        })
 
 
 @tracer.capture_method
@@ -346,12 +360,14 @@ def handler(event, _):
         "eventType": event["detail-type"]
     })
 
+    detail = LazyDetail(event["detail"])
+
     if event["detail-type"] == "OrderCreated":
-        on_order_created(event["detail"])
+        on_order_created(detail)
     elif event["detail-type"] == "OrderDeleted":
-        on_order_deleted(event["detail"])
+        on_order_deleted(detail)
     elif event["detail-type"] == "OrderModified":
-        on_order_modified(event["detail"]["old"], event["detail"]["new"])
+        on_order_modified(detail["old"], detail["new"])
     else:
         logger.warning({
             "message": "Unkown detail-type {}".format(event["detail-type"]),
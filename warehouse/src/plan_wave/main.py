@@ -0,0 +1,195 @@
+"""
+PlanWaveFunction
+"""
+
+
+import os
+from typing import List, Tuple
+import uuid
+import boto3
+from botocore.exceptions import ClientError
+from aws_lambda_powertools.tracing import Tracer # pylint: disable=import-error
+from aws_lambda_powertools.logging.logger import Logger # pylint: disable=import-error
+from ecom.dynamodb import query_partitions # pylint: disable=import-error
+from ecom.workqueue import WorkQueue # pylint: disable=import-error
+
+
+ENVIRONMENT = os.environ["ENVIRONMENT"]
+METADATA_KEY = os.environ["METADATA_KEY"]
+TABLE_NAME = os.environ["TABLE_NAME"]
+QUEUE_INDEX_NAME = os.environ["QUEUE_INDEX_NAME"]
+# Number of packaging requests in a wave when the client does not ask for a size
+WAVE_SIZE = int(os.environ.get("WAVE_SIZE", "20"))
+# TransactWriteItems supports up to 100 items
+MAX_WAVE_SIZE = 100
+# The lease only needs to last until the wave is marked in progress
+LEASE_TIMEOUT = int(os.environ.get("LEASE_TIMEOUT", "60"))
+
+
+dynamodb = boto3.resource("dynamodb") # pylint: disable=invalid-name
+table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
+work_queue = WorkQueue(table, QUEUE_INDEX_NAME, ["orderId", "productId"]) # pylint: disable=invalid-name
+logger = Logger() # pylint: disable=invalid-name
+tracer = Tracer() # pylint: disable=invalid-name
+
+
+def _start_item(order_id: str, owner: str, wave_id: str) -> dict:
+    return {"Update": {
+        "TableName": TABLE_NAME,
+        "Key": {"orderId": order_id, "productId": METADATA_KEY},
+        "UpdateExpression": (
+            "SET #status = :status, #waveId = :waveId "
+            "REMOVE #newDate, #isNew, #visibleDate, #leaseOwner"
+        ),
+        # Only requests leased to the caller and still new can join the wave
+        "ConditionExpression": "#status = :oldStatus AND #leaseOwner = :owner",
+        "ExpressionAttributeNames": {
+            "#status": "status",
+            "#waveId": "waveId",
+            "#newDate": "newDate",
+            "#isNew": "isNew",
+            "#visibleDate": "visibleDate",
+            "#leaseOwner": "leaseOwner"
+        },
+        "ExpressionAttributeValues": {
+            ":status": "IN_PROGRESS",
+            ":oldStatus": "NEW",
+            ":waveId": wave_id,
+            ":owner": owner
+        }
+    }}
+
+
+@tracer.capture_method
+def start_wave(order_ids: List[str], owner: str, wave_id: str) -> List[str]:
+    """
+    Mark packaging requests in progress in a single transaction
+
+    If some requests can no longer join the wave, the transaction is retried
+    once without them. Returns the order IDs in the wave.
+    """
+
+    for _ in range(2):
+        if not order_ids:
+            return []
+
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                _start_item(order_id, owner, wave_id)
+                for order_id in order_ids
+            ])
+            return order_ids
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            # Reasons are in the same order as the items
+            reasons = exc.response.get("CancellationReasons", [])
+            failed = {
+                order_id for order_id, reason in zip(order_ids, reasons)
+                if reason.get("Code") == "ConditionalCheckFailed"
+            }
+            if not failed:
+                raise
+            logger.info({
+                "message": "Removing {} packaging requests from wave {}".format(len(failed), wave_id),
+                "waveId": wave_id,
+                "orderIds": sorted(failed)
+            })
+            order_ids = [order_id for order_id in order_ids if order_id not in failed]
+
+    return []
+
+
+def aggregate(packaging_requests: List[dict]) -> List[dict]:
+    """
+    Returns the pick list for packaging requests
+
+    The pick list contains the total quantity of each product, and how it is
+    split across orders.
+    """
+
+    products = {}
+    for packaging_request in packaging_requests:
+        for product in packaging_request["products"]:
+            entry = products.setdefault(product["productId"], {
+                "productId": product["productId"],
+                "quantity": 0,
+                "orders": []
+            })
+            entry["quantity"] += product["quantity"]
+            entry["orders"].append({
+                "orderId": packaging_request["orderId"],
+                "quantity": product["quantity"]
+            })
+
+    return [products[product_id] for product_id in sorted(products)]
+
+
+@tracer.capture_method
+def get_packaging_requests(order_ids: List[str]) -> List[dict]:
+    """
+    Returns the products of packaging requests
+    """
+
+    partitions = query_partitions(
+        table, "orderId", order_ids,
+        projection=["orderId", "productId", "quantity"]
+    )
+
+    return [
+        {
+            "orderId": order_id,
+            "status": "IN_PROGRESS",
+            "products": [
+                # Decimals cannot be serialized by the Lambda runtime
+                {"productId": item["productId"], "quantity": int(item["quantity"])}
+                for item in partitions.get(order_id, [])
+                if item["productId"] != METADATA_KEY
+            ]
+        }
+        for order_id in order_ids
+    ]
+
+
+def plan_wave(owner: str, size: int) -> Tuple[str, List[dict]]:
+    """
+    Start a wave with the oldest new packaging requests
+
+    Returns the wave ID and the packaging requests in the wave.
+    """
+
+    wave_id = str(uuid.uuid4())
+
+    leased = work_queue.lease(size, owner, LEASE_TIMEOUT)
+    order_ids = start_wave([item["orderId"] for item in leased], owner, wave_id)
+
+    return wave_id, get_packaging_requests(order_ids)
+
+
+@logger.inject_lambda_context
+@tracer.capture_lambda_handler
+def handler(event, _):
+    """
+    Lambda function handler for the planWave AppSync resolver
+    """
+
+    logger.debug({"message": "Event received", "event": event})
+
+    owner = event["userId"]
+    size = event.get("size", None) or WAVE_SIZE
+    size = max(1, min(size, MAX_WAVE_SIZE))
+
+    wave_id, packaging_requests = plan_wave(owner, size)
+
+    logger.info({
+        "message": "Started wave {} with {} packaging requests".format(wave_id, len(packaging_requests)),
+        "waveId": wave_id,
+        "userId": owner,
+        "orderIds": [p["orderId"] for p in packaging_requests]
+    })
+
+    return {
+        "waveId": wave_id,
+        "pickList": aggregate(packaging_requests),
+        "packagingRequests": packaging_requests
+    }
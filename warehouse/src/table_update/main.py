@@ -6,16 +6,18 @@ TableUpdateFunction
 import datetime
 import json
 import os
-import warnings
 from typing import List, Optional
 from aws_lambda_powertools.tracing import Tracer
 from aws_lambda_powertools.logging.logger import Logger
-from aws_lambda_powertools import Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 import boto3
 from boto3.dynamodb.conditions import Key
 from boto3.dynamodb.types import TypeDeserializer
+from ecom.dynamodb import query # pylint: disable=import-error
 from ecom.helpers import Encoder #pylint: disable=import-error
+from ecom.instrumentation import instrument_client # pylint: disable=import-error
+from ecom.logs import LazyLogger # pylint: disable=import-error
+from ecom.metrics import MetricsAggregator # pylint: disable=import-error
 
 
 ENVIRONMENT = os.environ["ENVIRONMENT"]
@@ -29,8 +31,11 @@ eventbridge = boto3.client("events") # pylint: disable=invalid-name
 table = dynamodb.Table(TABLE_NAME) # pylint: disable=invalid-name,no-member
 type_deserializer = TypeDeserializer() # pylint: disable=invalid-name
 logger = Logger() # pylint: disable=invalid-name
+log = LazyLogger(logger, sample_rate=0.1) # pylint: disable=invalid-name
 tracer = Tracer() # pylint: disable=invalid-name
-metrics = Metrics(namespace="ecommerce.warehouse", service="warehouse")
+metrics = MetricsAggregator(namespace="ecommerce.warehouse", dimensions={"service": "warehouse"}) # pylint: disable=invalid-name
+instrument_client(eventbridge, metrics)
+instrument_client(dynamodb, metrics)
 
 
 event_type_to_metric = {
@@ -96,33 +101,19 @@ def get_products(order_id: str) -> List[dict]:
     Retrieve products from the DynamoDB table
     """
 
-    res = table.query(
+    products = list(query(
+        table,
         KeyConditionExpression=Key("orderId").eq(order_id),
-        Limit=100
-    )
+        page_size=100,
+        max_page_size=1000
+    ))
     logger.info({
-        "message": "Retrieving {} products from order {}".format(
-            len(res.get("Items", [])), order_id
+        "message": "Retrieved {} products from order {}".format(
+            len(products), order_id
         ),
         "operation": "query",
         "orderId": order_id
     })
-    products = res.get("Items", [])
-
-    while res.get("LastEvaluatedKey", None) is not None:
-        res = table.query(
-            KeyConditionExpression=Key("orderId").eq(order_id),
-            ExclusiveStartKey=res["LastEvaluatedKey"],
-            Limit=100
-        )
-        logger.info({
-            "message": "Retrieving {} products from order {}".format(
-                len(res.get("Items", [])), order_id
-            ),
-            "operation": "query",
-            "orderId": order_id
-        })
-        products.extend(res.get("Items", []))
 
     return products
 
@@ -135,20 +126,9 @@ def handler(event, _):
     Lambda function handler for Warehouse Table stream
     """
 
-    # this handler may complete without publishing any metrics
-    warnings.filterwarnings("ignore", "No metrics to publish*")
-
     metrics.add_dimension(name="environment", value=ENVIRONMENT)
 
-    logger.debug({
-        "message": "Input event",
-        "event": event
-    })
-
-    logger.debug({
-        "message": "Records received",
-        "records": event.get("Records", [])
-    })
+    log.verbose("Input event", event=event)
 
     # Parse events
     events = [
@@ -160,9 +140,6 @@ def handler(event, _):
     events = [event for event in events if event is not None]
 
     logger.info("Received %d event(s)", len(events))
-    logger.debug({
-        "message": "Events processed from records",
-        "events": events
-    })
+    log.verbose("Events processed from records", events=events)
 
     send_events(events)
@@ -0,0 +1,66 @@
+import uuid
+from botocore import stub
+import pytest
+from fixtures import context, lambda_module # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "get_new_packaging_requests",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "TABLE_NAME": "TABLE_NAME",
+        "QUEUE_INDEX_NAME": "QUEUE_INDEX_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+def _ddb(order_id: str, visible_date: str) -> dict:
+    return {
+        "orderId": {"S": order_id},
+        "productId": {"S": "__metadata"},
+        "isNew": {"S": "true"},
+        "visibleDate": {"S": visible_date}
+    }
+
+
+def test_handler(lambda_module, context):
+    """
+    Test handler()
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(3)]
+    dates = ["2021-01-01T00:00:0{}".format(i) for i in range(3)]
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_response("query", {
+        "Items": [_ddb(order_id, date) for order_id, date in zip(order_ids, dates)]
+    }, {
+        "TableName": lambda_module.TABLE_NAME,
+        "IndexName": lambda_module.QUEUE_INDEX_NAME,
+        "KeyConditionExpression": "#pk = :pk AND #sk <= :now",
+        "ExpressionAttributeNames": {"#pk": "isNew", "#sk": "visibleDate"},
+        "ExpressionAttributeValues": {":pk": "true", ":now": stub.ANY},
+        "ScanIndexForward": True,
+        "Limit": 3
+    })
+    for order_id, date in zip(order_ids, dates):
+        table.add_response("update_item", {"Attributes": _ddb(order_id, "LEASED")}, {
+            "TableName": lambda_module.TABLE_NAME,
+            "Key": {"orderId": order_id, "productId": "__metadata"},
+            "UpdateExpression": "SET #sk = :until, #owner = :owner",
+            "ConditionExpression": "#sk = :visibleDate",
+            "ExpressionAttributeNames": {"#sk": "visibleDate", "#owner": "leaseOwner"},
+            "ExpressionAttributeValues": {":until": stub.ANY, ":owner": "USER_ID", ":visibleDate": date},
+            "ReturnValues": "ALL_NEW"
+        })
+    table.activate()
+
+    response = lambda_module.handler({"userId": "USER_ID", "count": 3}, context)
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+    assert response == {"packagingRequestIds": order_ids}
@@ -0,0 +1,92 @@
+import uuid
+import pytest
+from fixtures import context, lambda_module # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "get_packaging_requests",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "METADATA_KEY": "__metadata",
+        "TABLE_NAME": "TABLE_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+def _items(order_id: str, metadata: bool = True) -> list:
+    items = [
+        {"orderId": order_id, "productId": "PRODUCT_1", "quantity": 2},
+        {"orderId": order_id, "productId": "PRODUCT_2", "quantity": 1}
+    ]
+    if metadata:
+        items.append({"orderId": order_id, "productId": "__metadata", "status": "NEW"})
+    return items
+
+
+def test_to_packaging_request(lambda_module):
+    """
+    Test to_packaging_request()
+    """
+
+    items = [
+        {"orderId": "ORDER_ID", "productId": "PRODUCT_ID", "quantity": 3},
+        {"orderId": "ORDER_ID", "productId": "__metadata", "status": "IN_PROGRESS"}
+    ]
+
+    assert lambda_module.to_packaging_request("ORDER_ID", items) == {
+        "orderId": "ORDER_ID",
+        "status": "IN_PROGRESS",
+        "products": [{"productId": "PRODUCT_ID", "quantity": 3}]
+    }
+
+
+def test_handler(lambda_module, context, monkeypatch):
+    """
+    Test handler()
+    """
+
+    order_ids = [str(uuid.uuid4()) for _ in range(3)]
+    responses = {
+        order_ids[0]: _items(order_ids[0]),
+        # Products written, but not the metadata yet
+        order_ids[1]: _items(order_ids[1], metadata=False),
+        order_ids[2]: _items(order_ids[2])
+    }
+    calls = []
+
+    # Queries run concurrently, so the table is replaced instead of stubbed
+    class Table:
+        def query(self, KeyConditionExpression, **kwargs):
+            order_id = KeyConditionExpression.get_expression()["values"][1]
+            calls.append(order_id)
+            return {"Items": responses.get(order_id, [])}
+
+    monkeypatch.setattr(lambda_module, "table", Table())
+
+    response = lambda_module.handler({"orderIds": order_ids + [order_ids[0], "MISSING"]}, context)
+
+    assert response == [
+        {
+            "orderId": order_id,
+            "status": "NEW",
+            "products": [
+                {"productId": "PRODUCT_1", "quantity": 2},
+                {"productId": "PRODUCT_2", "quantity": 1}
+            ]
+        }
+        for order_id in [order_ids[0], order_ids[2]]
+    ]
+    # One query per distinct order
+    assert sorted(calls) == sorted(order_ids + ["MISSING"])
+
+
+def test_handler_too_many(lambda_module, context):
+    """
+    Test handler() with too many order IDs
+    """
+
+    with pytest.raises(ValueError):
+        lambda_module.handler({"orderIds": [str(i) for i in range(101)]}, context)
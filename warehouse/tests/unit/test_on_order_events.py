@@ -52,6 +52,21 @@ def order_products(order):
     ]
 
 
+def metadata_params(lambda_module, order_metadata: dict) -> dict:
+    return {
+        "TableName": lambda_module.table.name,
+        "Key": {"orderId": order_metadata["orderId"], "productId": METADATA_KEY},
+        "ConditionExpression": lambda_module.METADATA_CONDITION,
+        "UpdateExpression": stub.ANY,
+        "ExpressionAttributeNames": {"#status": "status"},
+        "ExpressionAttributeValues": {
+            ":modifiedDate": order_metadata["modifiedDate"],
+            ":status": "NEW",
+            ":isNew": "true"
+        }
+    }
+
+
 def test_get_diff(lambda_module, get_product):
     """
     Test get_diff()
@@ -206,13 +221,10 @@ def test_save_metadata(lambda_module, order_metadata):
     Test save_metadata()
     """
 
-    item = copy.deepcopy(order_metadata)
-    item["newDate"] = order_metadata["modifiedDate"]
-
     table = mock_table(
-        lambda_module.table, "put_item",
+        lambda_module.table, "update_item",
         ["orderId", "productId"],
-        items=item
+        expected_params=metadata_params(lambda_module, order_metadata)
     )
 
     lambda_module.save_metadata(
@@ -225,6 +237,43 @@ def test_save_metadata(lambda_module, order_metadata):
     table.deactivate()
 
 
+def test_save_metadata_condition_failed(lambda_module, order_metadata):
+    """
+    Test save_metadata() when the request started or is newer
+    """
+
+    table = stub.Stubber(lambda_module.table.meta.client)
+    table.add_client_error(
+        "update_item", "ConditionalCheckFailedException",
+        expected_params=metadata_params(lambda_module, order_metadata)
+    )
+    table.activate()
+
+    lambda_module.save_metadata(order_metadata["orderId"], order_metadata["modifiedDate"])
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
+def test_save_metadata_not_new(lambda_module, order_metadata):
+    """
+    Test save_metadata() with a request that is not NEW
+    """
+
+    item = dict(order_metadata, status="IN_PROGRESS")
+
+    table = mock_table(
+        lambda_module.table, "put_item",
+        ["orderId", "productId"],
+        items=item
+    )
+
+    lambda_module.save_metadata(item["orderId"], item["modifiedDate"], item["status"])
+
+    table.assert_no_pending_responses()
+    table.deactivate()
+
+
 def test_save_products(lambda_module, order, order_products):
     """
     Test save_products()
@@ -305,12 +354,9 @@ def test_on_order_created(lambda_module, order, order_products, order_metadata):
             for product in order_products
         ]
     )
-    order_metadata = copy.deepcopy(order_metadata)
-    order_metadata["newDate"] = order_metadata["modifiedDate"]
     mock_table(
-        table, "put_item", ["orderId", "productId"],
-        table_name=lambda_module.table.name,
-        items=order_metadata
+        table, "update_item", ["orderId", "productId"],
+        expected_params=metadata_params(lambda_module, order_metadata)
     )
     
     lambda_module.on_order_created(order)
@@ -352,12 +398,9 @@ def test_on_order_modified_new(lambda_module, order, order_products, order_metad
             for product in order_products
         ]
     )
-    order_metadata = copy.deepcopy(order_metadata)
-    order_metadata["newDate"] = order_metadata["modifiedDate"]
     mock_table(
-        table, "put_item", ["orderId", "productId"],
-        table_name=lambda_module.table.name,
-        items=order_metadata
+        table, "update_item", ["orderId", "productId"],
+        expected_params=metadata_params(lambda_module, order_metadata)
     )
 
     lambda_module.on_order_modified(order, order)
@@ -448,12 +491,9 @@ def test_handler_created(lambda_module, context, order, order_products, order_me
             for product in order_products
         ]
     )
-    order_metadata = copy.deepcopy(order_metadata)
-    order_metadata["newDate"] = order_metadata["modifiedDate"]
     mock_table(
-        table, "put_item", ["orderId", "productId"],
-        table_name=lambda_module.table.name,
-        items=order_metadata
+        table, "update_item", ["orderId", "productId"],
+        expected_params=metadata_params(lambda_module, order_metadata)
     )
 
     lambda_module.handler({
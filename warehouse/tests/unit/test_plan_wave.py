@@ -0,0 +1,149 @@
+import uuid
+from botocore import stub
+import pytest
+from fixtures import context, lambda_module # pylint: disable=import-error
+
+
+lambda_module = pytest.fixture(scope="module", params=[{
+    "function_dir": "plan_wave",
+    "module_name": "main",
+    "environ": {
+        "ENVIRONMENT": "test",
+        "METADATA_KEY": "__metadata",
+        "TABLE_NAME": "TABLE_NAME",
+        "QUEUE_INDEX_NAME": "QUEUE_INDEX_NAME",
+        "POWERTOOLS_TRACE_DISABLED": "true"
+    }
+}])(lambda_module)
+context = pytest.fixture(context)
+
+
+@pytest.fixture
+def order_ids():
+    return [str(uuid.uuid4()) for _ in range(3)]
+
+
+def transact_params(lambda_module, order_ids, owner, wave_id):
+    return {"TransactItems": [
+        {"Update": {
+            "TableName": lambda_module.TABLE_NAME,
+            "Key": {"orderId": order_id, "productId": "__metadata"},
+            # Started requests leave the queue and their lease
+            "UpdateExpression": "SET #status = :status, #waveId = :waveId "
+                                "REMOVE #newDate, #isNew, #visibleDate, #leaseOwner",
+            "ConditionExpression": "#status = :oldStatus AND #leaseOwner = :owner",
+            "ExpressionAttributeNames": stub.ANY,
+            "ExpressionAttributeValues": {
+                ":status": "IN_PROGRESS",
+                ":oldStatus": "NEW",
+                ":waveId": wave_id,
+                ":owner": owner
+            }
+        }}
+        for order_id in order_ids
+    ]}
+
+
+def test_aggregate(lambda_module):
+    """
+    Test aggregate()
+    """
+
+    packaging_requests = [
+        {"orderId": "ORDER_1", "products": [
+            {"productId": "PRODUCT_B", "quantity": 2},
+            {"productId": "PRODUCT_A", "quantity": 1}
+        ]},
+        {"orderId": "ORDER_2", "products": [
+            {"productId": "PRODUCT_B", "quantity": 3}
+        ]}
+    ]
+
+    assert lambda_module.aggregate(packaging_requests) == [
+        {"productId": "PRODUCT_A", "quantity": 1, "orders": [
+            {"orderId": "ORDER_1", "quantity": 1}
+        ]},
+        {"productId": "PRODUCT_B", "quantity": 5, "orders": [
+            {"orderId": "ORDER_1", "quantity": 2},
+            {"orderId": "ORDER_2", "quantity": 3}
+        ]}
+    ]
+
+
+def test_start_wave(lambda_module, order_ids):
+    """
+    Test start_wave()
+    """
+
+    client = stub.Stubber(lambda_module.dynamodb.meta.client)
+    client.add_response(
+        "transact_write_items", {},
+        transact_params(lambda_module, order_ids, "USER_ID", "WAVE_ID")
+    )
+    client.activate()
+
+    assert lambda_module.start_wave(order_ids, "USER_ID", "WAVE_ID") == order_ids
+
+    client.assert_no_pending_responses()
+    client.deactivate()
+
+
+def test_start_wave_conflict(lambda_module, order_ids):
+    """
+    Test start_wave() with a packaging request started in the meantime
+    """
+
+    client = stub.Stubber(lambda_module.dynamodb.meta.client)
+    client.add_client_error(
+        "transact_write_items", "TransactionCanceledException",
+        expected_params=transact_params(lambda_module, order_ids, "USER_ID", "WAVE_ID"),
+        modeled_fields={"CancellationReasons": [
+            {"Code": "None"}, {"Code": "ConditionalCheckFailed"}, {"Code": "None"}
+        ]}
+    )
+    client.add_response(
+        "transact_write_items", {},
+        transact_params(lambda_module, [order_ids[0], order_ids[2]], "USER_ID", "WAVE_ID")
+    )
+    client.activate()
+
+    assert lambda_module.start_wave(order_ids, "USER_ID", "WAVE_ID") == [order_ids[0], order_ids[2]]
+
+    client.assert_no_pending_responses()
+    client.deactivate()
+
+
+def test_handler(lambda_module, context, order_ids, monkeypatch):
+    """
+    Test handler()
+    """
+
+    def lease(count, owner, timeout):
+        assert (count, owner) == (2, "USER_ID")
+        return [{"orderId": order_id, "productId": "__metadata"} for order_id in order_ids[:2]]
+
+    products = {
+        order_ids[0]: [{"productId": "PRODUCT_A", "quantity": 1}],
+        order_ids[1]: [{"productId": "PRODUCT_A", "quantity": 2}]
+    }
+    def get_packaging_requests(ids):
+        return [{"orderId": i, "status": "IN_PROGRESS", "products": products[i]} for i in ids]
+
+    monkeypatch.setattr(lambda_module.work_queue, "lease", lease)
+    monkeypatch.setattr(lambda_module, "get_packaging_requests", get_packaging_requests)
+
+    client = stub.Stubber(lambda_module.dynamodb.meta.client)
+    client.add_response("transact_write_items", {})
+    client.activate()
+
+    response = lambda_module.handler({"userId": "USER_ID", "size": 2}, context)
+
+    client.assert_no_pending_responses()
+    client.deactivate()
+
+    assert response["waveId"]
+    assert response["packagingRequests"] == get_packaging_requests(order_ids[:2])
+    assert response["pickList"] == [{"productId": "PRODUCT_A", "quantity": 3, "orders": [
+        {"orderId": order_ids[0], "quantity": 1},
+        {"orderId": order_ids[1], "quantity": 2}
+    ]}]